@@ -1,14 +1,15 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import logging
 import random
-import streamlit as st
-from data_loader import DataLoader
-from feature_engineer import FeatureEngineer
-from model_trainer import ModelTrainer
-from strategies import StockSelectionStrategies
-from backtester import Backtester
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.model_trainer import ModelTrainer
+from src.strategies import StockSelectionStrategies
+from src.backtester import Backtester
+from src.universe import UniverseSnapshot
+from src.strategy_registry import StrategyRegistry
 
 from utils.logger import Logger
 from utils.config import Config
@@ -76,60 +77,45 @@ class StockPickerApp:
 
                 # 模拟股票数据
                 max_stock_codes = Config.get('app.max_stock_codes', 100)
-                stock_codes = [f"{i:06d}" for i in range(1, max_stock_codes + 1)]
-                stock_data = []
-
-                for code in stock_codes:
-                    # 模拟股票基本信息
-                    industry = random.choice(["科技", "金融", "医疗", "消费", "能源", "制造"])
-                    name = f"股票{code}"
-
-                    # 模拟股票数据
-                    start_date = Config.get('app.stock_start_date', "2023-01-01")
-                    end_date = Config.get('app.stock_end_date', "2023-12-31")
-                    df = DataLoader.fetch_stock_data(code, start_date, end_date)
-                    if not df.empty:
-                        # 计算维度得分
-                        df = FeatureEngineer.calculate_dimensions(df)
-                        # 创建目标变量
-                        df = FeatureEngineer.create_target_variable(df)
-
-                        # 获取最新数据
-                        latest_data = df.iloc[-1].to_dict()
-                        latest_data['股票代码'] = code
-                        latest_data['股票名称'] = name
-                        latest_data['所属行业'] = industry
-                        latest_data['涨跌幅'] = random.uniform(-5, 10)
-
-                        stock_data.append(latest_data)
-
-                # 创建股票数据DataFrame
-                stock_df = pd.DataFrame(stock_data)
+                end_date = Config.get('app.stock_end_date', "2023-12-31")
+
+                # 同一股票池和结束日期的股票池快照及全部参数组合的选股结果在会话中只计算一次，
+                # 之后切换侧边栏参数或策略都在同一个快照上运行
+                universe_key = (end_date, max_stock_codes)
+                cached = st.session_state.get('selection_grid')
+                if cached is not None and cached[0] == universe_key:
+                    _, universe, selection_grid = cached
+                else:
+                    universe = UniverseSnapshot.build(end_date)
+                    selection_grid = StockSelectionStrategies.evaluate_grid(universe)
+                    st.session_state['selection_grid'] = (universe_key, universe, selection_grid)
 
                 # 训练模型
                 if retrain_model:
-                    ModelTrainer.train_model(stock_df, retrain=True)
+                    ModelTrainer.train_model(universe.frame(), retrain=True)
                 else:
-                    ModelTrainer.train_model(stock_df, retrain=False)
+                    ModelTrainer.train_model(universe.frame(), retrain=False)
 
-                # 应用选股策略
+                # 应用选股策略，九州策略直接从选股结果表中读取
                 if strategy == "九州策略":
-                    selected_stocks = StockSelectionStrategies.jiuzhou_strategy(
-                        stock_df,
+                    selected_stocks = StockSelectionStrategies.select_from_grid(
+                        universe,
+                        selection_grid,
                         market_trend,
                         risk_preference,
                         industry_preference
                     )
                 else:
-                    selected_stocks = StockSelectionStrategies.ai_strategy(
-                        stock_df,
-                        market_trend,
-                        risk_preference,
-                        industry_preference
+                    selected_stocks = StrategyRegistry.run(
+                        strategy,
+                        universe,
+                        market_trend=market_trend,
+                        risk_preference=risk_preference,
+                        industry_preference=industry_preference
                     )
 
-                # 回测策略
-                backtest_results = Backtester.backtest_strategy(selected_stocks)
+                # 回测策略：只回测快照日期之后的持有期
+                backtest_results = Backtester.backtest_strategy(selected_stocks, as_of=universe.as_of)
 
                 # 显示结果
                 st.markdown("## 📊选股结果")
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.logger import Logger
+from utils.config import Config
+from src.backtester import Backtester
+from src.feature_store import FeatureStore
+from src.indicators import IndicatorEngine
+from src.model_search import HyperparameterSearch
+from src.schema import industry_dtype
+from src.strategies import StockSelectionStrategies
+from src.strategy_registry import StrategyRegistry
+from src.universe import UniverseSnapshot
+logger = Logger.get_logger("backtest_sweep")
+
+
+# 工作进程中以只读内存映射打开的回测数组，由_init_worker设置
+_worker_arrays = None
+# 工作进程中各调仓日的股票池快照，按需构建后在该进程的任务间复用
+_worker_universes = None
+
+ARRAY_NAMES = ('close', 'rebalance_rows', 'scores', 'predicted', 'codes', 'industries')
+
+
+def _init_worker(directory: str) -> None:
+    """工作进程初始化：以只读内存映射打开收盘价、得分等数组，所有进程共享同一份物理内存"""
+    global _worker_arrays, _worker_universes
+    _worker_arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+    _worker_universes = {}
+
+
+def _universe(i: int) -> UniverseSnapshot:
+    """第i个调仓日的股票池快照，行索引为行情矩阵中的列号；调仓日没有收盘价的股票不在其中"""
+    universe = _worker_universes.get(i)
+    if universe is None:
+        arrays = _worker_arrays
+        cols = np.flatnonzero(~np.isnan(arrays['close'][arrays['rebalance_rows'][i]]))
+        scores = np.asarray(arrays['scores'][i])
+        frame = pd.DataFrame({
+            '股票代码': np.asarray(arrays['codes'])[cols],
+            **{name: scores[cols, j] for j, name in enumerate(StockSelectionStrategies.SCORE_COLUMNS)},
+            '预测涨跌幅': np.asarray(arrays['predicted'][i])[cols],
+            '所属行业': np.asarray(arrays['industries'])[cols]
+        }, index=cols)
+        universe = _worker_universes[i] = UniverseSnapshot(frame)
+    return universe
+
+
+def _run_task(params: dict, start: int) -> dict:
+    """按一组参数在各调仓日运行选股策略并回测，返回回测指标和耗时"""
+    close, rebalance_rows = _worker_arrays['close'], np.asarray(_worker_arrays['rebalance_rows'])
+    began = time.perf_counter()
+
+    # 与选股时相同，经由策略注册表选股，预测涨跌幅、行业偏好等过滤条件都在策略内生效
+    picks = []
+    for i in range(len(rebalance_rows)):
+        selected = StrategyRegistry.run(params['策略'], _universe(i), market_trend=params['市场趋势'],
+                                        risk_preference=params['风险偏好'], industry_preference=params['行业偏好'])
+        picks.append(selected.index.to_numpy(dtype=np.int64) if not selected.empty else np.empty(0, dtype=np.int64))
+
+    holdings = np.zeros((len(rebalance_rows), max([len(p) for p in picks] + [1])), dtype=np.int64)
+    holding_weights = np.zeros(holdings.shape)
+    for i, picked in enumerate(picks):
+        holdings[i, :len(picked)] = picked
+        if len(picked):
+            holding_weights[i, :len(picked)] = 1.0 / len(picked)
+
+    returns = Backtester.portfolio_returns(close, rebalance_rows, holdings, holding_weights)[start:]
+    results = Backtester.metrics(returns, rebalance_rows - start)
+    results['平均持仓数'] = float(np.mean([len(p) for p in picks])) if picks else 0.0
+    results['耗时'] = time.perf_counter() - began
+    results['工作进程'] = os.getpid()
+    return results
+
+
+class BacktestSweep:
+    """
+    多策略、多参数回测扫描
+    对策略×市场趋势×风险偏好×行业偏好的每组参数，在各调仓日经由StrategyRegistry运行选股策略并回测，
+    汇总为一张对比表；选股与界面中一致，同样按预测涨跌幅和行业偏好过滤
+
+    收盘价、各调仓日的维度得分和预测涨跌幅、各股票的行业写为.npy文件后由各工作进程以只读内存映射打开，
+    任务只传递参数字典；每完成一个任务即追加写入结果文件，中断后重新运行时跳过已完成的任务
+    """
+
+    @staticmethod
+    def param_grid(strategies: list = None, market_trends: list = None, risk_preferences: list = None,
+                   industry_preferences: list = None) -> list:
+        """
+        生成参数组合
+        Args:
+            strategies: 策略名列表，默认为StrategyRegistry中全部已注册的策略（别名只取一个）
+            market_trends: 市场趋势列表，默认为StockSelectionStrategies.TREND_WEIGHTS中的全部趋势
+            risk_preferences: 风险偏好列表，默认为StockSelectionStrategies.RISK_PREFERENCES
+            industry_preferences: 行业偏好列表，每项为一个行业列表，默认为[['全部']]
+        Returns:
+            list: 参数字典列表，包含策略、市场趋势、风险偏好和行业偏好
+        """
+        strategies = strategies or StrategyRegistry.unique_names()
+        market_trends = market_trends or list(StockSelectionStrategies.TREND_WEIGHTS)
+        risk_preferences = risk_preferences or StockSelectionStrategies.RISK_PREFERENCES
+        industry_preferences = industry_preferences or [['全部']]
+        grid = []
+        for strategy in strategies:
+            for trend in market_trends:
+                for risk in risk_preferences:
+                    for industries in industry_preferences:
+                        grid.append({
+                            '策略': strategy,
+                            '市场趋势': trend,
+                            '风险偏好': risk,
+                            '行业偏好': list(industries)
+                        })
+        return grid
+
+    @staticmethod
+    def task_key(params: dict) -> str:
+        """参数组合的唯一标识，用于断点续跑"""
+        return hashlib.md5(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _sweep_key(prices, rows: slice, freq: str, predicted: np.ndarray, industries: np.ndarray) -> str:
+        """
+        行情内容、回测区间、调仓周期、指标版本以及预测涨跌幅和行业的唯一标识，
+        任何一项变化后不会复用旧的数组和结果
+        """
+        parts = [str(prices.shape), str(prices.dates[0]), str(prices.dates[-1]), str(rows.start), str(rows.stop), freq,
+                 FeatureStore.feature_fingerprint()]
+        digest = hashlib.md5("|".join(parts + [str(code) for code in prices.codes]).encode('utf-8'))
+        for field in ('收盘价', '成交量', '成交额'):
+            if field in prices:
+                digest.update(field.encode('utf-8'))
+                digest.update(np.ascontiguousarray(prices[field][:rows.stop]).tobytes())
+        digest.update(np.ascontiguousarray(predicted, dtype=np.float64).tobytes())
+        digest.update("|".join(str(industry) for industry in industries).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def universe_inputs(n_rebalance: int, n_codes: int, seed: int = None) -> tuple:
+        """
+        生成各调仓日的预测涨跌幅和各股票的行业
+        与UniverseSnapshot.build相同地模拟这两列，但使用固定种子，续跑时各任务看到相同的股票池
+        Args:
+            n_rebalance: 调仓日数
+            n_codes: 股票数
+            seed: 随机种子，默认读取配置项data.seed
+        Returns:
+            tuple: 形状为(调仓日数, 股票数)的预测涨跌幅，长度为股票数的行业数组
+        """
+        rng = np.random.default_rng(Config.get('data.seed', 42) if seed is None else seed)
+        industries = np.asarray(rng.choice(np.asarray(industry_dtype().categories, dtype=str), size=n_codes), dtype=str)
+        predicted = rng.uniform(-5, 10, size=(n_rebalance, n_codes))
+        return predicted, industries
+
+    @staticmethod
+    def dimension_scores(prices, rows: np.ndarray, chunk_size: int = None) -> np.ndarray:
+        """
+        计算指定日期的三个维度得分，指标只使用当日及之前的行情
+        各股票的指标相互独立，按股票分块计算以控制内存
+        Args:
+            prices: 行情矩阵PriceMatrix，需包含收盘价，可选成交量、成交额
+            rows: 需要得分的行号
+            chunk_size: 每块的股票数，默认读取配置项backtest.sweep_chunk_size
+        Returns:
+            np.ndarray: 形状为(行数, 股票数, 3)的得分，最后一维依次为天道、地道、人道得分
+        """
+        chunk_size = chunk_size or Config.get('backtest.sweep_chunk_size', 1000)
+        rows = np.asarray(rows, dtype=np.int64)
+        stop = int(rows.max()) + 1 if len(rows) else 0
+        n_codes = prices.shape[1]
+        scores = np.empty((len(rows), n_codes, len(StockSelectionStrategies.SCORE_COLUMNS)))
+        for begin in range(0, n_codes, chunk_size):
+            columns = slice(begin, min(begin + chunk_size, n_codes))
+            fields = [prices[field][:stop, columns] if field in prices else None for field in ('收盘价', '成交量', '成交额')]
+            dimensions = IndicatorEngine.compute(*fields)
+            for j, name in enumerate(StockSelectionStrategies.SCORE_COLUMNS):
+                scores[:, columns, j] = dimensions[name][rows]
+        return scores
+
+    @staticmethod
+    def _load_results(path: str) -> dict:
+        """读取已完成任务的结果，跳过中断时未写完整的行"""
+        results = {}
+        if not os.path.exists(path):
+            return results
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[record['key']] = record
+        return results
+
+    @staticmethod
+    def run(prices, params: list = None, start_date: str = None, end_date: str = None, freq: str = None,
+            n_jobs: int = None, directory: str = None, resume: bool = True, predicted: np.ndarray = None,
+            industries: np.ndarray = None) -> pd.DataFrame:
+        """
+        并行回测多组参数
+        Args:
+            prices: 行情矩阵PriceMatrix，需包含收盘价
+            params: 参数字典列表，默认为param_grid()
+            start_date: 回测开始日期，None表示行情矩阵的第一天，之前的行情只用于计算指标
+            end_date: 回测结束日期，None表示行情矩阵的最后一天
+            freq: 调仓周期，默认读取配置项backtest.rebalance_freq
+            n_jobs: 并行进程数，默认读取配置项backtest.sweep_n_jobs，1表示在当前进程中依次执行
+            directory: 数组和结果文件的保存目录，默认为配置项backtest.sweep_dir下按数据和区间命名的子目录
+            resume: 是否跳过结果文件中已完成的任务
+            predicted: 形状为(调仓日数, 股票数)的预测涨跌幅，与industries均默认由universe_inputs生成
+            industries: 长度为股票数的行业数组
+        Returns:
+            pd.DataFrame: 每组参数一行，包含参数、回测指标、耗时和是否为续跑读取的结果，失败时返回空DataFrame
+        """
+        try:
+            params = params or BacktestSweep.param_grid()
+            freq = freq or Config.get('backtest.rebalance_freq', 'M')
+            n_jobs = HyperparameterSearch.resolve_n_jobs(Config.get('backtest.sweep_n_jobs', -1) if n_jobs is None else n_jobs)
+            rows = prices.date_slice(start_date, end_date)
+            if rows.stop <= rows.start:
+                logger.warning("回测区间内没有交易日")
+                return pd.DataFrame()
+            rebalance_rows = Backtester.rebalance_schedule(prices.dates[rows], freq) + rows.start
+            default_predicted, default_industries = BacktestSweep.universe_inputs(len(rebalance_rows), prices.shape[1])
+            predicted = default_predicted if predicted is None else np.asarray(predicted, dtype=np.float64)
+            industries = default_industries if industries is None else np.asarray(industries, dtype=str)
+            if predicted.shape != (len(rebalance_rows), prices.shape[1]) or industries.shape != (prices.shape[1],):
+                raise ValueError(f"预测涨跌幅应为{(len(rebalance_rows), prices.shape[1])}，行业应为{(prices.shape[1],)}")
+            directory = directory or os.path.join(Config.get('backtest.sweep_dir', 'data/sweeps'),
+                                                  BacktestSweep._sweep_key(prices, rows, freq, predicted, industries))
+            os.makedirs(directory, exist_ok=True)
+
+            # 数组只写一次，续跑时直接复用；先写临时文件再改名，中断时不会留下不完整的数组
+            if not all(os.path.exists(os.path.join(directory, f'{name}.npy')) for name in ARRAY_NAMES):
+                arrays = {
+                    'close': prices['收盘价'][:rows.stop],
+                    'rebalance_rows': rebalance_rows,
+                    'scores': BacktestSweep.dimension_scores(prices, rebalance_rows),
+                    'predicted': predicted,
+                    'codes': np.asarray(prices.codes, dtype=str),
+                    'industries': industries
+                }
+                for name, values in arrays.items():
+                    np.save(os.path.join(directory, f'{name}.tmp.npy'), np.ascontiguousarray(values))
+                    os.replace(os.path.join(directory, f'{name}.tmp.npy'), os.path.join(directory, f'{name}.npy'))
+
+            results_path = os.path.join(directory, 'results.jsonl')
+            done = BacktestSweep._load_results(results_path) if resume else {}
+            keys = [BacktestSweep.task_key(task) for task in params]
+            pending = [(key, task) for key, task in zip(keys, params) if key not in done]
+            logger.info(f"开始参数扫描，参数组数: {len(params)}, 已完成: {len(params) - len(pending)}, 进程数: {n_jobs}")
+
+            start = time.perf_counter()
+            results = {}
+            with open(results_path, 'a' if resume else 'w', encoding='utf-8') as f:
+                def record(key, task, result):
+                    results[key] = {'key': key, **task, **result}
+                    # 每完成一个任务立即落盘，中断后可从此处续跑
+                    f.write(json.dumps(results[key], ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                if n_jobs == 1 or len(pending) <= 1:
+                    global _worker_arrays, _worker_universes
+                    _init_worker(directory)
+                    try:
+                        for key, task in pending:
+                            record(key, task, _run_task(task, rows.start))
+                    finally:
+                        _worker_arrays = None
+                        _worker_universes = None
+                else:
+                    with ProcessPoolExecutor(max_workers=min(n_jobs, len(pending)), initializer=_init_worker,
+                                             initargs=(directory,)) as executor:
+                        futures = {executor.submit(_run_task, task, rows.start): (key, task) for key, task in pending}
+                        for future in as_completed(futures):
+                            key, task = futures[future]
+                            record(key, task, future.result())
+
+            report = []
+            for key in keys:
+                resumed = key not in results
+                report.append({**(done[key] if resumed else results[key]), '续跑': resumed})
+            report = pd.DataFrame(report).drop(columns='key')
+            logger.info(f"参数扫描完成，总耗时: {time.perf_counter() - start:.2f}秒, 结果目录: {directory}")
+            return report
+        except Exception as e:
+            logger.error(f"参数扫描失败: {str(e)}")
+            return pd.DataFrame()
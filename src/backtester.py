@@ -4,48 +4,259 @@ import logging
 
 from utils.logger import Logger
 from utils.config import Config
+from src.data_loader import DataLoader
 logger = Logger.get_logger("backtester")
 
 class Backtester:
-    """回测类"""
+    """
+    回测类
+    在(日期数, 股票数)的收盘价矩阵上按调仓计划计算组合日收益：每个调仓日按收盘价等权买入选中的股票，
+    持有至下一个调仓日。持仓以(调仓次数, 持仓数)的列号和权重数组表示，
+    每日收益由一次性按行号、列号取出的价格计算，不逐日、逐股循环
+
+    停牌缺失的价格沿用最近一次收盘价；调仓日尚无价格的股票视为持有现金
+    """
+
+    TRADING_DAYS = 252
+    EMPTY_RESULTS = {
+        '平均总收益率': 0,
+        '平均胜率': 0,
+        '平均最大回撤': 0,
+        '平均夏普比率': 0
+    }
+
+    @staticmethod
+    def rebalance_schedule(dates, freq: str = None) -> np.ndarray:
+        """
+        生成调仓计划：每个周期的第一个交易日
+        Args:
+            dates: 升序排列的交易日
+            freq: 调仓周期，pandas周期字符串，如'W'、'M'、'Q'，默认读取配置项backtest.rebalance_freq
+        Returns:
+            np.ndarray: 调仓日的行号
+        """
+        freq = freq or Config.get('backtest.rebalance_freq', 'M')
+        periods = pd.DatetimeIndex(dates).to_period(freq).asi8
+        if len(periods) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+
+    @staticmethod
+    def _forward_fill(prices: np.ndarray) -> np.ndarray:
+        """沿日期方向用最近一次有效价格填充缺失值"""
+        valid = ~np.isnan(prices)
+        rows = np.where(valid, np.arange(len(prices))[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return prices[rows, np.arange(prices.shape[1])]
+
+    @staticmethod
+    def portfolio_returns(close: np.ndarray, rebalance_rows: np.ndarray, holdings: np.ndarray,
+                          weights: np.ndarray) -> np.ndarray:
+        """
+        计算组合日收益率
+        Args:
+            close: 形状为(日期数, 股票数)的收盘价矩阵
+            rebalance_rows: 升序排列的调仓日行号
+            holdings: 形状为(调仓次数, 持仓数)的持仓列号，空位可填任意列号并将权重置0
+            weights: 形状同holdings的调仓日权重，每行之和为1，全0表示空仓
+        Returns:
+            np.ndarray: 形状为(日期数,)的日收益率，首个调仓日及之前为0
+        """
+        n_dates = close.shape[0]
+        returns = np.zeros(n_dates)
+        if n_dates < 2 or len(rebalance_rows) == 0:
+            return returns
+
+        # 只对持有过的列填充缺失价格
+        held, columns = np.unique(holdings, return_inverse=True)
+        prices = Backtester._forward_fill(np.asarray(close[:, held], dtype=np.float64))
+        columns = columns.reshape(holdings.shape)
+
+        # 第t日的收益由t-1日收盘时的持仓决定
+        days = np.arange(1, n_dates)
+        period = np.searchsorted(rebalance_rows, days - 1, side='right') - 1
+        active = period >= 0
+        days, period = days[active], period[active]
+        cols = columns[period]
+        w = weights[period]
+        base = prices[rebalance_rows[period][:, None], cols]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            today = prices[days[:, None], cols] / base
+            yesterday = prices[days[:, None] - 1, cols] / base
+        # 调仓日没有价格的股票按现金处理，净值不变
+        cash = np.isnan(base)
+        today[cash] = 1
+        yesterday[cash] = 1
+        value_today = np.sum(w * today, axis=1)
+        value_yesterday = np.sum(w * yesterday, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[days] = np.where(value_yesterday > 0, value_today / value_yesterday - 1, 0)
+        return returns
+
+    @staticmethod
+    def metrics(daily_returns: np.ndarray, rebalance_rows: np.ndarray = None, risk_free_rate: float = None) -> dict:
+        """
+        由组合日收益率计算回测指标
+        Args:
+            daily_returns: 日收益率，首个调仓日之前的部分不参与统计
+            rebalance_rows: 调仓日行号，用于按持有期计算胜率；None表示按日计算
+            risk_free_rate: 年化无风险利率，默认读取配置项backtest.risk_free_rate
+        Returns:
+            dict: 平均总收益率(%)、平均胜率(0~1)、平均最大回撤(%)、平均夏普比率、年化收益率(%)、交易日数、调仓次数
+        """
+        risk_free_rate = Config.get('backtest.risk_free_rate', 0.0) if risk_free_rate is None else risk_free_rate
+        start = int(rebalance_rows[0]) if rebalance_rows is not None and len(rebalance_rows) else 0
+        returns = np.asarray(daily_returns, dtype=np.float64)[start:]
+        n_days = len(returns) - 1
+        if n_days <= 0:
+            return dict(Backtester.EMPTY_RESULTS)
+
+        equity = np.cumprod(1 + returns)
+        drawdown = 1 - equity / np.maximum.accumulate(equity)
+        daily = returns[1:]
+        excess = daily - risk_free_rate / Backtester.TRADING_DAYS
+        std = daily.std(ddof=1) if n_days > 1 else 0.0
+        sharpe = excess.mean() / std * np.sqrt(Backtester.TRADING_DAYS) if std > 0 else 0.0
+
+        if rebalance_rows is not None and len(rebalance_rows):
+            # 每个持有期从调仓日收盘到下一个调仓日(或回测结束)收盘的收益
+            bounds = np.r_[np.asarray(rebalance_rows) - start, len(returns) - 1]
+            bounds = np.unique(bounds)
+            period_returns = equity[bounds[1:]] / equity[bounds[:-1]] - 1
+        else:
+            period_returns = daily
+        win_rate = float(np.mean(period_returns > 0)) if len(period_returns) else 0.0
+
+        return {
+            '平均总收益率': float((equity[-1] - 1) * 100),
+            '平均胜率': win_rate,
+            '平均最大回撤': float(drawdown.max() * 100),
+            '平均夏普比率': float(sharpe),
+            '年化收益率': float((equity[-1] ** (Backtester.TRADING_DAYS / n_days) - 1) * 100),
+            '交易日数': int(n_days),
+            '调仓次数': int(len(rebalance_rows)) if rebalance_rows is not None else 0
+        }
 
     @staticmethod
-    def backtest_strategy(selected_stocks: pd.DataFrame) -> dict:
+    def build_holdings(prices, selections: dict, rows: slice = slice(None)) -> tuple:
         """
-        回测策略
+        将各调仓日的选股结果转换为调仓日行号、持仓列号和等权权重
+        Args:
+            prices: 行情矩阵PriceMatrix
+            selections: 调仓日期到选中股票的映射，取值为股票代码列表或包含股票代码列的DataFrame
+            rows: 回测区间的行切片，返回的行号相对于切片起点
+        Returns:
+            tuple: (调仓日行号, 持仓列号, 权重)；调仓日期不是交易日时顺延到下一个交易日，
+                同一交易日出现多次时以最后一次为准
+        """
+        dates = prices.dates[rows]
+        by_row = {}
+        for date, selected in selections.items():
+            row = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(date), 'ns'), side='left'))
+            if row >= len(dates):
+                continue
+            codes = selected['股票代码'].astype(str).tolist() if isinstance(selected, pd.DataFrame) else list(selected)
+            positions = prices.code_positions(codes)
+            by_row[row] = np.unique(positions[positions >= 0])
+
+        rows = np.array(sorted(by_row), dtype=np.int64)
+        width = max((len(cols) for cols in by_row.values()), default=0)
+        holdings = np.zeros((len(rows), max(width, 1)), dtype=np.int64)
+        weights = np.zeros((len(rows), max(width, 1)))
+        for i, row in enumerate(rows):
+            cols = by_row[row]
+            holdings[i, :len(cols)] = cols
+            if len(cols):
+                weights[i, :len(cols)] = 1.0 / len(cols)
+        return rows, holdings, weights
+
+    @staticmethod
+    def run(prices, selections: dict, start_date: str = None, end_date: str = None) -> dict:
+        """
+        按调仓计划回测各调仓日的选股结果
+        Args:
+            prices: 行情矩阵PriceMatrix，需包含收盘价
+            selections: 调仓日期到选中股票的映射，取值为股票代码列表或StockSelectionStrategies返回的DataFrame
+            start_date: 回测开始日期，None表示行情矩阵的第一天
+            end_date: 回测结束日期，None表示行情矩阵的最后一天
+        Returns:
+            dict: 回测指标，另含'日收益率'(pd.Series，以日期为索引)
+        """
+        rows = prices.date_slice(start_date, end_date)
+        dates = prices.dates[rows]
+        rebalance_rows, holdings, weights = Backtester.build_holdings(prices, selections, rows)
+        # 从矩阵开头计算，区间开始前停牌的股票也能沿用之前的收盘价
+        close = prices['收盘价'][:rows.stop]
+        returns = Backtester.portfolio_returns(close, rebalance_rows + rows.start, holdings, weights)[rows.start:]
+        results = Backtester.metrics(returns, rebalance_rows)
+        results['日收益率'] = pd.Series(returns, index=pd.DatetimeIndex(dates))
+        return results
+
+    @staticmethod
+    def selection_date(selected_stocks: pd.DataFrame) -> pd.Timestamp:
+        """
+        选股结果所依据数据的日期
+        Args:
+            selected_stocks: 选中的股票
+        Returns:
+            pd.Timestamp: 日期列的最大值，没有日期列时为配置项app.stock_end_date
+        """
+        if '日期' in selected_stocks.columns and selected_stocks['日期'].notna().any():
+            return pd.Timestamp(pd.to_datetime(selected_stocks['日期']).max()).normalize()
+        return pd.Timestamp(Config.get('app.stock_end_date', "2023-12-31"))
+
+    @staticmethod
+    def backtest_strategy(selected_stocks: pd.DataFrame, prices=None, start_date: str = None,
+                          end_date: str = None, freq: str = None, as_of: str = None) -> dict:
+        """
+        回测策略：在选股日期之后等权持有选中的股票，每个调仓周期重新恢复等权
+        选股只使用了截至选股日期的数据，回测区间总是从选股日期之后的第一个交易日开始，
+        不在选股所依据的历史区间上评估；需要在历史区间上回测时，应使用run传入各调仓日当时的选股结果
         Args:
             selected_stocks: 选中的股票
+            prices: 行情矩阵，None表示按选中股票和回测区间加载
+            start_date: 回测开始日期，早于选股日期时调整为选股日期之后
+            end_date: 回测结束日期，默认为选股日期之后配置项backtest.holding_days天
+            freq: 调仓周期，默认读取配置项backtest.rebalance_freq
+            as_of: 选股日期，默认为选中股票日期列的最大值，没有日期列时读取配置项app.stock_end_date
         Returns:
             回测结果字典
         """
         try:
             logger.info("开始回测策略")
+            if selected_stocks is None or len(selected_stocks) == 0:
+                logger.warning("没有选中的股票，跳过回测")
+                return dict(Backtester.EMPTY_RESULTS)
+
+            as_of = pd.Timestamp(as_of) if as_of is not None else Backtester.selection_date(selected_stocks)
+            start = as_of + pd.Timedelta(days=1)
+            if start_date is not None and pd.Timestamp(start_date) < start:
+                logger.warning(f"回测开始日期{start_date}不晚于选股日期{as_of.strftime('%Y-%m-%d')}，改为从选股日期之后开始")
+            elif start_date is not None:
+                start = pd.Timestamp(start_date)
+            end = pd.Timestamp(end_date) if end_date is not None else \
+                as_of + pd.Timedelta(days=Config.get('backtest.holding_days', 90))
+            start_date, end_date = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+            if end < start:
+                logger.warning(f"回测结束日期{end_date}早于选股日期之后的第一天，跳过回测")
+                return dict(Backtester.EMPTY_RESULTS)
+
+            codes = selected_stocks['股票代码'].astype(str).tolist()
+            if prices is None:
+                prices = DataLoader.load_price_matrix(codes, start_date, end_date)
+                if prices is None:
+                    return dict(Backtester.EMPTY_RESULTS)
+
+            window = prices.dates[prices.date_slice(start_date, end_date)]
+            if len(window) == 0:
+                logger.warning(f"选股日期之后没有行情: {start_date} 至 {end_date}")
+                return dict(Backtester.EMPTY_RESULTS)
+            schedule = window[Backtester.rebalance_schedule(window, freq)]
+            results = Backtester.run(prices, {date: codes for date in schedule}, start_date, end_date)
+            results.pop('日收益率')
 
-            # 模拟回测结果
-            # 从配置文件获取回测参数范围
-            min_return = Config.get('backtest.min_return', 5)
-            max_return = Config.get('backtest.max_return', 20)
-            min_win_rate = Config.get('backtest.min_win_rate', 0.6)
-            max_win_rate = Config.get('backtest.max_win_rate', 0.8)
-            min_max_drawdown = Config.get('backtest.min_max_drawdown', 5)
-            max_max_drawdown = Config.get('backtest.max_max_drawdown', 15)
-            min_sharpe_ratio = Config.get('backtest.min_sharpe_ratio', 1)
-            max_sharpe_ratio = Config.get('backtest.max_sharpe_ratio', 3)
-
-            results = {
-                '平均总收益率': np.random.uniform(min_return, max_return),
-                '平均胜率': np.random.uniform(min_win_rate, max_win_rate),
-                '平均最大回撤': np.random.uniform(min_max_drawdown, max_max_drawdown),
-                '平均夏普比率': np.random.uniform(min_sharpe_ratio, max_sharpe_ratio)
-            }
-
-            logger.info(f"回测完成，结果: {results}")
+            logger.info(f"回测完成，区间: {start_date} 至 {end_date}，结果: {results}")
             return results
         except Exception as e:
             logger.error(f"回测失败: {str(e)}")
-            return {
-                '平均总收益率': 0,
-                '平均胜率': 0,
-                '平均最大回撤': 0,
-                '平均夏普比率': 0
-            }
\ No newline at end of file
+            return dict(Backtester.EMPTY_RESULTS)
@@ -0,0 +1,319 @@
+import os
+import importlib
+import multiprocessing.util
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.logger import Logger
+from utils.config import Config
+logger = Logger.get_logger("baostock_source")
+
+
+class BaostockError(Exception):
+    """baostock接口返回错误"""
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+    以固定速率补充令牌，桶满时最多允许capacity次突发请求
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        初始化限流器
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量
+        """
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """取走一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _query_history(client, code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """查询单只股票的日线行情，返回原始字段的DataFrame"""
+    rs = client.query_history_k_data_plus(
+        BaostockSource.to_baostock_code(code), BaostockSource.QUERY_FIELDS,
+        start_date=start_date, end_date=end_date, frequency="d", adjustflag="3"
+    )
+    if rs.error_code != '0':
+        raise BaostockError(f"{rs.error_code} {rs.error_msg}")
+    rows = []
+    while rs.next():
+        rows.append(rs.get_row_data())
+    return pd.DataFrame(rows, columns=rs.fields)
+
+
+def _fetch_with_retry(client, bucket: TokenBucket, code: str, start_date: str, end_date: str,
+                      max_retries: int, backoff: float) -> pd.DataFrame:
+    """限流并按指数退避重试查询单只股票"""
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            return _query_history(client, code, start_date, end_date)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            logger.warning(f"查询{code}失败: {str(e)}，{delay:.2f}秒后第{attempt + 1}次重试")
+            time.sleep(delay)
+
+
+# 进程池模式下每个工作进程各自持有一个已登录的baostock会话和限流器
+_worker_client = None
+_worker_bucket = None
+
+
+def _logout_worker() -> None:
+    """工作进程退出时退出baostock会话"""
+    global _worker_client
+    if _worker_client is not None:
+        try:
+            _worker_client.logout()
+        except Exception as e:
+            logger.warning(f"工作进程{os.getpid()}退出baostock登录失败: {str(e)}")
+        _worker_client = None
+
+
+def _init_worker(module_name: str, rate: float, capacity: int) -> None:
+    """工作进程初始化：登录一次baostock，之后的查询复用该会话，进程池关闭时退出登录"""
+    global _worker_client, _worker_bucket
+    client = importlib.import_module(module_name)
+    result = client.login()
+    if getattr(result, 'error_code', '0') != '0':
+        logger.error(f"工作进程{os.getpid()}登录baostock失败: {result.error_code} {result.error_msg}")
+        raise BaostockError(f"登录失败: {result.error_code} {result.error_msg}")
+    _worker_client = client
+    _worker_bucket = TokenBucket(rate, capacity)
+    # 工作进程正常退出时运行，进程池shutdown后每个工作进程各退出一次登录
+    multiprocessing.util.Finalize(None, _logout_worker, exitpriority=10)
+
+
+def _fetch_in_worker(code: str, start_date: str, end_date: str, max_retries: int, backoff: float) -> pd.DataFrame:
+    """工作进程中查询单只股票"""
+    return _fetch_with_retry(_worker_client, _worker_bucket, code, start_date, end_date, max_retries, backoff)
+
+
+class BaostockSource:
+    """
+    baostock行情数据源
+    会话只登录一次并在所有查询间复用，多只股票通过有界工作池并发查询，
+    所有查询共享令牌桶限流，失败时按指数退避重试
+
+    传入client时（如测试用的本地桩对象）使用线程池共享该会话；
+    未传入时使用真实的baostock模块，由于其会话基于进程内单一连接，
+    改为进程池并发，每个工作进程登录一次并分得总速率的一份。
+    进程池在首次查询时创建并在多次fetch_panel间复用，用完后调用close()退出各进程的登录
+    """
+
+    QUERY_FIELDS = "date,open,high,low,close,volume,amount"
+    COLUMN_MAP = {
+        'date': '日期',
+        'open': '开盘价',
+        'close': '收盘价',
+        'high': '最高价',
+        'low': '最低价',
+        'volume': '成交量',
+        'amount': '成交额'
+    }
+
+    def __init__(self, client=None, max_workers: int = None, rate: float = None,
+                 max_retries: int = None, backoff: float = None, module: str = 'baostock'):
+        """
+        初始化数据源
+        Args:
+            client: 提供login/logout/query_history_k_data_plus接口的客户端，None表示在工作进程中使用module
+            max_workers: 并发查询的工作线程/进程数
+            rate: 每秒最多查询次数
+            max_retries: 单只股票查询失败后的最大重试次数
+            backoff: 首次重试前的等待秒数，之后逐次翻倍
+            module: 进程池模式下工作进程导入的客户端模块名
+        """
+        self.client = client
+        self.module = module
+        # 未传入client时查询在进程池中执行，即使当前进程也登录过（如fetch_stock_data）
+        self.use_processes = client is None
+        self.max_workers = max_workers or Config.get('baostock.max_workers', 8)
+        self.rate = rate or Config.get('baostock.rate_per_second', 20)
+        self.max_retries = Config.get('baostock.max_retries', 3) if max_retries is None else max_retries
+        self.backoff = Config.get('baostock.backoff_seconds', 0.5) if backoff is None else backoff
+        self.bucket = TokenBucket(self.rate, self.max_workers)
+        self._logged_in = False
+        self._login_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @staticmethod
+    def to_baostock_code(stock_code: str) -> str:
+        """
+        转换为baostock代码格式
+        Args:
+            stock_code: "600000.SH"、"000001"或"sh.600000"格式的股票代码
+        Returns:
+            str: "sh.600000"格式的股票代码
+        """
+        if '.' in stock_code:
+            left, right = stock_code.split('.', 1)
+            if left.lower() in ('sh', 'sz', 'bj'):
+                return f"{left.lower()}.{right}"
+            return f"{right.lower()}.{left}"
+        if stock_code.startswith(('4', '8', '92')):
+            market = 'bj'
+        elif stock_code.startswith(('6', '9')):
+            market = 'sh'
+        else:
+            market = 'sz'
+        return f"{market}.{stock_code}"
+
+    def login(self) -> None:
+        """登录baostock，已登录时直接复用会话"""
+        with self._login_lock:
+            if self._logged_in:
+                return
+            if self.client is None:
+                self.client = importlib.import_module(self.module)
+            result = self.client.login()
+            if getattr(result, 'error_code', '0') != '0':
+                raise BaostockError(f"登录失败: {result.error_code} {result.error_msg}")
+            self._logged_in = True
+            logger.info("baostock登录成功")
+
+    def logout(self) -> None:
+        """退出baostock会话"""
+        with self._login_lock:
+            if self._logged_in:
+                self.client.logout()
+                self._logged_in = False
+                logger.info("baostock已退出登录")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """获取进程池，首次调用时创建"""
+        with self._pool_lock:
+            if self._pool is None:
+                # 每个工作进程分得总速率的一份，合计不超过rate
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=_init_worker,
+                    initargs=(self.module, self.rate / self.max_workers, 1)
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """丢弃已损坏的进程池（如工作进程登录失败），下次查询时重新创建"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    def close(self) -> None:
+        """关闭进程池，各工作进程退出时退出登录；同时退出当前进程的会话"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+            logger.info("baostock进程池已关闭")
+        self.logout()
+
+    def __enter__(self):
+        if not self.use_processes:
+            self.login()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _normalize(raw: pd.DataFrame, stock_code: str) -> pd.DataFrame:
+        """将baostock返回的字符串字段转换为fetch_stock_data的列格式"""
+        df = raw.rename(columns=BaostockSource.COLUMN_MAP)
+        df['日期'] = pd.to_datetime(df['日期'])
+        for column in ['开盘价', '收盘价', '最高价', '最低价', '成交额']:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        df['成交量'] = pd.to_numeric(df['成交量'], errors='coerce').fillna(0).astype('int64')
+        df.insert(0, '股票代码', stock_code)
+        return df
+
+    def fetch_stock_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        查询单只股票的日线行情
+        Args:
+            stock_code: 股票代码
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            pd.DataFrame: 列同DataLoader.fetch_stock_data
+        """
+        self.login()
+        raw = _fetch_with_retry(self.client, self.bucket, stock_code, start_date, end_date,
+                                self.max_retries, self.backoff)
+        return self._normalize(raw, stock_code).drop(columns=['股票代码'])
+
+    @staticmethod
+    def _collect(futures: dict) -> dict:
+        """等待各股票的查询结果，失败的股票结果为None；进程池损坏时抛出BrokenProcessPool"""
+        results = {}
+        for code, future in futures.items():
+            try:
+                results[code] = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                logger.error(f"查询{code}失败，已放弃: {str(e)}")
+                results[code] = None
+        return results
+
+    def fetch_panel(self, stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        并发查询多只股票的日线行情
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            pd.DataFrame: 长格式面板数据，列同DataLoader.fetch_panel；查询失败的股票会被跳过，
+                并列在attrs['失败股票']中
+        """
+        logger.info(f"baostock并发查询: {len(stock_codes)}只, 工作数: {self.max_workers}, 限速: {self.rate}次/秒")
+        if self.use_processes:
+            pool = self._get_pool()
+            try:
+                futures = {code: pool.submit(_fetch_in_worker, code, start_date, end_date,
+                                             self.max_retries, self.backoff) for code in stock_codes}
+                results = self._collect(futures)
+            except BrokenProcessPool as e:
+                logger.error(f"baostock进程池不可用: {str(e)}")
+                self._discard_pool(pool)
+                results = {code: None for code in stock_codes}
+        else:
+            self.login()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {code: executor.submit(_fetch_with_retry, self.client, self.bucket, code,
+                                                 start_date, end_date, self.max_retries, self.backoff)
+                           for code in stock_codes}
+                results = self._collect(futures)
+
+        frames = [self._normalize(raw, code) for code, raw in results.items() if raw is not None and not raw.empty]
+        failed = [code for code, raw in results.items() if raw is None]
+        logger.info(f"baostock查询完成，成功{len(stock_codes) - len(failed)}只，失败{len(failed)}只")
+        panel = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        # 区分查询失败与查询成功但没有数据（停牌、未上市），供DataLoader判断哪些股票需要重试
+        panel.attrs['失败股票'] = failed
+        return panel
@@ -1,10 +1,17 @@
 import pandas as pd
 import numpy as np
 import logging
-import random
 import datetime
+import hashlib
+import os
 
 from utils.logger import Logger
+from utils.config import Config
+from src.market_data_store import MarketDataStore
+from src.price_matrix import PriceMatrix
+from src.baostock_source import BaostockSource
+from src.data_source import DataSource, SimulatedSource
+from src.performance import PerformanceSeries
 logger = Logger.get_logger("data_loader")
 
 class DataLoader:
@@ -12,8 +19,75 @@ class DataLoader:
     股票数据加载器类
     提供股票历史数据获取和模拟性能数据生成功能
     实际环境中可替换为真实数据源API调用
+    批量数据经由本地行情存储读取，存储中缺失的股票才会重新获取
     """
 
+    _store = None
+    _source = None
+
+    @staticmethod
+    def get_store():
+        """
+        获取当前使用的本地行情存储
+        Returns:
+            MarketDataStore: 配置项data.use_store为False时返回None
+        """
+        if DataLoader._store is None and Config.get('data.use_store', True):
+            DataLoader._store = MarketDataStore()
+        return DataLoader._store
+
+    @staticmethod
+    def set_store(store) -> None:
+        """
+        指定本地行情存储
+        Args:
+            store: MarketDataStore实例，None表示恢复为按配置创建的默认存储
+        """
+        DataLoader._store = store
+
+    @staticmethod
+    def get_source() -> DataSource:
+        """
+        获取当前使用的行情数据源
+        Returns:
+            DataSource: 配置项data.source为"baostock"时返回BaostockSource，否则返回SimulatedSource
+        """
+        if DataLoader._source is None:
+            if Config.get('data.source', 'simulated') == 'baostock':
+                DataLoader._source = BaostockSource()
+            else:
+                DataLoader._source = SimulatedSource()
+        return DataLoader._source
+
+    @staticmethod
+    def set_source(source: DataSource) -> None:
+        """
+        指定行情数据源
+        Args:
+            source: 实现DataSource接口的数据源，None表示恢复为按配置创建
+        """
+        # 被替换的数据源如持有会话或进程池（如BaostockSource），先关闭
+        previous = DataLoader._source
+        if previous is not None and previous is not source and hasattr(previous, 'close'):
+            previous.close()
+        DataLoader._source = source
+
+    @staticmethod
+    def _fetch_from_source(stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """从当前数据源获取面板数据"""
+        return DataLoader.get_source().fetch_panel(stock_codes, start_date, end_date)
+
+    @staticmethod
+    def _fetched_codes(stock_codes: list, fetched: pd.DataFrame) -> list:
+        """
+        从数据源获取后确认已请求成功的股票，成功但没有返回数据的股票（如停牌、未上市）也包含在内
+        数据源在attrs['失败股票']中列出失败的股票时排除这些股票；未列出且结果为空时视为全部失败
+        """
+        if '失败股票' in fetched.attrs:
+            failed = set(fetched.attrs['失败股票'])
+            return [code for code in stock_codes if code not in failed]
+        return [] if fetched.empty else list(stock_codes)
+
     @staticmethod
     def fetch_stock_data(stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -35,18 +109,10 @@ class DataLoader:
         """
         try:
             logger.info(f"获取股票数据: {stock_code}, 日期范围: {start_date} 至 {end_date}")
-            # 模拟股票数据
-            dates = pd.date_range(start=start_date, end=end_date, freq='B')
-            data = {
-                '日期': dates,
-                '开盘价': [random.uniform(10, 100) for _ in range(len(dates))],
-                '收盘价': [random.uniform(10, 100) for _ in range(len(dates))],
-                '最高价': [random.uniform(10, 100) for _ in range(len(dates))],
-                '最低价': [random.uniform(10, 100) for _ in range(len(dates))],
-                '成交量': [random.randint(1000, 100000) for _ in range(len(dates))],
-                '成交额': [random.uniform(10000, 1000000) for _ in range(len(dates))]
-            }
-            df = pd.DataFrame(data)
+            # 经由本地行情存储读取，与批量接口共用同一份数据
+            df = DataLoader.fetch_panel([stock_code], start_date, end_date)
+            if not df.empty:
+                df = df.drop(columns=['股票代码'])
             logger.info(f"成功获取股票数据: {stock_code}, 数据量: {len(df)}")
             return df
         except Exception as e:
@@ -54,10 +120,175 @@ class DataLoader:
             return pd.DataFrame()
 
     @staticmethod
-    def generate_performance_data() -> pd.DataFrame:
+    def fetch_panel(stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        批量获取多只股票指定日期范围的数据
+        优先从本地行情存储读取，已存储但缺少末尾交易日的股票只增量补齐，
+        完全未存储的股票才重新获取整个日期范围并写回存储
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            pd.DataFrame: 长格式面板数据，按传入的股票代码顺序、日期排序，包含以下列
+                - 股票代码: str
+                - 日期、开盘价、收盘价、最高价、最低价、成交量、成交额: 同fetch_stock_data
+            未存储的股票获取失败时只返回已存储的部分，全部失败时返回空DataFrame；
+            获取成功的日期范围记录在存储中，没有数据的股票下次不再重新获取
+        """
+        try:
+            store = DataLoader.get_store()
+            if store is None:
+                return DataLoader._fetch_from_source(stock_codes, start_date, end_date)
+
+            dates = pd.date_range(start=start_date, end=end_date, freq='B')
+            if len(dates) == 0:
+                return DataLoader._fetch_from_source(stock_codes, start_date, end_date)
+            # 已请求过的范围覆盖窗口起点的股票只需补齐末尾缺失的交易日；
+            # 按请求范围而非已存储的首个日期判断，窗口开始后才上市的股票不会每次都重新获取
+            requested = store.requested(stock_codes)
+            requested = requested[requested['请求开始日期'] <= dates[0]]
+            # 末尾是否缺失同样按已请求的结束日期判断，停牌或节假日没有数据的交易日不会被反复请求
+            stale = requested.index[requested['请求结束日期'] < dates[-1]].tolist()
+            if stale:
+                DataLoader.update_incremental(stale, end_date)
+            covered = set(requested.index)
+            missing = [code for code in stock_codes if code not in covered]
+            logger.info(f"本地存储命中{len(covered)}只, 其中增量补齐{len(stale)}只, 需重新获取{len(missing)}只")
+
+            frames = [store.read(list(covered), start_date, end_date)] if covered else []
+            if missing:
+                fresh = DataLoader._fetch_from_source(missing, start_date, end_date)
+                fetched = DataLoader._fetched_codes(missing, fresh)
+                if len(fetched) < len(missing):
+                    logger.warning(f"{len(missing) - len(fetched)}只股票未能获取数据，只返回本地存储中的{len(covered)}只")
+                if not fresh.empty:
+                    store.write(fresh)
+                    frames.append(fresh)
+                store.mark_requested(fetched, start_date, end_date)
+            if not frames:
+                return pd.DataFrame()
+            panel = pd.concat(frames, ignore_index=True)
+
+            # 按传入的股票代码顺序排列
+            order = panel['股票代码'].map(pd.Series(np.arange(len(stock_codes)), index=stock_codes))
+            panel = panel.iloc[np.lexsort((panel['日期'].values, order.values))].reset_index(drop=True)
+            return panel
+        except Exception as e:
+            logger.error(f"批量获取股票数据失败: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def _matrix_key(stock_codes: list, start_date: str, end_date: str) -> str:
+        """行情矩阵的缓存键：股票池、日期范围、数据源及其种子，以及本地行情存储在该日期范围内的版本"""
+        source = DataLoader.get_source()
+        store = DataLoader.get_store()
+        parts = [start_date, end_date, type(source).__name__, str(getattr(source, 'seed', '')),
+                 store.version(start_date, end_date) if store is not None else '']
+        return hashlib.md5("|".join(parts + list(stock_codes)).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def load_price_matrix(stock_codes: list, start_date: str, end_date: str, refresh: bool = False):
+        """
+        获取内存映射的行情矩阵
+        同一股票池、日期范围、数据源和存储版本的矩阵只构建一次并保存到配置项data.matrix_dir下，
+        之后各进程均以只读内存映射方式加载，共享同一份物理内存；存储被写入或追加后自动重新构建
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+            refresh: 是否忽略已保存的矩阵重新构建
+        Returns:
+            PriceMatrix: 行情矩阵，失败时返回None
+        """
+        try:
+            matrix_dir = Config.get('data.matrix_dir', 'data/matrix')
+            directory = os.path.join(matrix_dir, DataLoader._matrix_key(stock_codes, start_date, end_date))
+            if refresh or not os.path.exists(os.path.join(directory, 'codes.npy')):
+                logger.info(f"构建行情矩阵: {len(stock_codes)}只, 日期范围: {start_date} 至 {end_date}")
+                panel = DataLoader.fetch_panel(stock_codes, start_date, end_date)
+                if panel.empty:
+                    return None
+                # 获取数据时可能写入了本地存储，按写入后的版本保存，下次加载时直接命中
+                directory = os.path.join(matrix_dir, DataLoader._matrix_key(stock_codes, start_date, end_date))
+                PriceMatrix.from_panel(panel).save(directory)
+            matrix = PriceMatrix.load(directory)
+            logger.info(f"成功加载行情矩阵: {directory}, 形状: {matrix.shape}")
+            return matrix
+        except Exception as e:
+            logger.error(f"加载行情矩阵失败: {str(e)}")
+            return None
+
+    @staticmethod
+    def update_incremental(stock_codes: list, end_date: str = None) -> int:
+        """
+        增量更新本地行情存储
+        根据每只股票已请求过的结束日期，只获取其后到end_date之间的交易日并原子追加，
+        未请求过的股票从配置项app.stock_start_date开始获取；获取成功的股票即使没有新数据
+        （停牌、节假日）也记录已请求至end_date，下次不再重复请求
+        Args:
+            stock_codes: 股票代码列表
+            end_date: 更新截止日期，默认读取配置项app.stock_end_date
+        Returns:
+            int: 追加的行数，失败时返回0
+        """
+        try:
+            store = DataLoader.get_store()
+            if store is None:
+                logger.warning("未启用本地行情存储，跳过增量更新")
+                return 0
+            end_date = end_date or Config.get('app.stock_end_date', "2023-12-31")
+            default_start = pd.Timestamp(Config.get('app.stock_start_date', "2023-01-01"))
+            logger.info(f"增量更新股票数据: {len(stock_codes)}只, 截止日期: {end_date}")
+
+            # 与fetch_stock_data相同的freq='B'交易日历，从已请求结束日期的下一个交易日开始
+            last_dates = store.requested(stock_codes)['请求结束日期'].reindex(stock_codes)
+            starts = (last_dates + pd.offsets.BDay(1)).fillna(default_start)
+            frames = []
+            requested = []
+            for start, codes in starts.groupby(starts).groups.items():
+                if start <= pd.Timestamp(end_date):
+                    start = start.strftime('%Y-%m-%d')
+                    fetched = DataLoader._fetch_from_source(list(codes), start, end_date)
+                    frames.append(fetched)
+                    requested.append((DataLoader._fetched_codes(list(codes), fetched), start))
+            frames = [f for f in frames if not f.empty]
+            appended = store.append(pd.concat(frames, ignore_index=True)) if frames else 0
+            # 追加成功后再记录请求范围，追加失败时下次重新获取
+            for codes, start in requested:
+                store.mark_requested(codes, start, end_date)
+            if appended:
+                logger.info(f"增量更新完成，追加数据量: {appended}")
+            else:
+                logger.info("本地存储已是最新，无需增量更新")
+            return appended
+        except Exception as e:
+            logger.error(f"增量更新股票数据失败: {str(e)}")
+            return 0
+
+    @staticmethod
+    def latest_rows(panel: pd.DataFrame) -> pd.DataFrame:
+        """
+        取面板数据中每只股票的最新一行
+        Args:
+            panel: fetch_panel返回的长格式面板数据
+        Returns:
+            pd.DataFrame: 每只股票一行，保持股票代码原有顺序
+        """
+        if panel.empty:
+            return panel
+        return panel.groupby('股票代码', sort=False).tail(1).reset_index(drop=True)
+
+    @staticmethod
+    def generate_performance_data(start_date: str = '2023-01-01', end_date: str = '2023-12-31',
+                                  seed: int = None) -> pd.DataFrame:
         """
         生成策略与指数的历史表现对比数据
         用于回测结果可视化和策略有效性评估
+        Args:
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+            seed: 随机种子，默认读取配置项data.seed
         Returns:
             pd.DataFrame: 包含以下列的表现数据
                 - 日期: datetime类型
@@ -67,25 +298,16 @@ class DataLoader:
         """
         try:
             logger.info("生成历史表现数据")
-            # 模拟历史表现数据
-            dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='B')
-            strategy_returns = [0]
-            index_returns = [0]
-            
-            for i in range(1, len(dates)):
-                # 模拟策略收益
-                strategy_returns.append(strategy_returns[-1] + random.uniform(-0.5, 1.0))
-                # 模拟指数收益
-                index_returns.append(index_returns[-1] + random.uniform(-0.5, 0.8))
-                
-            data = {
-                '日期': dates,
-                '策略累计收益': strategy_returns,
-                '上证指数收益': index_returns
+            # 模拟日收益率，再由PerformanceSeries一次性累乘为累计收益曲线
+            dates = pd.date_range(start=start_date, end=end_date, freq='B')
+            rng = np.random.default_rng(Config.get('data.seed', 42) if seed is None else seed)
+            daily_returns = {
+                '策略累计收益': rng.uniform(-0.5, 1.0, size=len(dates)) / 100,
+                '上证指数收益': rng.uniform(-0.5, 0.8, size=len(dates)) / 100
             }
-            df = pd.DataFrame(data)
+            df = PerformanceSeries.build(dates, daily_returns)
             logger.info(f"成功生成历史表现数据，数据量: {len(df)}")
             return df
         except Exception as e:
             logger.error(f"生成历史表现数据失败: {str(e)}")
-            return pd.DataFrame()
\ No newline at end of file
+            return pd.DataFrame()
@@ -0,0 +1,196 @@
+import zlib
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from typing import Protocol, runtime_checkable
+
+from utils.logger import Logger
+from utils.config import Config
+from src.price_matrix import PriceMatrix
+logger = Logger.get_logger("data_source")
+
+
+@runtime_checkable
+class DataSource(Protocol):
+    """
+    行情数据源接口
+    模拟数据、本地行情存储、baostock等后端只需实现fetch_panel即可接入DataLoader
+    """
+
+    def fetch_panel(self, stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        获取多只股票指定日期范围的日线行情
+        Returns:
+            pd.DataFrame: 长格式面板数据，包含股票代码、日期、开盘价、收盘价、最高价、最低价、成交量、成交额；
+                可在attrs['失败股票']中列出查询失败的股票，未列出的股票没有数据时视为该范围内确无行情
+        """
+        ...
+
+
+def _splitmix64(keys: np.ndarray) -> np.ndarray:
+    """splitmix64哈希，将uint64键映射为均匀分布的uint64"""
+    with np.errstate(over='ignore'):
+        z = keys + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class SimulatedSource:
+    """
+    带随机种子的模拟行情数据源
+    按均值回复的对数价格过程向量化生成N只股票×M个交易日的行情，开高低收满足
+    最高价>=max(开盘价, 收盘价)、最低价<=min(开盘价, 收盘价)
+
+    随机数由(种子, 股票代码, 日期)经计数器式哈希得到，同一只股票同一天的随机扰动
+    与同批次的其他股票无关，分批获取与一次性获取的结果一致
+    对数收盘价 = log(基准价) + 漂移×(距基准日EPOCH的工作日数) + 均值回复的扰动，
+    扰动为此前MEMORY_DAYS个工作日随机冲击按REVERSION衰减的加权和，
+    某一天的价格只取决于日期本身、与请求的日期范围无关，分段获取再拼接与一次性获取的结果一致，
+    且价格围绕趋势波动，不会随距基准日的远近无限发散
+    """
+
+    EPOCH = np.datetime64('2023-01-02', 'D')
+    REVERSION = 0.98
+    # 截断到REVERSION**K不超过1e-3的最短窗口，每次请求只需多模拟这些天的随机冲击
+    MEMORY_DAYS = int(np.ceil(np.log(1e-3) / np.log(REVERSION)))
+
+    def __init__(self, seed: int = None):
+        """
+        初始化模拟数据源
+        Args:
+            seed: 随机种子，默认读取配置项data.seed
+        """
+        self.seed = Config.get('data.seed', 42) if seed is None else seed
+
+    def _code_keys(self, stock_codes: list) -> np.ndarray:
+        """股票代码转换为跨进程稳定的uint64键"""
+        keys = [zlib.crc32(str(code).encode('utf-8')) for code in stock_codes]
+        return np.asarray(keys, dtype=np.uint64)
+
+    def _uniform(self, code_keys: np.ndarray, day_keys: np.ndarray, stream: int) -> np.ndarray:
+        """生成形状为(日期数, 股票数)的[0, 1)均匀随机数"""
+        with np.errstate(over='ignore'):
+            base = np.uint64(self.seed) * np.uint64(0x2545F4914F6CDD1D) + np.uint64(stream) * np.uint64(0x9E3779B97F4A7C15)
+            keys = (day_keys[:, None] * np.uint64(0x100000001B3)) ^ (code_keys[None, :] + base)
+        bits = _splitmix64(keys) >> np.uint64(11)
+        return bits.astype(np.float64) * (1.0 / (1 << 53))
+
+    def _normal(self, code_keys: np.ndarray, day_keys: np.ndarray, stream: int) -> np.ndarray:
+        """Box-Muller变换生成标准正态随机数"""
+        u1 = self._uniform(code_keys, day_keys, 2 * stream)
+        u2 = self._uniform(code_keys, day_keys, 2 * stream + 1)
+        return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+
+    def _code_params(self, code_keys: np.ndarray, stream: int, low: float, high: float) -> np.ndarray:
+        """每只股票固定的参数，如基准价、波动率"""
+        u = self._uniform(code_keys, np.zeros(1, dtype=np.uint64), 1000 + stream)[0]
+        return low + (high - low) * u
+
+    @staticmethod
+    def _day_keys(days: np.ndarray) -> np.ndarray:
+        """日期转换为计数器键"""
+        return (days.astype('datetime64[D]').astype(np.int64) + 1).astype(np.uint64)
+
+    def _deviation(self, code_keys: np.ndarray, days: np.ndarray, volatility: np.ndarray) -> np.ndarray:
+        """
+        各工作日的均值回复扰动 x(t) = sum_{j<K} φ^j·ε(t-j)，形状为(日期数, 股票数)
+        在向前延伸K个工作日的窗口上做AR(1)递推a(t) = φ·a(t-1) + ε(t)，
+        再由x(t) = a(t) - φ^K·a(t-K)得到严格截断的K项和，结果与窗口起点无关
+        Args:
+            code_keys: 股票代码键
+            days: 升序、连续的工作日
+            volatility: 每只股票的日波动率
+        """
+        K = self.MEMORY_DAYS
+        first = np.busday_offset(days[0], -K, roll='forward')
+        history = np.arange(first, days[-1] + 1, dtype='datetime64[D]')
+        history = history[np.is_busday(history)]
+        shocks = volatility * self._normal(code_keys, self._day_keys(history), 0)
+        ar = np.vstack([np.zeros((1, len(code_keys))), lfilter([1.0], [1.0, -self.REVERSION], shocks, axis=0)])
+        return ar[K + 1:] - self.REVERSION ** K * ar[1:len(history) - K + 1]
+
+    def generate_arrays(self, stock_codes: list, dates: pd.DatetimeIndex) -> dict:
+        """
+        生成稠密行情数组
+        Args:
+            stock_codes: 股票代码列表
+            dates: 交易日序列
+        Returns:
+            dict: 字段名到(日期数, 股票数)数组的映射
+        """
+        code_keys = self._code_keys(stock_codes)
+        days = dates.values.astype('datetime64[D]')
+        day_keys = self._day_keys(days)
+
+        base_price = self._code_params(code_keys, 0, 5, 100)
+        volatility = self._code_params(code_keys, 1, 0.01, 0.03)
+        drift = self._code_params(code_keys, 2, -0.0005, 0.001)
+        base_volume = self._code_params(code_keys, 3, 1e4, 1e6)
+
+        # 在请求范围内的全部工作日上计算，另多算前一个工作日的收盘价用于开盘价；请求的日期应为工作日
+        log_close = np.empty((len(dates), len(code_keys)))
+        prev_close = np.empty_like(log_close)
+        if len(dates):
+            first = np.busday_offset(days.min(), -1, roll='forward')
+            walk_days = np.arange(first, days.max() + 1, dtype='datetime64[D]')
+            walk_days = walk_days[np.is_busday(walk_days)]
+            trend = np.busday_count(self.EPOCH, walk_days)[:, None] * drift
+            walk = np.log(base_price) + trend + self._deviation(code_keys, walk_days, volatility)
+            rows = np.searchsorted(walk_days, days)
+            log_close = walk[rows]
+            prev_close = walk[rows - 1]
+        close = np.exp(log_close)
+        # 开盘价在前一个工作日收盘价的基础上跳空
+        open_ = np.exp(prev_close) * np.exp(0.3 * volatility * self._normal(code_keys, day_keys, 1))
+        high = np.maximum(open_, close) * np.exp(0.5 * volatility * np.abs(self._normal(code_keys, day_keys, 2)))
+        low = np.minimum(open_, close) * np.exp(-0.5 * volatility * np.abs(self._normal(code_keys, day_keys, 3)))
+        volume = np.rint(base_volume * np.exp(0.3 * self._normal(code_keys, day_keys, 4))).astype(np.int64)
+        amount = volume * (open_ + close + high + low) / 4
+
+        return {
+            '开盘价': open_,
+            '收盘价': close,
+            '最高价': high,
+            '最低价': low,
+            '成交量': volume,
+            '成交额': amount
+        }
+
+    def fetch_panel(self, stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        生成多只股票指定日期范围的模拟行情
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            pd.DataFrame: 长格式面板数据，按股票代码、日期排序
+        """
+        logger.info(f"生成模拟行情: {len(stock_codes)}只, 日期范围: {start_date} 至 {end_date}, 种子: {self.seed}")
+        dates = pd.date_range(start=start_date, end=end_date, freq='B')
+        arrays = self.generate_arrays(stock_codes, dates)
+        n_codes, n_dates = len(stock_codes), len(dates)
+        # (日期数, 股票数)转置后展平即为按股票代码、日期排序的长格式
+        data = {
+            '股票代码': np.repeat(np.asarray(stock_codes, dtype=object), n_dates),
+            '日期': np.tile(dates.values, n_codes)
+        }
+        for field, values in arrays.items():
+            data[field] = values.T.reshape(-1)
+        return pd.DataFrame(data)
+
+    def price_matrix(self, stock_codes: list, start_date: str, end_date: str):
+        """
+        直接生成行情矩阵，不经过长格式DataFrame，用于大规模压测
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            PriceMatrix: 行情矩阵
+        """
+        dates = pd.date_range(start=start_date, end=end_date, freq='B')
+        arrays = self.generate_arrays(stock_codes, dates)
+        arrays['成交量'] = arrays['成交量'].astype(np.float64)
+        return PriceMatrix(dates.values.astype('datetime64[ns]'), np.asarray(stock_codes, dtype=str), arrays)
@@ -3,32 +3,165 @@ import numpy as np
 import logging
 
 from utils.logger import Logger
+from utils.config import Config
+from src.indicators import IndicatorEngine, IndicatorState
+from src.feature_store import FeatureStore
+from src.data_loader import DataLoader
 logger = Logger.get_logger("feature_engineer")
 
 class FeatureEngineer:
     """特征工程类"""
 
+    _feature_store = None
+
+    @staticmethod
+    def get_feature_store():
+        """
+        获取当前使用的特征缓存
+        Returns:
+            FeatureStore: 配置项feature_store.enabled为False时返回None
+        """
+        if FeatureEngineer._feature_store is None and Config.get('feature_store.enabled', True):
+            FeatureEngineer._feature_store = FeatureStore()
+        return FeatureEngineer._feature_store
+
+    @staticmethod
+    def set_feature_store(store) -> None:
+        """
+        指定特征缓存
+        Args:
+            store: FeatureStore实例，None表示恢复为按配置创建的默认缓存
+        """
+        FeatureEngineer._feature_store = store
+
     @staticmethod
     def calculate_dimensions(stock_data: pd.DataFrame) -> pd.DataFrame:
         """
         计算股票的天道、地道、人道得分
+        按(日期, 股票代码)将行情展开为二维数组，由IndicatorEngine一次计算整个股票池的得分
         Args:
-            stock_data: 股票数据
+            stock_data: 股票数据，包含日期、收盘价，可选成交量、成交额；
+                含股票代码列时视为多只股票的长格式面板数据，否则视为单只股票的时间序列
         Returns:
             包含维度得分的DataFrame
         """
         try:
             logger.info("计算股票维度得分")
-            # 模拟计算维度得分
-            stock_data['天道得分'] = np.random.uniform(60, 95, size=len(stock_data))
-            stock_data['地道得分'] = np.random.uniform(60, 95, size=len(stock_data))
-            stock_data['人道得分'] = np.random.uniform(60, 95, size=len(stock_data))
+            if '股票代码' in stock_data.columns:
+                codes = stock_data['股票代码']
+            else:
+                codes = pd.Series(0, index=stock_data.index)
+            code_index = pd.Index(pd.unique(codes))
+            date_index = pd.Index(np.sort(pd.unique(stock_data['日期'])))
+            code_idx = code_index.get_indexer(codes)
+            date_idx = date_index.get_indexer(stock_data['日期'])
+
+            def to_matrix(column):
+                if column not in stock_data.columns:
+                    return None
+                matrix = np.full((len(date_index), len(code_index)), np.nan)
+                matrix[date_idx, code_idx] = stock_data[column].to_numpy(dtype=np.float64)
+                return matrix
+
+            scores = IndicatorEngine.compute(to_matrix('收盘价'), to_matrix('成交量'), to_matrix('成交额'))
+            for name, matrix in scores.items():
+                stock_data[name] = matrix[date_idx, code_idx]
             logger.info(f"成功计算维度得分，数据量: {len(stock_data)}")
             return stock_data
         except Exception as e:
             logger.error(f"计算维度得分失败: {str(e)}")
             return stock_data
 
+    @staticmethod
+    def cached_dimensions(stock_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        计算维度得分，输入行情与特征集均未变化时直接读取缓存的得分
+        Args:
+            stock_data: 同calculate_dimensions
+        Returns:
+            包含维度得分的DataFrame
+        """
+        store = FeatureEngineer.get_feature_store()
+        if store is None:
+            return FeatureEngineer.calculate_dimensions(stock_data)
+        try:
+            return store.get_or_compute(stock_data, FeatureEngineer.calculate_dimensions)
+        except Exception as e:
+            logger.error(f"读取特征缓存失败，改为直接计算: {str(e)}")
+            return FeatureEngineer.calculate_dimensions(stock_data)
+
+    @staticmethod
+    def snapshot(as_of_date: str, stock_codes: list, lookback: int = None) -> pd.DataFrame:
+        """
+        计算指定日期的维度得分截面，只获取并计算指标所需的回看窗口
+        EMA和Wilder RSI从窗口起点开始递推，与在更长历史上计算的结果略有差异
+        Args:
+            as_of_date: 截面日期，格式为"YYYY-MM-DD"
+            stock_codes: 股票代码列表
+            lookback: 每只股票使用的K线数，默认为IndicatorEngine.LOOKBACK
+        Returns:
+            pd.DataFrame: 每只股票一行，为截至as_of_date的最新行情及维度得分，保持股票代码顺序
+        """
+        try:
+            lookback = lookback or IndicatorEngine.LOOKBACK
+            end = pd.Timestamp(as_of_date)
+            # 按工作日回推并留出余量覆盖节假日，多取的K线在下面截掉
+            start = end - pd.offsets.BDay(int(lookback * 1.2) + 5)
+            logger.info(f"计算维度得分截面: {as_of_date}, {len(stock_codes)}只, 回看{lookback}根K线")
+            panel = DataLoader.fetch_panel(stock_codes, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+            if panel.empty:
+                return panel
+            panel = panel.groupby('股票代码', sort=False).tail(lookback).reset_index(drop=True)
+            panel = FeatureEngineer.cached_dimensions(panel)
+            return DataLoader.latest_rows(panel)
+        except Exception as e:
+            logger.error(f"计算维度得分截面失败: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def build_state(stock_data: pd.DataFrame) -> IndicatorState:
+        """
+        由历史行情构建增量指标状态
+        Args:
+            stock_data: 长格式面板数据，包含股票代码、日期、收盘价，可选成交量、成交额
+        Returns:
+            IndicatorState: 已处理完全部历史的指标状态
+        """
+        logger.info(f"构建增量指标状态，数据量: {len(stock_data)}")
+        state = IndicatorState(pd.unique(stock_data['股票代码']))
+        for _, bars in stock_data.sort_values('日期', kind='stable').groupby('日期', sort=True):
+            FeatureEngineer._feed(state, bars)
+        return state
+
+    @staticmethod
+    def update_dimensions(state: IndicatorState, bars: pd.DataFrame) -> pd.DataFrame:
+        """
+        输入每只股票的一根新K线，增量更新并返回维度得分，不读取历史数据
+        Args:
+            state: build_state或IndicatorState.load得到的指标状态，会被原地更新
+            bars: 新K线，每只股票至多一行，包含股票代码、收盘价，可选日期、成交量、成交额
+        Returns:
+            pd.DataFrame: 每只股票一行，包含股票代码、天道得分、地道得分、人道得分
+        """
+        try:
+            logger.info(f"增量更新维度得分，K线数: {len(bars)}")
+            FeatureEngineer._feed(state, bars)
+            scores = state.scores()
+            df = pd.DataFrame({'股票代码': state.codes})
+            for name, values in scores.items():
+                df[name] = values
+            return df
+        except Exception as e:
+            logger.error(f"增量更新维度得分失败: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def _feed(state: IndicatorState, bars: pd.DataFrame) -> None:
+        """将一批K线送入指标状态"""
+        column = lambda name: bars[name].to_numpy() if name in bars.columns else None
+        state.update(bars['股票代码'].to_numpy(), bars['收盘价'].to_numpy(),
+                     column('成交量'), column('成交额'), column('日期'))
+
     @staticmethod
     def create_target_variable(stock_data: pd.DataFrame) -> pd.DataFrame:
         """
@@ -0,0 +1,197 @@
+import hashlib
+import inspect
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from utils.logger import Logger
+from utils.config import Config
+from src import indicators
+logger = Logger.get_logger("feature_store")
+
+
+class FeatureStore:
+    """
+    维度得分缓存
+    以(股票代码集合, 日期范围, 特征集版本, 输入数据哈希)为键，将计算好的得分列
+    持久化为Parquet文件，前面加一层进程内LRU缓存；数据不变时重复选股直接复用得分
+
+    特征集指纹由FEATURE_SET_VERSION、指标代码和指标窗口参数共同决定，
+    任一变化都会落到新的目录中，旧指纹目录在初始化时清理
+    """
+
+    # 调整得分的含义但指标代码未变时（如改变得分映射规则）需手动递增
+    FEATURE_SET_VERSION = 1
+    INPUT_COLUMNS = ['股票代码', '日期', '收盘价', '成交量', '成交额']
+    SCORE_COLUMNS = ['天道得分', '地道得分', '人道得分']
+
+    def __init__(self, root_dir: str = None, max_items: int = None):
+        """
+        初始化特征缓存
+        Args:
+            root_dir: 缓存根目录，默认读取配置项feature_store.dir
+            max_items: 内存中最多缓存的条目数，默认读取配置项feature_store.memory_items
+        """
+        self.root_dir = root_dir or Config.get('feature_store.dir', 'data/features')
+        self.max_items = max_items or Config.get('feature_store.memory_items', 8)
+        self.fingerprint = self.feature_fingerprint()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prune()
+
+    @staticmethod
+    def feature_fingerprint() -> str:
+        """
+        计算特征集指纹
+        Returns:
+            str: 由特征集版本、指标模块源码和指标窗口参数得到的哈希
+        """
+        engine = indicators.IndicatorEngine
+        params = sorted((name, getattr(engine, name)) for name in dir(engine) if name.isupper())
+        digest = hashlib.md5()
+        digest.update(str(FeatureStore.FEATURE_SET_VERSION).encode('utf-8'))
+        digest.update(inspect.getsource(indicators).encode('utf-8'))
+        digest.update(repr(params).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def data_hash(stock_data: pd.DataFrame) -> str:
+        """
+        计算输入行情的内容哈希，行顺序不同视为不同数据
+        Args:
+            stock_data: 行情数据
+        Returns:
+            str: 十六进制哈希
+        """
+        digest = hashlib.md5()
+        for column in FeatureStore.INPUT_COLUMNS:
+            if column not in stock_data.columns:
+                continue
+            digest.update(column.encode('utf-8'))
+            values = stock_data[column]
+            # 字符串等非数值列的内存表示为对象指针，需先按值哈希
+            if not (isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM'):
+                values = pd.util.hash_pandas_object(values, index=False)
+            digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+        return digest.hexdigest()
+
+    def make_key(self, stock_data: pd.DataFrame) -> str:
+        """
+        生成缓存键
+        Args:
+            stock_data: 行情数据
+        Returns:
+            str: 由股票代码集合、日期范围、特征集指纹和数据哈希得到的键
+        """
+        if '股票代码' in stock_data.columns:
+            codes = np.sort(pd.unique(stock_data['股票代码']).astype(str))
+        else:
+            codes = np.array([], dtype=str)
+        dates = stock_data['日期']
+        parts = [
+            hashlib.md5('\n'.join(codes).encode('utf-8')).hexdigest(),
+            str(dates.min()) if len(dates) else '',
+            str(dates.max()) if len(dates) else '',
+            self.fingerprint,
+            self.data_hash(stock_data)
+        ]
+        return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, self.fingerprint, f"{key}.parquet")
+
+    def _remember(self, key: str, scores: pd.DataFrame) -> None:
+        """放入内存LRU，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._memory[key] = scores
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        按键读取得分列，依次查找内存和磁盘
+        Args:
+            key: 缓存键
+        Returns:
+            pd.DataFrame: 得分列，未命中时返回None
+        """
+        with self._lock:
+            scores = self._memory.get(key)
+            if scores is not None:
+                self._memory.move_to_end(key)
+                return scores
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            scores = pd.read_parquet(path)
+        except Exception as e:
+            logger.error(f"读取特征缓存失败: {str(e)}")
+            return None
+        self._remember(key, scores)
+        return scores
+
+    def put(self, key: str, scores: pd.DataFrame) -> None:
+        """
+        写入得分列，先写临时文件再原子替换
+        Args:
+            key: 缓存键
+            scores: 得分列
+        """
+        scores = scores.reset_index(drop=True)
+        self._remember(key, scores)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            scores.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"写入特征缓存失败: {str(e)}")
+
+    def get_or_compute(self, stock_data: pd.DataFrame, compute) -> pd.DataFrame:
+        """
+        返回带维度得分的行情数据，命中缓存时跳过计算
+        Args:
+            stock_data: 行情数据
+            compute: 未命中时调用的计算函数，输入行情数据，返回带得分列的DataFrame
+        Returns:
+            pd.DataFrame: 带维度得分的行情数据
+        """
+        key = self.make_key(stock_data)
+        scores = self.get(key)
+        if scores is not None and len(scores) == len(stock_data):
+            self.hits += 1
+            logger.info(f"特征缓存命中: {key}")
+            result = stock_data.copy()
+            for column in self.SCORE_COLUMNS:
+                result[column] = scores[column].to_numpy()
+            return result
+
+        self.misses += 1
+        result = compute(stock_data)
+        if all(column in result.columns for column in self.SCORE_COLUMNS):
+            self.put(key, result[self.SCORE_COLUMNS])
+        return result
+
+    def invalidate(self) -> None:
+        """清空内存缓存和全部磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+        logger.info(f"特征缓存已清空: {self.root_dir}")
+
+    def prune(self) -> None:
+        """删除与当前特征集指纹不符的磁盘缓存"""
+        if not os.path.isdir(self.root_dir):
+            return
+        for name in os.listdir(self.root_dir):
+            if name != self.fingerprint:
+                shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+                logger.info(f"已清理过期的特征缓存: {name}")
@@ -0,0 +1,218 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from utils.logger import Logger
+from utils.config import Config
+logger = Logger.get_logger("forest_engine")
+
+
+class FlatForest:
+    """
+    扁平数组形式的随机森林推理引擎
+    将所有树的节点拼接为feature、threshold、left、right、value五个数组，
+    对(样本, 树)对同时逐层下行，每层只需几次numpy向量运算，避免sklearn逐棵树调用的开销
+
+    与sklearn一致，比较前先将特征转换为float32；
+    由Pipeline导出时一并保存StandardScaler的均值和标准差
+
+    只适合小批量打分：逐层下行的开销随样本数×树数增长，100棵树时约几百行以上即慢于sklearn
+    （5000行约为sklearn的2~3倍耗时）。由from_sklearn导出时保留原模型，
+    样本数超过配置项model.flat_max_rows时直接交给原模型预测；从文件加载的引擎没有原模型，始终使用扁平数组
+    """
+
+    ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes', 'mean', 'scale')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, classes: np.ndarray = None,
+                 mean: np.ndarray = None, scale: np.ndarray = None, estimator=None):
+        """
+        初始化推理引擎
+        Args:
+            feature: 每个节点的分裂特征，叶节点为-1
+            threshold: 每个节点的分裂阈值，特征值<=阈值时走左子节点
+            left: 左子节点的全局序号，叶节点为-1
+            right: 右子节点的全局序号，叶节点为-1
+            value: 形状为(节点数, 输出数)的叶节点取值，分类模型为各类别概率
+            roots: 每棵树根节点的全局序号
+            classes: 分类模型的类别，回归模型为None
+            mean: 标准化均值，None表示不做标准化
+            scale: 标准化标准差
+            estimator: 导出来源的sklearn模型或Pipeline，大批量时用于预测，None表示始终使用扁平数组
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.mean = mean
+        self.scale = scale
+        self.estimator = estimator
+        # 子节点交错存放，下标为 节点序号*2+是否走左子节点
+        self._children = np.stack([right, left], axis=1).reshape(-1)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def is_classifier(self) -> bool:
+        return self.classes is not None
+
+    @staticmethod
+    def from_sklearn(model) -> 'FlatForest':
+        """
+        从sklearn随机森林或以随机森林结尾的Pipeline导出
+        Args:
+            model: RandomForestClassifier、RandomForestRegressor，或[StandardScaler, 随机森林]组成的Pipeline
+        Returns:
+            FlatForest: 推理引擎
+        """
+        source = model
+        mean = scale = None
+        if isinstance(model, Pipeline):
+            steps = [step for _, step in model.steps]
+            for step in steps[:-1]:
+                if not isinstance(step, StandardScaler):
+                    raise TypeError(f"不支持的预处理步骤: {type(step).__name__}")
+                mean = step.mean_ if step.with_mean else np.zeros(step.n_features_in_)
+                scale = step.scale_ if step.with_std else np.ones(step.n_features_in_)
+            model = steps[-1]
+        if not isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+            raise TypeError(f"不支持的模型类型: {type(model).__name__}")
+
+        is_classifier = isinstance(model, RandomForestClassifier)
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            leaf = tree.children_left == -1
+            features.append(np.where(leaf, -1, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(leaf, -1, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, -1, tree.children_right + offset).astype(np.int32))
+            value = tree.value[:, 0, :] if is_classifier else tree.value[:, :, 0]
+            if is_classifier:
+                # 叶节点取值归一化为类别概率，与DecisionTreeClassifier.predict_proba一致
+                total = value.sum(axis=1, keepdims=True)
+                value = np.divide(value, total, out=np.zeros_like(value, dtype=np.float64), where=total > 0)
+            values.append(value.astype(np.float64))
+            roots.append(offset)
+            offset += tree.node_count
+
+        return FlatForest(
+            np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+            np.concatenate(rights), np.concatenate(values), np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_) if is_classifier else None,
+            mean=None if mean is None else np.asarray(mean, dtype=np.float64),
+            scale=None if scale is None else np.asarray(scale, dtype=np.float64),
+            estimator=source
+        )
+
+    def _prepare(self, X) -> np.ndarray:
+        """标准化并转换为float32，与sklearn的输入校验一致"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def apply(self, X) -> np.ndarray:
+        """
+        计算每个样本在每棵树中落入的叶节点
+        Args:
+            X: 形状为(样本数, 特征数)的特征矩阵
+        Returns:
+            np.ndarray: 形状为(样本数, 树数)的叶节点全局序号
+        """
+        X = self._prepare(X)
+        n_samples, n_features = X.shape
+        n_trees = self.n_trees
+        flat_X = X.reshape(-1)
+        nodes = np.tile(self.roots, n_samples)
+        # 活跃的(样本, 树)对编号为 样本序号*树数+树序号，到达叶节点的对逐层移出
+        active = np.arange(len(nodes), dtype=np.int64)
+        current = nodes
+        while True:
+            feature = self.feature[current]
+            internal = feature >= 0
+            if not internal.all():
+                active, current, feature = active[internal], current[internal], feature[internal]
+            if len(active) == 0:
+                break
+            go_left = flat_X[(active // n_trees) * n_features + feature] <= self.threshold[current]
+            current = self._children[current * 2 + go_left]
+            nodes[active] = current
+        return nodes.reshape(n_samples, n_trees)
+
+    def _mean_value(self, X, chunk_size: int = None) -> np.ndarray:
+        """按块计算所有树叶节点取值的平均"""
+        chunk_size = chunk_size or Config.get('model.predict_chunk_size', 100000)
+        X = np.asarray(X)
+        out = np.empty((len(X), self.value.shape[1]))
+        # 每块同时展开(样本数×树数)个节点，按树数缩小块的行数以控制内存
+        rows = max(1, chunk_size // max(1, self.n_trees))
+        for start in range(0, len(X), rows):
+            leaves = self.apply(X[start:start + rows])
+            out[start:start + rows] = self.value[leaves].mean(axis=1)
+        return out
+
+    def _use_estimator(self, X) -> bool:
+        """样本数超过配置项model.flat_max_rows且保留了原模型时，交给原模型预测"""
+        return self.estimator is not None and len(X) > Config.get('model.flat_max_rows', 500)
+
+    def predict_proba(self, X, chunk_size: int = None) -> np.ndarray:
+        """
+        预测各类别概率，等价于RandomForestClassifier.predict_proba
+        Args:
+            X: 特征矩阵
+            chunk_size: 每块展开的(样本, 树)对数上限，默认读取配置项model.predict_chunk_size
+        Returns:
+            np.ndarray: 形状为(样本数, 类别数)的概率
+        """
+        if not self.is_classifier:
+            raise TypeError("回归模型不支持predict_proba")
+        if self._use_estimator(X):
+            return self.estimator.predict_proba(np.asarray(X, dtype=np.float64))
+        return self._mean_value(X, chunk_size)
+
+    def predict(self, X, chunk_size: int = None) -> np.ndarray:
+        """
+        预测，分类模型返回概率最大的类别，回归模型返回各树平均值
+        Args:
+            X: 特征矩阵
+            chunk_size: 每块展开的(样本, 树)对数上限，默认读取配置项model.predict_chunk_size
+        Returns:
+            np.ndarray: 预测结果
+        """
+        if self._use_estimator(X):
+            return self.estimator.predict(np.asarray(X, dtype=np.float64))
+        values = self._mean_value(X, chunk_size)
+        if self.is_classifier:
+            return self.classes[np.argmax(values, axis=1)]
+        return values[:, 0] if values.shape[1] == 1 else values
+
+    def save(self, path: str) -> None:
+        """
+        保存为.npz文件
+        Args:
+            path: 文件路径
+        """
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS if getattr(self, name) is not None}
+        np.savez(path, **arrays)
+        logger.info(f"扁平随机森林已保存至: {path}, 树数: {self.n_trees}, 节点数: {len(self.feature)}")
+
+    @staticmethod
+    def load(path: str) -> 'FlatForest':
+        """
+        从.npz文件加载
+        Args:
+            path: 文件路径
+        Returns:
+            FlatForest: 推理引擎
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] if name in data else None for name in FlatForest.ARRAY_FIELDS}
+        return FlatForest(**arrays)
@@ -0,0 +1,441 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IndicatorEngine:
+    """
+    技术指标引擎
+    所有指标均在形状为(日期数, 股票数)的二维数组上按时间轴计算，一次覆盖整个股票池
+
+    天道(趋势): 收盘价相对20日均线、EMA12/EMA26、20日动量、14日Wilder RSI
+    地道(基本面代理): 20日波动率、相对60日最高价的回撤、收盘价相对60日均线
+    人道(量能/情绪): 量比、成交额5日均值相对20日均值的变化
+    各分项先映射到(0, 1)，维度得分为分项均值线性映射到[60, 95]，缺失的分项不参与平均
+    """
+
+    MA_SHORT = 20
+    MA_LONG = 60
+    EMA_FAST = 12
+    EMA_SLOW = 26
+    MOMENTUM = 20
+    RSI_PERIOD = 14
+    VOLATILITY = 20
+    VOLUME_RATIO = 5
+    TURNOVER_SHORT = 5
+    TURNOVER_LONG = 20
+    # 计算最后一天所有指标需要的最少历史天数
+    LOOKBACK = MA_LONG + 1
+
+    SCORE_MIN = 60
+    SCORE_MAX = 95
+
+    @staticmethod
+    def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+        """沿时间轴的滑动均值，历史不足window天或窗口内有缺失值的位置为NaN"""
+        out = np.full(x.shape, np.nan)
+        if len(x) < window:
+            return out
+        valid = ~np.isnan(x)
+        pad = np.zeros((1,) + x.shape[1:])
+        csum = np.cumsum(np.concatenate([pad, np.where(valid, x, 0)]), axis=0)
+        ccount = np.cumsum(np.concatenate([pad, valid]), axis=0)
+        total = csum[window:] - csum[:-window]
+        count = ccount[window:] - ccount[:-window]
+        out[window - 1:] = np.where(count == window, total / window, np.nan)
+        return out
+
+    @staticmethod
+    def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+        """沿时间轴的滑动总体标准差"""
+        mean = IndicatorEngine.rolling_mean(x, window)
+        mean_sq = IndicatorEngine.rolling_mean(x * x, window)
+        return np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+
+    @staticmethod
+    def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+        """沿时间轴的滑动最大值"""
+        out = np.full(x.shape, np.nan)
+        if len(x) < window:
+            return out
+        out[window - 1:] = sliding_window_view(x, window, axis=0).max(axis=-1)
+        return out
+
+    @staticmethod
+    def shift(x: np.ndarray, periods: int) -> np.ndarray:
+        """沿时间轴向后平移periods天，空出的位置为NaN"""
+        out = np.full(x.shape, np.nan)
+        if periods < len(x):
+            out[periods:] = x[:len(x) - periods]
+        return out
+
+    @staticmethod
+    def ema(x: np.ndarray, span: int) -> np.ndarray:
+        """
+        指数移动平均，首个有效值取原值，与pandas ewm(span, adjust=False)一致
+        缺失值当天沿用前值
+        """
+        alpha = 2.0 / (span + 1)
+        out = np.empty(x.shape)
+        if len(x) == 0:
+            return out
+        out[0] = x[0]
+        for t in range(1, len(x)):
+            prev = out[t - 1]
+            value = np.where(np.isnan(prev), x[t], prev + alpha * (x[t] - prev))
+            out[t] = np.where(np.isnan(x[t]), prev, value)
+        return out
+
+    @staticmethod
+    def wilder_rsi(close: np.ndarray, period: int) -> np.ndarray:
+        """
+        Wilder平滑的RSI
+        前period个涨跌幅的简单均值作为初值，之后按(前值*(period-1)+当日)/period递推
+        """
+        out = np.full(close.shape, np.nan)
+        if len(close) <= period:
+            return out
+        diff = np.diff(close, axis=0)
+        gain = np.where(diff > 0, diff, 0.0)
+        loss = np.where(diff < 0, -diff, 0.0)
+        avg_gain = gain[:period].mean(axis=0)
+        avg_loss = loss[:period].mean(axis=0)
+        out[period] = IndicatorEngine._rsi(avg_gain, avg_loss)
+        for t in range(period, len(diff)):
+            avg_gain = (avg_gain * (period - 1) + gain[t]) / period
+            avg_loss = (avg_loss * (period - 1) + loss[t]) / period
+            out[t + 1] = IndicatorEngine._rsi(avg_gain, avg_loss)
+        return out
+
+    @staticmethod
+    def _rsi(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+        """由平均涨幅、平均跌幅计算RSI，无涨跌时为50"""
+        total = avg_gain + avg_loss
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, 100 * avg_gain / total, 50.0)
+
+    @staticmethod
+    def _sigmoid(x: np.ndarray, scale: float) -> np.ndarray:
+        """将以0为中心的指标映射到(0, 1)"""
+        return 1 / (1 + np.exp(-np.clip(x / scale, -50, 50)))
+
+    @staticmethod
+    def compute_indicators(close: np.ndarray, volume: np.ndarray = None, amount: np.ndarray = None) -> dict:
+        """
+        计算原始技术指标
+        Args:
+            close: 收盘价，形状(日期数, 股票数)
+            volume: 成交量，可为None
+            amount: 成交额，可为None
+        Returns:
+            dict: 指标名到同形状数组的映射
+        """
+        E = IndicatorEngine
+        close = np.asarray(close, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.full(close.shape, np.nan)
+            log_returns[1:] = np.log(close[1:] / close[:-1])
+
+            indicators = {
+                '均线偏离': close / E.rolling_mean(close, E.MA_SHORT) - 1,
+                'EMA偏离': E.ema(close, E.EMA_FAST) / E.ema(close, E.EMA_SLOW) - 1,
+                '动量': close / E.shift(close, E.MOMENTUM) - 1,
+                'RSI': E.wilder_rsi(close, E.RSI_PERIOD),
+                '波动率': E.rolling_std(log_returns, E.VOLATILITY),
+                '回撤': close / E.rolling_max(close, E.MA_LONG) - 1,
+                '长期均线偏离': close / E.rolling_mean(close, E.MA_LONG) - 1
+            }
+            if volume is not None:
+                volume = np.asarray(volume, dtype=np.float64)
+                prev_mean = E.shift(E.rolling_mean(volume, E.VOLUME_RATIO), 1)
+                indicators['量比'] = volume / prev_mean
+            if amount is not None:
+                amount = np.asarray(amount, dtype=np.float64)
+                indicators['成交额变化'] = (E.rolling_mean(amount, E.TURNOVER_SHORT)
+                                       / E.rolling_mean(amount, E.TURNOVER_LONG) - 1)
+        return indicators
+
+    @staticmethod
+    def score_dimensions(indicators: dict) -> dict:
+        """
+        由原始指标计算三个维度得分
+        Args:
+            indicators: compute_indicators返回的指标
+        Returns:
+            dict: 天道得分、地道得分、人道得分到同形状数组的映射
+        """
+        E = IndicatorEngine
+        shape = indicators['均线偏离'].shape
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trend = [
+                E._sigmoid(indicators['均线偏离'], 0.05),
+                E._sigmoid(indicators['EMA偏离'], 0.03),
+                E._sigmoid(indicators['动量'], 0.10),
+                indicators['RSI'] / 100
+            ]
+            fundamental = [
+                1 - E._sigmoid(indicators['波动率'] - 0.02, 0.01),
+                E._sigmoid(indicators['回撤'] + 0.10, 0.05),
+                E._sigmoid(indicators['长期均线偏离'], 0.10)
+            ]
+            sentiment = []
+            if '量比' in indicators:
+                sentiment.append(E._sigmoid(np.log(indicators['量比']), 0.5))
+            if '成交额变化' in indicators:
+                sentiment.append(E._sigmoid(indicators['成交额变化'], 0.3))
+
+        scores = {}
+        for name, parts in (('天道得分', trend), ('地道得分', fundamental), ('人道得分', sentiment)):
+            scores[name] = E._combine(parts, shape)
+        return scores
+
+    @staticmethod
+    def _combine(parts: list, shape: tuple) -> np.ndarray:
+        """分项取均值后映射到得分区间，全部缺失时取区间中点"""
+        if parts:
+            stacked = np.stack(parts)
+            valid = ~np.isnan(stacked)
+            count = valid.sum(axis=0)
+            total = np.where(valid, stacked, 0).sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = np.where(count > 0, total / count, 0.5)
+        else:
+            mean = np.full(shape, 0.5)
+        return IndicatorEngine.SCORE_MIN + (IndicatorEngine.SCORE_MAX - IndicatorEngine.SCORE_MIN) * mean
+
+    @staticmethod
+    def compute(close: np.ndarray, volume: np.ndarray = None, amount: np.ndarray = None) -> dict:
+        """
+        计算三个维度得分
+        Args:
+            close: 收盘价，形状(日期数, 股票数)
+            volume: 成交量，可为None
+            amount: 成交额，可为None
+        Returns:
+            dict: 天道得分、地道得分、人道得分到同形状数组的映射
+        """
+        return IndicatorEngine.score_dimensions(IndicatorEngine.compute_indicators(close, volume, amount))
+
+
+class IndicatorState:
+    """
+    技术指标的增量计算状态
+    每只股票保存滑动窗口的环形缓冲和累计和、EMA、Wilder RSI的递推状态，
+    新到一根K线时只更新该股票的状态，不回溯历史；60日最高价需扫描其60天缓冲
+    状态可通过save/load序列化，结果与IndicatorEngine在完整历史上的计算一致
+    """
+
+    E = IndicatorEngine
+    CLOSE_WINDOW = IndicatorEngine.LOOKBACK
+    INDICATORS = ('均线偏离', 'EMA偏离', '动量', 'RSI', '波动率', '回撤', '长期均线偏离', '量比', '成交额变化')
+    # 每只股票一个值的状态
+    VECTOR_FIELDS = (
+        'close_sum_short', 'close_sum_long', 'return_sum', 'return_sq_sum', 'volume_sum',
+        'amount_sum_short', 'amount_sum_long', 'ema_fast', 'ema_slow', 'prev_close', 'avg_gain', 'avg_loss',
+        'volume_count', 'amount_count_short', 'amount_count_long'
+    )
+    # 每只股票一列的环形缓冲
+    BUFFER_FIELDS = ('close_buf', 'return_buf', 'volume_buf', 'amount_buf')
+    ARRAY_FIELDS = ('n_seen', 'last_date', 'indicators') + BUFFER_FIELDS + VECTOR_FIELDS
+
+    def __init__(self, codes=()):
+        """
+        初始化空状态
+        Args:
+            codes: 股票代码列表
+        """
+        self.codes = np.asarray([], dtype=str)
+        self._code_index = {}
+        self.n_seen = np.zeros(0, dtype=np.int64)
+        self.last_date = np.zeros(0, dtype='datetime64[ns]')
+        self.close_buf = np.zeros((self.CLOSE_WINDOW, 0))
+        self.return_buf = np.zeros((self.E.VOLATILITY, 0))
+        self.volume_buf = np.zeros((self.E.VOLUME_RATIO, 0))
+        self.amount_buf = np.zeros((self.E.TURNOVER_LONG, 0))
+        for name in self.VECTOR_FIELDS:
+            setattr(self, name, np.zeros(0))
+        self.indicators = np.zeros((len(self.INDICATORS), 0))
+        self._add_codes(list(codes))
+
+    def _add_codes(self, codes: list) -> None:
+        """为新出现的股票扩充状态数组"""
+        new_codes = [c for c in dict.fromkeys(codes) if c not in self._code_index]
+        if not new_codes:
+            return
+        k = len(new_codes)
+        for code in new_codes:
+            self._code_index[code] = len(self._code_index)
+        self.codes = np.concatenate([self.codes, np.asarray(new_codes, dtype=str)])
+        self.n_seen = np.concatenate([self.n_seen, np.zeros(k, dtype=np.int64)])
+        self.last_date = np.concatenate([self.last_date, np.full(k, np.datetime64('NaT'), dtype='datetime64[ns]')])
+        for name in self.BUFFER_FIELDS:
+            buf = getattr(self, name)
+            setattr(self, name, np.hstack([buf, np.zeros((buf.shape[0], k))]))
+        for name in self.VECTOR_FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(k)]))
+        self.indicators = np.hstack([self.indicators, np.full((len(self.INDICATORS), k), np.nan)])
+
+    @staticmethod
+    def _window_out(buf: np.ndarray, head: np.ndarray, cols: np.ndarray, lag: int, n: np.ndarray) -> np.ndarray:
+        """取出滑动窗口中即将移出的值，窗口未满时为0"""
+        return np.where(n >= lag, buf[(head - lag) % buf.shape[0], cols], 0.0)
+
+    def _slide(self, buf: np.ndarray, head: np.ndarray, cols: np.ndarray, lag: int, n: np.ndarray,
+               value: np.ndarray, sum_name: str, count_name: str) -> None:
+        """
+        滑动窗口的累计和与有效值个数，缺失值不计入累计和
+        与IndicatorEngine.rolling_mean一致，窗口内有效值个数不足时均值为NaN
+        """
+        out = self._window_out(buf, head, cols, lag, n)
+        getattr(self, sum_name)[cols] += np.nan_to_num(value) - np.nan_to_num(out)
+        getattr(self, count_name)[cols] += (~np.isnan(value)).astype(np.float64) - ((n >= lag) & ~np.isnan(out))
+
+    def update(self, codes, close, volume=None, amount=None, dates=None) -> np.ndarray:
+        """
+        输入每只股票的一根新K线并更新状态
+        Args:
+            codes: 股票代码数组，同一批次内不重复
+            close: 收盘价数组
+            volume: 成交量数组，可为None
+            amount: 成交额数组，可为None
+            dates: K线日期数组，可为None；不晚于该股票已处理日期的K线会被忽略
+        Returns:
+            np.ndarray: 本次实际更新的股票在状态中的列号
+        """
+        E = self.E
+        codes = list(codes)
+        self._add_codes(codes)
+        cols = np.fromiter((self._code_index[c] for c in codes), dtype=np.int64, count=len(codes))
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.full(len(cols), np.nan) if volume is None else np.asarray(volume, dtype=np.float64)
+        amount = np.full(len(cols), np.nan) if amount is None else np.asarray(amount, dtype=np.float64)
+
+        keep = ~np.isnan(close)
+        if dates is not None:
+            dates = np.asarray(dates, dtype='datetime64[ns]')
+            last = self.last_date[cols]
+            keep &= np.isnat(last) | (dates > last)
+            self.last_date[cols[keep]] = dates[keep]
+        cols, close, volume, amount = cols[keep], close[keep], volume[keep], amount[keep]
+        if len(cols) == 0:
+            return cols
+
+        n = self.n_seen[cols]
+        has_prev = n >= 1
+
+        # 收盘价窗口：20日、60日均线与60日最高价、20日动量
+        head = n % self.CLOSE_WINDOW
+        self.close_sum_short[cols] += close - self._window_out(self.close_buf, head, cols, E.MA_SHORT, n)
+        self.close_sum_long[cols] += close - self._window_out(self.close_buf, head, cols, E.MA_LONG, n)
+        self.close_buf[head, cols] = close
+        close_lagged = np.where(n >= E.MOMENTUM, self.close_buf[(head - E.MOMENTUM) % self.CLOSE_WINDOW, cols], np.nan)
+        window_rows = (head[None, :] - np.arange(E.MA_LONG)[:, None]) % self.CLOSE_WINDOW
+        close_max = self.close_buf[window_rows, cols[None, :]].max(axis=0)
+
+        # 对数收益率窗口：20日波动率
+        prev = self.prev_close[cols]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_return = np.where(has_prev, np.log(close / prev), 0.0)
+        r_count = np.maximum(n - 1, 0)
+        r_head = r_count % E.VOLATILITY
+        r_out = self._window_out(self.return_buf, r_head, cols, E.VOLATILITY, r_count)
+        self.return_sum[cols] += np.where(has_prev, log_return - r_out, 0.0)
+        self.return_sq_sum[cols] += np.where(has_prev, log_return ** 2 - r_out ** 2, 0.0)
+        self.return_buf[r_head[has_prev], cols[has_prev]] = log_return[has_prev]
+
+        # EMA
+        fast_alpha = 2.0 / (E.EMA_FAST + 1)
+        slow_alpha = 2.0 / (E.EMA_SLOW + 1)
+        ema_fast = self.ema_fast[cols]
+        ema_slow = self.ema_slow[cols]
+        self.ema_fast[cols] = np.where(has_prev, ema_fast + fast_alpha * (close - ema_fast), close)
+        self.ema_slow[cols] = np.where(has_prev, ema_slow + slow_alpha * (close - ema_slow), close)
+
+        # Wilder RSI：前RSI_PERIOD个涨跌幅先累加，之后递推平滑
+        period = E.RSI_PERIOD
+        diff = np.where(has_prev, close - prev, 0.0)
+        gain = np.maximum(diff, 0.0)
+        loss = np.maximum(-diff, 0.0)
+        warmup = n <= period
+        avg_gain = self.avg_gain[cols]
+        avg_loss = self.avg_loss[cols]
+        avg_gain = np.where(warmup, avg_gain + gain, (avg_gain * (period - 1) + gain) / period)
+        avg_loss = np.where(warmup, avg_loss + loss, (avg_loss * (period - 1) + loss) / period)
+        seeded = n == period
+        avg_gain = np.where(seeded, avg_gain / period, avg_gain)
+        avg_loss = np.where(seeded, avg_loss / period, avg_loss)
+        self.avg_gain[cols] = avg_gain
+        self.avg_loss[cols] = avg_loss
+
+        # 成交量：量比使用不含当日的前5日均量；成交量、成交额可能缺失，累计和只加有效值并记录有效个数
+        v_head = n % E.VOLUME_RATIO
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = np.where((n >= E.VOLUME_RATIO) & (self.volume_count[cols] == E.VOLUME_RATIO),
+                                    volume / (self.volume_sum[cols] / E.VOLUME_RATIO), np.nan)
+        self._slide(self.volume_buf, v_head, cols, E.VOLUME_RATIO, n, volume, 'volume_sum', 'volume_count')
+        self.volume_buf[v_head, cols] = volume
+
+        # 成交额：5日均值相对20日均值
+        a_head = n % E.TURNOVER_LONG
+        self._slide(self.amount_buf, a_head, cols, E.TURNOVER_SHORT, n, amount, 'amount_sum_short', 'amount_count_short')
+        self._slide(self.amount_buf, a_head, cols, E.TURNOVER_LONG, n, amount, 'amount_sum_long', 'amount_count_long')
+        self.amount_buf[a_head, cols] = amount
+
+        self.prev_close[cols] = close
+        n = n + 1
+        self.n_seen[cols] = n
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = np.sqrt(np.maximum(
+                self.return_sq_sum[cols] / E.VOLATILITY - (self.return_sum[cols] / E.VOLATILITY) ** 2, 0))
+            values = {
+                '均线偏离': np.where(n >= E.MA_SHORT, close / (self.close_sum_short[cols] / E.MA_SHORT) - 1, np.nan),
+                'EMA偏离': self.ema_fast[cols] / self.ema_slow[cols] - 1,
+                '动量': close / close_lagged - 1,
+                'RSI': np.where(n > period, IndicatorEngine._rsi(avg_gain, avg_loss), np.nan),
+                '波动率': np.where(n > E.VOLATILITY, volatility, np.nan),
+                '回撤': np.where(n >= E.MA_LONG, close / close_max - 1, np.nan),
+                '长期均线偏离': np.where(n >= E.MA_LONG, close / (self.close_sum_long[cols] / E.MA_LONG) - 1, np.nan),
+                '量比': volume_ratio,
+                '成交额变化': np.where(
+                    (self.amount_count_short[cols] == E.TURNOVER_SHORT) & (self.amount_count_long[cols] == E.TURNOVER_LONG),
+                    (self.amount_sum_short[cols] / E.TURNOVER_SHORT) / (self.amount_sum_long[cols] / E.TURNOVER_LONG) - 1,
+                    np.nan)
+            }
+        for i, name in enumerate(self.INDICATORS):
+            self.indicators[i, cols] = values[name]
+        return cols
+
+    def scores(self) -> dict:
+        """
+        按当前状态计算每只股票的维度得分
+        Returns:
+            dict: 天道得分、地道得分、人道得分到长度为股票数的数组的映射
+        """
+        indicators = {name: self.indicators[i] for i, name in enumerate(self.INDICATORS)}
+        return IndicatorEngine.score_dimensions(indicators)
+
+    def save(self, path: str) -> None:
+        """
+        序列化状态到.npz文件
+        Args:
+            path: 文件路径
+        """
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        np.savez(path, codes=self.codes, **arrays)
+
+    @staticmethod
+    def load(path: str) -> 'IndicatorState':
+        """
+        从.npz文件恢复状态
+        Args:
+            path: 文件路径
+        Returns:
+            IndicatorState: 恢复的状态
+        """
+        with np.load(path) as data:
+            state = IndicatorState()
+            state.codes = data['codes']
+            state._code_index = {code: i for i, code in enumerate(state.codes.tolist())}
+            for name in IndicatorState.ARRAY_FIELDS:
+                setattr(state, name, data[name])
+        return state
@@ -0,0 +1,272 @@
+import os
+import glob
+import time
+import hashlib
+import pandas as pd
+
+from utils.logger import Logger
+from utils.config import Config
+logger = Logger.get_logger("market_data_store")
+
+
+class MarketDataStore:
+    """
+    本地列式行情存储
+    按年份分区将日线行情写入Parquet文件，文件内按股票代码、日期排序，
+    读取时将股票代码和日期范围下推到分区裁剪和行组统计信息过滤
+    每个分区由一个主文件data.parquet和若干增量追加文件delta-*.parquet组成，
+    增量文件在write或compact时合并回主文件
+    """
+
+    COLUMNS = ['股票代码', '日期', '开盘价', '收盘价', '最高价', '最低价', '成交量', '成交额']
+    BASE_FILE = "data.parquet"
+    # 每只股票已向数据源请求过的日期范围，停牌、未上市等没有数据的日期也算已请求
+    REQUESTED_FILE = "requested.parquet"
+    REQUESTED_COLUMNS = ['请求开始日期', '请求结束日期']
+
+    def __init__(self, root_dir: str = None):
+        """
+        初始化行情存储
+        Args:
+            root_dir: 存储根目录，默认读取配置项data.store_dir
+        """
+        self.root_dir = root_dir or Config.get('data.store_dir', 'data/market')
+        self.row_group_size = Config.get('data.store_row_group_size', 65536)
+
+    def _partition_dir(self, year: int) -> str:
+        """返回指定年份分区的目录"""
+        return os.path.join(self.root_dir, f"year={year}")
+
+    def _partition_files(self, year: int) -> list:
+        """返回分区内的文件，主文件在前，增量文件按写入顺序在后"""
+        partition_dir = self._partition_dir(year)
+        files = []
+        base_path = os.path.join(partition_dir, self.BASE_FILE)
+        if os.path.exists(base_path):
+            files.append(base_path)
+        files.extend(sorted(glob.glob(os.path.join(partition_dir, "delta-*.parquet"))))
+        return files
+
+    def partitions(self) -> list:
+        """
+        列出已存储的年份分区
+        Returns:
+            list: 升序排列的年份列表
+        """
+        dirs = glob.glob(os.path.join(self.root_dir, "year=*"))
+        years = [int(os.path.basename(d)[len("year="):]) for d in dirs]
+        return sorted(y for y in years if self._partition_files(y))
+
+    def version(self, start_date: str = None, end_date: str = None) -> str:
+        """
+        存储内容的版本标识，写入、追加、合并后都会变化
+        Args:
+            start_date: 开始日期，None表示不限
+            end_date: 结束日期，None表示不限
+        Returns:
+            str: 日期范围涉及的各年份分区文件的路径、大小和修改时间的哈希
+        """
+        start = pd.Timestamp(start_date) if start_date is not None else None
+        end = pd.Timestamp(end_date) if end_date is not None else None
+        digest = hashlib.md5()
+        for year in self.partitions():
+            if (start is not None and year < start.year) or (end is not None and year > end.year):
+                continue
+            for path in self._partition_files(year):
+                stat = os.stat(path)
+                digest.update(f"{os.path.relpath(path, self.root_dir)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _write_file(self, path: str, df: pd.DataFrame) -> str:
+        """写入临时文件，返回临时文件路径，由调用方原子替换到目标路径"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        df.to_parquet(tmp_path, index=False, row_group_size=self.row_group_size)
+        return tmp_path
+
+    @staticmethod
+    def _merge(frames: list) -> pd.DataFrame:
+        """合并多个数据块，(股票代码, 日期)重复时保留后写入的一行"""
+        df = pd.concat(frames, ignore_index=True)
+        if len(frames) > 1:
+            df = df.drop_duplicates(subset=['股票代码', '日期'], keep='last')
+        return df.sort_values(['股票代码', '日期'], kind='stable').reset_index(drop=True)
+
+    def write(self, panel: pd.DataFrame) -> int:
+        """
+        写入行情数据，与已存储数据按(股票代码, 日期)合并，新数据覆盖旧数据
+        Args:
+            panel: 长格式行情数据，列同COLUMNS
+        Returns:
+            int: 写入的行数
+        """
+        if panel.empty:
+            return 0
+        panel = panel[self.COLUMNS]
+        years = panel['日期'].dt.year
+        for year, part in panel.groupby(years):
+            files = self._partition_files(year)
+            part = self._merge([pd.read_parquet(f) for f in files] + [part])
+            base_path = os.path.join(self._partition_dir(year), self.BASE_FILE)
+            os.replace(self._write_file(base_path, part), base_path)
+            for f in files:
+                if f != base_path:
+                    os.remove(f)
+        logger.info(f"行情数据已写入本地存储: {self.root_dir}, 数据量: {len(panel)}")
+        return len(panel)
+
+    def append(self, panel: pd.DataFrame) -> int:
+        """
+        追加行情数据，只写入新的增量文件而不重写已有分区
+        所有分区的临时文件写完后才依次替换为正式文件，写入失败时不会留下部分数据
+        Args:
+            panel: 长格式行情数据，列同COLUMNS
+        Returns:
+            int: 追加的行数
+        """
+        if panel.empty:
+            return 0
+        panel = panel[self.COLUMNS].sort_values(['股票代码', '日期'], kind='stable')
+        suffix = f"{time.time_ns():020d}-{os.getpid()}"
+        pending = []
+        try:
+            for year, part in panel.groupby(panel['日期'].dt.year):
+                path = os.path.join(self._partition_dir(year), f"delta-{suffix}.parquet")
+                pending.append((self._write_file(path, part), path))
+        except Exception:
+            for tmp_path, _ in pending:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+        for tmp_path, path in pending:
+            os.replace(tmp_path, path)
+        logger.info(f"行情数据已追加至本地存储: {self.root_dir}, 数据量: {len(panel)}")
+        return len(panel)
+
+    def compact(self) -> None:
+        """将各分区的增量文件合并回主文件"""
+        for year in self.partitions():
+            files = self._partition_files(year)
+            base_path = os.path.join(self._partition_dir(year), self.BASE_FILE)
+            if files == [base_path]:
+                continue
+            part = self._merge([pd.read_parquet(f) for f in files])
+            os.replace(self._write_file(base_path, part), base_path)
+            for f in files:
+                if f != base_path:
+                    os.remove(f)
+        logger.info(f"本地存储增量文件合并完成: {self.root_dir}")
+
+    def read(self, stock_codes: list = None, start_date: str = None, end_date: str = None,
+             columns: list = None) -> pd.DataFrame:
+        """
+        读取行情数据
+        Args:
+            stock_codes: 股票代码列表，None表示全部
+            start_date: 开始日期，None表示不限
+            end_date: 结束日期，None表示不限
+            columns: 需要读取的列，None表示全部
+        Returns:
+            pd.DataFrame: 按股票代码、日期排序的行情数据，无数据时返回空DataFrame
+        """
+        if stock_codes is not None and not len(stock_codes):
+            return pd.DataFrame(columns=columns or self.COLUMNS)
+        start = pd.Timestamp(start_date) if start_date is not None else None
+        end = pd.Timestamp(end_date) if end_date is not None else None
+        years = [y for y in self.partitions()
+                 if (start is None or y >= start.year) and (end is None or y <= end.year)]
+
+        filters = []
+        if stock_codes is not None:
+            filters.append(('股票代码', 'in', list(stock_codes)))
+        if start is not None:
+            filters.append(('日期', '>=', start))
+        if end is not None:
+            filters.append(('日期', '<=', end))
+
+        frames = [pd.read_parquet(f, columns=columns, filters=filters or None)
+                  for y in years for f in self._partition_files(y)]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns or self.COLUMNS)
+        if len(frames) == 1:
+            # 单个文件在写入时已排序
+            return frames[0]
+        if '股票代码' in frames[0].columns and '日期' in frames[0].columns:
+            return self._merge(frames)
+        return pd.concat(frames, ignore_index=True)
+
+    def fetch_panel(self, stock_codes: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        按DataSource接口读取行情数据，使本地存储可直接作为数据源使用
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期，格式为"YYYY-MM-DD"
+            end_date: 结束日期，格式为"YYYY-MM-DD"
+        Returns:
+            pd.DataFrame: 长格式面板数据
+        """
+        return self.read(stock_codes, start_date, end_date)
+
+    def coverage(self, stock_codes: list = None) -> pd.DataFrame:
+        """
+        统计每只股票已存储的日期范围
+        Args:
+            stock_codes: 股票代码列表，None表示全部
+        Returns:
+            pd.DataFrame: 以股票代码为索引，包含首个日期、最后日期两列
+        """
+        df = self.read(stock_codes, columns=['股票代码', '日期'])
+        if df.empty:
+            return pd.DataFrame(columns=['首个日期', '最后日期'], index=pd.Index([], name='股票代码'))
+        grouped = df.groupby('股票代码')['日期']
+        return pd.DataFrame({'首个日期': grouped.min(), '最后日期': grouped.max()})
+
+    def requested(self, stock_codes: list = None) -> pd.DataFrame:
+        """
+        查询每只股票已向数据源请求过的日期范围
+        没有请求记录的股票（如直接write写入的数据）以已存储的首个、最后日期代替
+        Args:
+            stock_codes: 股票代码列表，None表示全部
+        Returns:
+            pd.DataFrame: 以股票代码为索引，包含请求开始日期、请求结束日期两列，未请求也未存储的股票不在其中
+        """
+        path = os.path.join(self.root_dir, self.REQUESTED_FILE)
+        if os.path.exists(path):
+            records = pd.read_parquet(path).set_index('股票代码')
+        else:
+            records = pd.DataFrame(columns=self.REQUESTED_COLUMNS, index=pd.Index([], name='股票代码'))
+        if stock_codes is not None:
+            records = records[records.index.isin(stock_codes)]
+            unrecorded = [code for code in stock_codes if code not in records.index]
+        else:
+            unrecorded = None
+        if unrecorded is None or unrecorded:
+            coverage = self.coverage(unrecorded)
+            coverage = coverage[~coverage.index.isin(records.index)]
+            coverage.columns = self.REQUESTED_COLUMNS
+            records = pd.concat([records, coverage]) if not records.empty else coverage
+        return records.astype('datetime64[ns]')
+
+    def mark_requested(self, stock_codes: list, start_date: str, end_date: str) -> None:
+        """
+        记录股票已向数据源请求过的日期范围
+        与原有范围相交或相邻时合并为一段，不相连时以新范围为准
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 请求的开始日期
+            end_date: 请求的结束日期
+        """
+        if not len(stock_codes):
+            return
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        records = self.requested()
+        old = records.reindex(stock_codes)
+        connected = (old['请求开始日期'] <= end + pd.offsets.BDay(1)) & (old['请求结束日期'] >= start - pd.offsets.BDay(1))
+        new = pd.DataFrame({
+            '请求开始日期': old['请求开始日期'].where(connected & (old['请求开始日期'] < start), start),
+            '请求结束日期': old['请求结束日期'].where(connected & (old['请求结束日期'] > end), end)
+        }, index=pd.Index(stock_codes, name='股票代码'))
+        records = pd.concat([records[~records.index.isin(stock_codes)], new]).sort_index()
+        path = os.path.join(self.root_dir, self.REQUESTED_FILE)
+        os.replace(self._write_file(path, records.reset_index()), path)
@@ -0,0 +1,174 @@
+import datetime
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import joblib
+import pandas as pd
+
+from utils.logger import Logger
+from utils.config import Config
+logger = Logger.get_logger("model_registry")
+
+
+class ModelRegistry:
+    """
+    模型版本库
+    每个模型名下按版本号保存模型文件和元数据，目录结构为{root}/{name}/v{version:04d}/，
+    先写入临时目录再整体重命名，读取方不会看到写了一半的版本
+
+    加载使用joblib的内存映射模式，并在进程内按(目录, 模型名, 版本)缓存，
+    同一进程中每个版本只从磁盘加载一次
+    """
+
+    MODEL_FILE = "model.joblib"
+    METADATA_FILE = "metadata.json"
+
+    # 进程内共享的已加载模型缓存
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, root_dir: str = None):
+        """
+        初始化模型版本库
+        Args:
+            root_dir: 版本库根目录，默认读取配置项model.registry_dir
+        """
+        self.root_dir = root_dir or Config.get('model.registry_dir', 'models/registry')
+
+    @staticmethod
+    def hash_frame(df: pd.DataFrame) -> str:
+        """
+        计算训练数据的内容哈希
+        Args:
+            df: 训练数据
+        Returns:
+            str: 十六进制哈希
+        """
+        values = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        digest = hashlib.md5(values.tobytes())
+        digest.update(repr(list(df.columns)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _version_dir(self, name: str, version: int) -> str:
+        return os.path.join(self.root_dir, name, f"v{version:04d}")
+
+    def versions(self, name: str) -> list:
+        """
+        列出模型的全部版本
+        Args:
+            name: 模型名
+        Returns:
+            list: 升序排列的版本号
+        """
+        dirs = glob.glob(os.path.join(self.root_dir, name, "v[0-9][0-9][0-9][0-9]*"))
+        return sorted(int(os.path.basename(d)[1:]) for d in dirs
+                      if os.path.exists(os.path.join(d, self.METADATA_FILE)))
+
+    def latest_version(self, name: str):
+        """
+        返回模型的最新版本号
+        Args:
+            name: 模型名
+        Returns:
+            int: 最新版本号，不存在时返回None
+        """
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def save(self, name: str, artifact, features: list = None, data_hash: str = None,
+             metrics: dict = None, params: dict = None) -> int:
+        """
+        保存模型的新版本
+        Args:
+            name: 模型名
+            artifact: 可被joblib序列化的模型或模型包
+            features: 特征列表
+            data_hash: 训练数据哈希
+            metrics: 评估指标
+            params: 其他需要记录的参数
+        Returns:
+            int: 新版本号
+        """
+        model_dir = os.path.join(self.root_dir, name)
+        os.makedirs(model_dir, exist_ok=True)
+        tmp_dir = os.path.join(model_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            # 不压缩保存，加载时numpy数组可以内存映射
+            joblib.dump(artifact, os.path.join(tmp_dir, self.MODEL_FILE))
+            version = (self.latest_version(name) or 0) + 1
+            while True:
+                metadata = {
+                    'name': name,
+                    'version': version,
+                    'features': list(features) if features is not None else None,
+                    'data_hash': data_hash,
+                    'metrics': metrics or {},
+                    'params': params or {},
+                    'created_at': datetime.datetime.now().isoformat(timespec='seconds')
+                }
+                with open(os.path.join(tmp_dir, self.METADATA_FILE), 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+                # 目标目录已存在时重命名失败，说明版本号被并发写入方占用，顺延一个版本
+                try:
+                    os.rename(tmp_dir, self._version_dir(name, version))
+                    break
+                except OSError:
+                    if not os.path.exists(self._version_dir(name, version)):
+                        raise
+                    version += 1
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.info(f"模型{name}已保存为版本{version}")
+        return version
+
+    def metadata(self, name: str, version: int = None) -> dict:
+        """
+        读取模型版本的元数据
+        Args:
+            name: 模型名
+            version: 版本号，None表示最新版本
+        Returns:
+            dict: 元数据，不存在时返回空字典
+        """
+        version = self.latest_version(name) if version is None else version
+        if version is None:
+            return {}
+        path = os.path.join(self._version_dir(name, version), self.METADATA_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, name: str, version: int = None, mmap_mode: str = 'r'):
+        """
+        加载模型版本，同一进程中每个版本只从磁盘读取一次
+        Args:
+            name: 模型名
+            version: 版本号，None表示最新版本
+            mmap_mode: joblib内存映射模式，None表示读入内存
+        Returns:
+            加载的模型，不存在时返回None
+        """
+        version = self.latest_version(name) if version is None else version
+        if version is None:
+            return None
+        key = (os.path.abspath(self.root_dir), name, version)
+        with ModelRegistry._cache_lock:
+            if key in ModelRegistry._cache:
+                return ModelRegistry._cache[key]
+        path = os.path.join(self._version_dir(name, version), self.MODEL_FILE)
+        artifact = joblib.load(path, mmap_mode=mmap_mode)
+        logger.info(f"已加载模型{name}版本{version}")
+        with ModelRegistry._cache_lock:
+            return ModelRegistry._cache.setdefault(key, artifact)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """清空进程内的模型缓存"""
+        with ModelRegistry._cache_lock:
+            ModelRegistry._cache.clear()
@@ -0,0 +1,136 @@
+import math
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import ParameterGrid, check_cv
+
+from utils.logger import Logger
+from utils.config import Config
+logger = Logger.get_logger("model_search")
+
+
+def _fit_and_score(estimator, params: dict, X: np.ndarray, y: np.ndarray,
+                   train_idx: np.ndarray, test_idx: np.ndarray) -> float:
+    """在一折数据上训练并返回验证集得分"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx], y[train_idx])
+    return model.score(X[test_idx], y[test_idx])
+
+
+def _refit(estimator, params: dict, X: np.ndarray, y: np.ndarray):
+    """用最优参数在全部训练数据上重新训练"""
+    return clone(estimator).set_params(**params).fit(X, y)
+
+
+class HyperparameterSearch:
+    """
+    并行超参数搜索
+    使用逐次减半策略：第一轮所有参数组合只在少量样本上交叉验证，
+    每轮保留得分最高的1/factor组合并把样本量扩大factor倍，直到只剩一个组合
+    多个模型的搜索任务放入同一个工作池并发执行，超过时间预算时提前结束，
+    以已完成轮次中得分最高的组合作为结果
+    """
+
+    @staticmethod
+    def resolve_n_jobs(n_jobs: int = None) -> int:
+        """
+        解析并行工作数
+        Args:
+            n_jobs: 工作数，None表示读取配置项model.search_n_jobs，-1表示使用全部CPU
+        Returns:
+            int: 实际工作数
+        """
+        n_jobs = Config.get('model.search_n_jobs', -1) if n_jobs is None else n_jobs
+        cpu_count = os.cpu_count() or 1
+        if n_jobs < 0:
+            return max(1, cpu_count + 1 + n_jobs)
+        return max(1, min(n_jobs, cpu_count))
+
+    @staticmethod
+    def successive_halving(estimators: dict, param_grid: dict, X, targets: dict, cv: int = None,
+                           factor: int = None, n_jobs: int = None, time_budget: float = None,
+                           random_state: int = None) -> dict:
+        """
+        对多个模型并发进行逐次减半超参数搜索
+        Args:
+            estimators: 模型名到未训练模型的映射
+            param_grid: 参数网格，所有模型共用
+            X: 特征矩阵
+            targets: 模型名到目标变量的映射
+            cv: 交叉验证折数，默认读取配置项model.search_cv
+            factor: 每轮保留1/factor的组合，默认读取配置项model.search_factor
+            n_jobs: 并行工作数，默认读取配置项model.search_n_jobs
+            time_budget: 搜索时间预算(秒)，默认读取配置项model.search_time_budget，不含最终重新训练
+            random_state: 抽样随机种子，默认读取配置项model.random_state
+        Returns:
+            dict: 模型名到{'model': 以最优参数在全部数据上训练的模型, 'params': 最优参数,
+                  'score': 最后一轮交叉验证平均得分, 'rounds': 完成的轮数}的映射
+        """
+        cv = cv or Config.get('model.search_cv', 5)
+        factor = factor or Config.get('model.search_factor', 3)
+        n_jobs = HyperparameterSearch.resolve_n_jobs(n_jobs)
+        time_budget = Config.get('model.search_time_budget', 60) if time_budget is None else time_budget
+        random_state = Config.get('model.random_state', 42) if random_state is None else random_state
+
+        X = np.asarray(X)
+        targets = {name: np.asarray(y) for name, y in targets.items()}
+        n_samples = len(X)
+        candidates = {name: list(ParameterGrid(param_grid)) for name in estimators}
+        n_rounds = max(1, math.ceil(math.log(max(len(c) for c in candidates.values()), factor)))
+        min_resources = max(n_samples // factor ** (n_rounds - 1), 2 * cv)
+        order = np.random.default_rng(random_state).permutation(n_samples)
+        logger.info(f"开始逐次减半搜索，模型: {list(estimators)}, 轮数: {n_rounds}, 工作数: {n_jobs}, 时间预算: {time_budget}秒")
+
+        start = time.perf_counter()
+        scores = {}
+        completed = 0
+        with Parallel(n_jobs=n_jobs) as parallel:
+            for round_idx in range(n_rounds):
+                resources = n_samples if round_idx == n_rounds - 1 else min(n_samples, min_resources * factor ** round_idx)
+                subset = np.sort(order[:resources])
+                tasks, keys = [], []
+                for name, estimator in estimators.items():
+                    X_sub, y_sub = X[subset], targets[name][subset]
+                    splitter = check_cv(cv, y_sub, classifier=is_classifier(estimator))
+                    folds = list(splitter.split(X_sub, y_sub))
+                    for i, params in enumerate(candidates[name]):
+                        for train_idx, test_idx in folds:
+                            tasks.append(delayed(_fit_and_score)(estimator, params, X_sub, y_sub, train_idx, test_idx))
+                            keys.append((name, i))
+                results = parallel(tasks)
+
+                scores = {}
+                for (name, i), score in zip(keys, results):
+                    scores.setdefault(name, {}).setdefault(i, []).append(score)
+                completed = round_idx + 1
+                elapsed = time.perf_counter() - start
+                logger.info(f"第{completed}轮完成，样本数: {resources}, 组合数: {[len(c) for c in candidates.values()]}, 耗时: {elapsed:.2f}秒")
+
+                # 按平均得分保留前1/factor的组合
+                for name in estimators:
+                    ranked = sorted(scores[name], key=lambda i: np.mean(scores[name][i]), reverse=True)
+                    keep = max(1, math.ceil(len(ranked) / factor))
+                    candidates[name] = [candidates[name][i] for i in ranked[:keep]]
+                    scores[name] = [np.mean(scores[name][i]) for i in ranked[:keep]]
+                if all(len(c) == 1 for c in candidates.values()):
+                    break
+                if elapsed >= time_budget:
+                    logger.warning(f"超参数搜索超出时间预算{time_budget}秒，提前结束于第{completed}轮")
+                    break
+
+            names = list(estimators)
+            models = parallel(delayed(_refit)(estimators[name], candidates[name][0], X, targets[name]) for name in names)
+
+        results = {}
+        for name, model in zip(names, models):
+            results[name] = {
+                'model': model,
+                'params': candidates[name][0],
+                'score': float(scores[name][0]),
+                'rounds': completed
+            }
+            logger.info(f"{name}最优参数: {candidates[name][0]}, 交叉验证得分: {scores[name][0]:.4f}")
+        logger.info(f"逐次减半搜索完成，总耗时: {time.perf_counter() - start:.2f}秒")
+        return results
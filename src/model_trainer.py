@@ -1,19 +1,49 @@
+import copy
 import pandas as pd
 import numpy as np
 import logging
-import joblib
-import os
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
+from sklearn.metrics import mean_squared_error, accuracy_score
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
 
 from utils.logger import Logger
 from utils.config import Config
+from src.model_search import HyperparameterSearch
+from src.model_registry import ModelRegistry
+from src.forest_engine import FlatForest
 logger = Logger.get_logger("model_trainer")
 
 class ModelTrainer:
     """模型训练类"""
 
+    FEATURES = ['天道得分', '地道得分', '人道得分']
+    MODEL_NAME = 'stock_model'
+    JOINT_MODEL_NAME = 'joint_model'
+
+    _registry = None
+
+    @staticmethod
+    def get_registry() -> ModelRegistry:
+        """
+        获取当前使用的模型版本库
+        Returns:
+            ModelRegistry: 模型版本库
+        """
+        if ModelTrainer._registry is None:
+            ModelTrainer._registry = ModelRegistry()
+        return ModelTrainer._registry
+
+    @staticmethod
+    def set_registry(registry) -> None:
+        """
+        指定模型版本库
+        Args:
+            registry: ModelRegistry实例，None表示恢复为按配置创建的默认版本库
+        """
+        ModelTrainer._registry = registry
+
     @staticmethod
     def train_model(train_data: pd.DataFrame, retrain: bool = False) -> bool:
         """
@@ -26,14 +56,14 @@ class ModelTrainer:
         """
         try:
             # 检查模型是否已存在
-            model_path = 'models/stock_model.pkl'
-            if os.path.exists(model_path) and not retrain:
+            registry = ModelTrainer.get_registry()
+            if registry.latest_version(ModelTrainer.MODEL_NAME) is not None and not retrain:
                 logger.info("模型已存在，无需重新训练")
                 return True
 
             logger.info("开始训练模型")
             # 准备训练数据
-            X = train_data[['天道得分', '地道得分', '人道得分']]
+            X = train_data[ModelTrainer.FEATURES]
             y = train_data['预测涨跌幅']
 
             # 分割训练集和测试集
@@ -41,10 +71,18 @@ class ModelTrainer:
             random_state = Config.get('model.random_state', 42)
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
 
-            # 训练随机森林模型
-            n_estimators = Config.get('model.n_estimators', 100)
-            model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
-            model.fit(X_train, y_train)
+            # 训练随机森林模型，search_mode为halving时先并行搜索超参数
+            if Config.get('model.search_mode', 'none') == 'halving':
+                param_grid = Config.get('model.search_param_grid', {'n_estimators': [50, 100, 150], 'max_depth': [None, 10, 20]})
+                result = HyperparameterSearch.successive_halving(
+                    {'regression': RandomForestRegressor(random_state=random_state)},
+                    param_grid, X_train, {'regression': y_train}, random_state=random_state
+                )
+                model = result['regression']['model']
+            else:
+                n_estimators = Config.get('model.n_estimators', 100)
+                model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+                model.fit(X_train, y_train)
 
             # 评估模型
             y_pred = model.predict(X_test)
@@ -52,10 +90,252 @@ class ModelTrainer:
             logger.info(f"模型训练完成，MSE: {mse:.2f}")
 
             # 保存模型
-            os.makedirs('models', exist_ok=True)
-            joblib.dump(model, model_path)
-            logger.info(f"模型已保存至: {model_path}")
+            registry.save(
+                ModelTrainer.MODEL_NAME, model, features=ModelTrainer.FEATURES,
+                data_hash=ModelRegistry.hash_frame(train_data[ModelTrainer.FEATURES + ['预测涨跌幅']]),
+                metrics={'mse': float(mse)}, params=model.get_params()
+            )
             return True
         except Exception as e:
             logger.error(f"模型训练失败: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def train_joint(train_data: pd.DataFrame, retrain: bool = False, features: list = None,
+                    name: str = None, search_mode: str = None) -> dict:
+        """
+        联合训练上涨分类模型和涨跌幅回归模型
+        只划分一次训练集、测试集并只做一次标准化，两个模型共用同一块float32特征矩阵，
+        训练结果连同标准化器、特征列表和评估指标作为一个版本保存到模型版本库
+        Args:
+            train_data: 训练数据，包含特征列和预测涨跌幅，可选上涨标签（缺失时由预测涨跌幅>0生成）
+            retrain: 是否重新训练
+            features: 特征列，默认为FEATURES
+            name: 模型版本库中的模型名，默认为JOINT_MODEL_NAME
+            search_mode: halving表示先并行搜索超参数，none表示使用固定参数，默认读取配置项model.search_mode
+        Returns:
+            dict: 模型包，包含features、scaler、metrics、data_end、tree_windows，以及输入原始特征的
+                classification、regression两个Pipeline，失败时返回空字典
+        """
+        try:
+            features = list(features or ModelTrainer.FEATURES)
+            name = name or ModelTrainer.JOINT_MODEL_NAME
+            registry = ModelTrainer.get_registry()
+            if not retrain and registry.latest_version(name) is not None:
+                if registry.metadata(name).get('features') == features:
+                    return registry.load(name)
+                logger.info("已存在的联合模型特征不一致，重新训练")
+
+            logger.info(f"开始联合训练模型，样本数: {len(train_data)}, 特征: {features}")
+            X, y_class, y_reg = ModelTrainer._joint_arrays(train_data, features)
+
+            # 只划分一次，两个目标共用同一组行号
+            test_size = Config.get('model.test_size', 0.2)
+            random_state = Config.get('model.random_state', 42)
+            train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=test_size, random_state=random_state)
+
+            # 只标准化一次，并直接转换为随机森林内部使用的float32，避免每个模型各自复制一份
+            scaler = StandardScaler().fit(X[train_idx])
+            X_scaled = np.ascontiguousarray(scaler.transform(X), dtype=np.float32)
+            X_train, X_test = X_scaled[train_idx], X_scaled[test_idx]
+
+            estimators = {
+                'classification': RandomForestClassifier(random_state=random_state),
+                'regression': RandomForestRegressor(random_state=random_state)
+            }
+            targets = {'classification': y_class[train_idx], 'regression': y_reg[train_idx]}
+            search_mode = search_mode or Config.get('model.search_mode', 'none')
+            if search_mode == 'halving':
+                param_grid = Config.get('model.search_param_grid', {'n_estimators': [50, 100, 150], 'max_depth': [None, 10, 20]})
+                results = HyperparameterSearch.successive_halving(estimators, param_grid, X_train, targets,
+                                                                  random_state=random_state)
+                models = {name: result['model'] for name, result in results.items()}
+            else:
+                n_estimators = Config.get('model.n_estimators', 100)
+                models = {name: estimator.set_params(n_estimators=n_estimators).fit(X_train, targets[name])
+                          for name, estimator in estimators.items()}
+
+            metrics = {
+                'accuracy': float(accuracy_score(y_class[test_idx], models['classification'].predict(X_test))),
+                'mse': float(mean_squared_error(y_reg[test_idx], models['regression'].predict(X_test)))
+            }
+            logger.info(f"联合训练完成，准确率: {metrics['accuracy']:.4f}, MSE: {metrics['mse']:.2f}")
+
+            # 推理时直接输入原始特征，由同一个已拟合的标准化器转换，预测结果与批次构成无关
+            window = ModelTrainer._date_window(train_data)
+            bundle = {
+                'features': features,
+                'scaler': scaler,
+                'classification': Pipeline([('scaler', scaler), ('model', models['classification'])]),
+                'regression': Pipeline([('scaler', scaler), ('model', models['regression'])]),
+                'metrics': metrics,
+                # 已使用数据的最后日期，增量训练只在其后有新数据时进行
+                'data_end': window[1],
+                # 每棵树训练数据覆盖的日期范围，供增量训练淘汰过期的树
+                'tree_windows': {name: [window] * len(model.estimators_) for name, model in models.items()}
+            }
+            registry.save(
+                name, bundle, features=features,
+                data_hash=ModelRegistry.hash_frame(train_data[features + ['预测涨跌幅']]),
+                metrics=metrics, params={'search_mode': search_mode}
+            )
+            return bundle
+        except Exception as e:
+            logger.error(f"联合训练模型失败: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _joint_arrays(train_data: pd.DataFrame, features: list) -> tuple:
+        """取出特征矩阵、上涨标签和预测涨跌幅，上涨标签缺失时由预测涨跌幅>0生成"""
+        X = train_data[features].to_numpy(dtype=np.float64)
+        y_reg = train_data['预测涨跌幅'].to_numpy(dtype=np.float64)
+        if '上涨标签' in train_data.columns:
+            y_class = train_data['上涨标签'].to_numpy(dtype=np.int64)
+        else:
+            y_class = (y_reg > 0).astype(np.int64)
+        return X, y_class, y_reg
+
+    @staticmethod
+    def _date_window(train_data: pd.DataFrame) -> tuple:
+        """训练数据覆盖的日期范围，没有日期列时为(None, None)"""
+        if '日期' not in train_data.columns or train_data.empty:
+            return None, None
+        dates = pd.to_datetime(train_data['日期'])
+        return dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d')
+
+    @staticmethod
+    def update_incremental(train_data: pd.DataFrame, name: str = None, n_new_trees: int = None,
+                           window_days: int = None, max_age_days: int = None) -> dict:
+        """
+        增量训练联合模型：在最新一段数据上用warm_start追加新树，并淘汰训练窗口过旧的树
+        标准化器沿用已有模型的，新树与旧树接收同一尺度的特征；
+        最新一段数据的最后test_size比例留作留出集，保存的指标为更新后模型在留出集上的结果
+        Args:
+            train_data: 包含日期列的训练数据，只使用最近window_days天的行
+            name: 模型版本库中的模型名，默认为JOINT_MODEL_NAME
+            n_new_trees: 每个模型追加的树数，默认读取配置项model.incremental_trees
+            window_days: 新树使用的最近数据天数，默认读取配置项model.incremental_window_days
+            max_age_days: 训练窗口结束日期早于最新日期超过该天数的树被淘汰，默认读取配置项model.tree_max_age_days
+        Returns:
+            dict: 更新后的模型包，已有模型不存在时全量训练，失败时返回空字典
+        """
+        try:
+            name = name or ModelTrainer.JOINT_MODEL_NAME
+            registry = ModelTrainer.get_registry()
+            if registry.latest_version(name) is None:
+                logger.info("不存在可增量更新的模型，改为全量训练")
+                return ModelTrainer.train_joint(train_data, retrain=True, name=name)
+
+            n_new_trees = n_new_trees or Config.get('model.incremental_trees', 20)
+            window_days = window_days or Config.get('model.incremental_window_days', 60)
+            max_age_days = max_age_days or Config.get('model.tree_max_age_days', 365)
+
+            # 版本库中的模型在进程内共享，复制后再修改
+            bundle = copy.deepcopy(registry.load(name))
+            features = bundle['features']
+            dates = pd.to_datetime(train_data['日期'])
+            latest = dates.max()
+            # 旧版本模型包没有记录训练窗口，视为窗口未知，不会被淘汰
+            for model_name in ('classification', 'regression'):
+                n_trees = len(bundle[model_name].steps[-1][1].estimators_)
+                bundle.setdefault('tree_windows', {}).setdefault(model_name, [(None, None)] * n_trees)
+            # 已使用数据的最后日期，旧版本模型包没有记录时取各树训练窗口的最晚结束日期
+            ends = [pd.Timestamp(end) for windows in bundle['tree_windows'].values() for _, end in windows if end is not None]
+            if bundle.get('data_end') is not None:
+                ends.append(pd.Timestamp(bundle['data_end']))
+            if ends and latest <= max(ends):
+                logger.info(f"没有{max(ends).date()}之后的新数据，无需增量训练")
+                return bundle
+
+            # 最近窗口按日期排序，最后test_size比例的行作为留出集，新树只在其之前的行上训练
+            recent = train_data[dates > latest - pd.Timedelta(days=window_days)]
+            recent = recent.iloc[np.argsort(pd.to_datetime(recent['日期']).to_numpy(), kind='stable')]
+            n_holdout = int(len(recent) * Config.get('model.test_size', 0.2))
+            if n_holdout == 0 or n_holdout == len(recent):
+                logger.warning(f"最近{window_days}天只有{len(recent)}行数据，无法划分留出集，跳过增量训练")
+                return bundle
+            fit_rows, holdout = recent.iloc[:-n_holdout], recent.iloc[-n_holdout:]
+            X, y_class, y_reg = ModelTrainer._joint_arrays(fit_rows, features)
+            X_scaled = np.ascontiguousarray(bundle['scaler'].transform(X), dtype=np.float32)
+            window = ModelTrainer._date_window(fit_rows)
+            targets = {'classification': y_class, 'regression': y_reg}
+            cutoff = latest - pd.Timedelta(days=max_age_days)
+
+            # warm_start按现有树数跳过随机种子，淘汰树后会与之前的树重复，每次更新使用新的种子
+            version = registry.latest_version(name) + 1
+            seed = int(np.random.SeedSequence([Config.get('model.random_state', 42), version]).generate_state(1)[0])
+
+            summary = {}
+            for model_name, y in targets.items():
+                forest = bundle[model_name].steps[-1][1]
+                windows = bundle['tree_windows'][model_name]
+                if model_name == 'classification' and not np.array_equal(np.unique(y), forest.classes_):
+                    logger.warning("最新数据中的上涨标签类别不完整，跳过分类模型的增量训练")
+                    added = 0
+                else:
+                    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees,
+                                      random_state=seed)
+                    forest.fit(X_scaled, y)
+                    windows = windows + [window] * n_new_trees
+                    added = n_new_trees
+
+                # 淘汰训练窗口结束得过早的树，至少保留新加入的树
+                keep = [i for i, (_, end) in enumerate(windows) if end is None or pd.Timestamp(end) >= cutoff]
+                keep = keep or list(range(len(windows) - max(added, 1), len(windows)))
+                forest.estimators_ = [forest.estimators_[i] for i in keep]
+                forest.n_estimators = len(keep)
+                bundle['tree_windows'][model_name] = [windows[i] for i in keep]
+                summary[model_name] = {'added': added, 'removed': len(windows) - len(keep), 'trees': len(keep)}
+
+            bundle['data_end'] = latest.strftime('%Y-%m-%d')
+            # 在留出集上评估更新后的模型，版本库中的指标描述的是本版本的模型
+            X_holdout, y_class_holdout, y_reg_holdout = ModelTrainer._joint_arrays(holdout, features)
+            bundle['metrics'] = {
+                'accuracy': float(accuracy_score(y_class_holdout, bundle['classification'].predict(X_holdout))),
+                'mse': float(mean_squared_error(y_reg_holdout, bundle['regression'].predict(X_holdout)))
+            }
+            logger.info(f"增量训练完成: {summary}, 留出集准确率: {bundle['metrics']['accuracy']:.4f}, "
+                        f"MSE: {bundle['metrics']['mse']:.2f}")
+            registry.save(
+                name, bundle, features=features,
+                data_hash=ModelRegistry.hash_frame(recent[features + ['预测涨跌幅']]),
+                metrics=bundle['metrics'],
+                params={'mode': 'incremental', 'window': window, 'holdout': ModelTrainer._date_window(holdout),
+                        'random_state': seed, 'trees': summary}
+            )
+            return bundle
+        except Exception as e:
+            logger.error(f"增量训练模型失败: {str(e)}")
+            return {}
+
+    @staticmethod
+    def predict_many(model, X, method: str = 'predict', chunk_size: int = None) -> np.ndarray:
+        """
+        分块批量预测，可一次对整个股票池或多个日期的股票池打分，内存占用不超过一个分块
+        Args:
+            model: 已训练的模型或Pipeline
+            X: 特征矩阵或只包含特征列的DataFrame，列顺序与训练时一致
+            method: 预测方法名，如predict、predict_proba
+            chunk_size: 每块行数，默认读取配置项model.predict_chunk_size
+        Returns:
+            np.ndarray: 按行拼接的预测结果
+        """
+        chunk_size = chunk_size or Config.get('model.predict_chunk_size', 100000)
+        X = np.asarray(X, dtype=np.float64)
+        predict = getattr(model, method)
+        if len(X) <= chunk_size:
+            return predict(X)
+        return np.concatenate([predict(X[i:i + chunk_size]) for i in range(0, len(X), chunk_size)])
+
+    @staticmethod
+    def export_flat(bundle: dict) -> dict:
+        """
+        将联合模型包中的两个Pipeline导出为扁平数组推理引擎
+        小批量反复打分时没有sklearn逐棵树调用的固定开销，可直接传给predict_many；
+        超过配置项model.flat_max_rows行的批量自动交给原Pipeline，整个股票池打分不会变慢
+        Args:
+            bundle: train_joint返回的模型包
+        Returns:
+            dict: classification、regression到FlatForest的映射
+        """
+        return {name: FlatForest.from_sklearn(bundle[name]) for name in ('classification', 'regression')}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+class PerformanceSeries:
+    """
+    累计收益曲线构建类
+    由日收益率数组通过累加或累乘一次性计算多条策略与基准的累计收益曲线
+    """
+
+    @staticmethod
+    def returns_from_prices(prices: np.ndarray) -> np.ndarray:
+        """
+        由价格序列计算日收益率
+        Args:
+            prices: 形状为(日期数,)或(日期数, 序列数)的价格数组
+        Returns:
+            np.ndarray: 同形状的日收益率，首日为0，价格缺失处为NaN
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        returns = np.zeros_like(prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = prices[1:] / prices[:-1] - 1
+        return returns
+
+    @staticmethod
+    def cumulative(daily_returns: np.ndarray, compound: bool = True) -> np.ndarray:
+        """
+        计算累计收益率
+        Args:
+            daily_returns: 形状为(日期数,)或(日期数, 序列数)的日收益率，NaN视为当日收益为0
+            compound: True按复利累乘，False按单利累加
+        Returns:
+            np.ndarray: 同形状的累计收益率
+        """
+        returns = np.nan_to_num(np.asarray(daily_returns, dtype=np.float64), nan=0.0)
+        if compound:
+            return np.cumprod(1 + returns, axis=0) - 1
+        return np.cumsum(returns, axis=0)
+
+    @staticmethod
+    def build(dates, daily_returns: dict, compound: bool = True,
+              start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        构建多条累计收益曲线
+        Args:
+            dates: 日期序列
+            daily_returns: 曲线名称到日收益率数组的映射，收益率以小数表示
+            compound: True按复利累乘，False按单利累加
+            start_date: 开始日期，曲线从该日起以0为起点，None表示不限
+            end_date: 结束日期，None表示不限
+        Returns:
+            pd.DataFrame: 包含日期列和每条曲线的累计收益率(%)列
+        """
+        dates = pd.DatetimeIndex(dates)
+        names = list(daily_returns)
+        matrix = np.column_stack([np.asarray(daily_returns[name], dtype=np.float64) for name in names]) \
+            if names else np.empty((len(dates), 0))
+
+        mask = np.ones(len(dates), dtype=bool)
+        if start_date is not None:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= dates <= pd.Timestamp(end_date)
+        dates, matrix = dates[mask], matrix[mask]
+        if len(matrix):
+            # 区间首日作为起点，不计入当日收益
+            matrix[0] = 0
+
+        curves = PerformanceSeries.cumulative(matrix, compound) * 100
+        df = pd.DataFrame(curves, columns=names)
+        df.insert(0, '日期', dates)
+        return df
@@ -0,0 +1,144 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from utils.logger import Logger
+logger = Logger.get_logger("price_matrix")
+
+
+class PriceMatrix:
+    """
+    稠密行情矩阵
+    每个字段是形状为(日期数, 股票数)的float数组，配合日期、股票代码索引数组使用
+    以.npy文件保存，加载时使用内存映射，多个进程共享同一份物理内存
+    """
+
+    # 字段名与磁盘文件名的对应关系
+    FIELDS = {
+        '开盘价': 'open',
+        '收盘价': 'close',
+        '最高价': 'high',
+        '最低价': 'low',
+        '成交量': 'volume',
+        '成交额': 'amount'
+    }
+
+    def __init__(self, dates: np.ndarray, codes: np.ndarray, fields: dict):
+        """
+        初始化行情矩阵
+        Args:
+            dates: 日期数组，datetime64类型，升序
+            codes: 股票代码数组
+            fields: 字段名到(日期数, 股票数)数组的映射
+        """
+        self.dates = dates
+        self.codes = codes
+        self.fields = fields
+        self._code_positions = None
+
+    @property
+    def shape(self) -> tuple:
+        """矩阵形状(日期数, 股票数)"""
+        return len(self.dates), len(self.codes)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """按字段名取出(日期数, 股票数)数组"""
+        return self.fields[field]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.fields
+
+    def code_positions(self, stock_codes: list) -> np.ndarray:
+        """
+        查找股票代码所在的列号
+        Args:
+            stock_codes: 股票代码列表
+        Returns:
+            np.ndarray: 列号数组，不存在的股票为-1
+        """
+        if self._code_positions is None:
+            self._code_positions = pd.Index(self.codes)
+        return self._code_positions.get_indexer(stock_codes)
+
+    def date_slice(self, start_date: str = None, end_date: str = None) -> slice:
+        """
+        返回日期范围对应的行切片，切片取数不复制数据
+        Args:
+            start_date: 开始日期，None表示不限
+            end_date: 结束日期，None表示不限
+        Returns:
+            slice: 行切片
+        """
+        start = 0 if start_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date)), side='left')
+        end = len(self.dates) if end_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date)), side='right')
+        return slice(int(start), int(end))
+
+    @staticmethod
+    def from_panel(panel: pd.DataFrame, dtype=np.float64) -> 'PriceMatrix':
+        """
+        由长格式面板数据构建行情矩阵，缺失的(日期, 股票)位置填NaN
+        Args:
+            panel: 长格式面板数据，包含股票代码、日期及行情字段
+            dtype: 矩阵数据类型
+        Returns:
+            PriceMatrix: 行情矩阵
+        """
+        codes = pd.unique(panel['股票代码'])
+        dates = np.sort(pd.unique(panel['日期'])).astype('datetime64[ns]')
+        code_idx = pd.Index(codes).get_indexer(panel['股票代码'])
+        date_idx = pd.Index(dates).get_indexer(panel['日期'])
+
+        fields = {}
+        for field in PriceMatrix.FIELDS:
+            if field not in panel.columns:
+                continue
+            matrix = np.full((len(dates), len(codes)), np.nan, dtype=dtype)
+            matrix[date_idx, code_idx] = panel[field].to_numpy(dtype=dtype)
+            fields[field] = matrix
+        return PriceMatrix(dates, np.asarray(codes, dtype=str), fields)
+
+    def save(self, directory: str) -> None:
+        """
+        保存为.npy文件目录，先写临时目录再整体替换
+        已有的目录先改名移开、新目录就位后再删除，替换期间只有两次改名的间隙中目录不存在，
+        不会因删除大文件而长时间读不到矩阵；已内存映射旧文件的进程不受删除影响
+        Args:
+            directory: 目标目录
+        """
+        tmp_dir = f"{directory.rstrip(os.sep)}.tmp.{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'dates.npy'), self.dates.astype('datetime64[ns]'))
+        np.save(os.path.join(tmp_dir, 'codes.npy'), self.codes.astype(str))
+        for field, name in self.FIELDS.items():
+            if field in self.fields:
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(self.fields[field]))
+        old_dir = None
+        if os.path.exists(directory):
+            old_dir = f"{directory.rstrip(os.sep)}.old.{os.getpid()}"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        logger.info(f"行情矩阵已保存至: {directory}, 形状: {self.shape}")
+
+    @staticmethod
+    def load(directory: str, mmap_mode: str = 'r') -> 'PriceMatrix':
+        """
+        从.npy文件目录加载行情矩阵
+        Args:
+            directory: 保存目录
+            mmap_mode: 内存映射模式，默认只读映射；None表示读入内存
+        Returns:
+            PriceMatrix: 行情矩阵
+        """
+        dates = np.load(os.path.join(directory, 'dates.npy'))
+        codes = np.load(os.path.join(directory, 'codes.npy'))
+        fields = {}
+        for field, name in PriceMatrix.FIELDS.items():
+            path = os.path.join(directory, f'{name}.npy')
+            if os.path.exists(path):
+                fields[field] = np.load(path, mmap_mode=mmap_mode)
+        return PriceMatrix(dates, codes, fields)
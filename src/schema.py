@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from utils.config import Config
+
+DEFAULT_INDUSTRIES = ["科技", "金融", "医疗", "消费", "能源", "制造"]
+
+
+class SchemaError(Exception):
+    """DataFrame的列类型与约定不符"""
+
+
+class FrameSchema:
+    """
+    DataFrame列类型约定
+    构建时将已知列转换为紧凑类型并检查，未在约定中的列原样保留
+    """
+
+    def __init__(self, name: str, columns: dict, required: tuple = ()):
+        """
+        初始化列类型约定
+        Args:
+            name: 约定名称，用于错误信息
+            columns: 列名到dtype的映射
+            required: 必须存在的列
+        """
+        self.name = name
+        self.columns = columns
+        self.required = tuple(required)
+
+    def build(self, data) -> pd.DataFrame:
+        """
+        按约定构建DataFrame
+        Args:
+            data: DataFrame或列名到数组的映射
+        Returns:
+            pd.DataFrame: 列类型符合约定的DataFrame
+        Raises:
+            SchemaError: 缺少必需列，或取值无法转换为约定类型
+        """
+        df = pd.DataFrame(data)
+        missing = [column for column in self.required if column not in df.columns]
+        if missing:
+            raise SchemaError(f"{self.name}缺少列: {missing}")
+
+        converted = {}
+        for column, dtype in self.columns.items():
+            if column not in df.columns:
+                continue
+            values = df[column]
+            # 固定类别的分类列不接受类别外的取值
+            if isinstance(dtype, pd.CategoricalDtype):
+                unknown = values.notna() & ~values.isin(dtype.categories)
+                if unknown.any():
+                    raise SchemaError(f"{self.name}的列{column}包含未知类别: {list(pd.unique(values[unknown])[:5])}")
+            try:
+                converted[column] = values.astype(dtype)
+            except (TypeError, ValueError) as e:
+                raise SchemaError(f"{self.name}的列{column}无法转换为{dtype}: {str(e)}")
+        if converted:
+            df = df.assign(**converted)
+        self.validate(df)
+        return df
+
+    def validate(self, df: pd.DataFrame) -> None:
+        """
+        检查列类型
+        Args:
+            df: 待检查的DataFrame
+        Raises:
+            SchemaError: 存在类型不符的列
+        """
+        errors = []
+        for column, dtype in self.columns.items():
+            if column not in df.columns:
+                continue
+            actual = df[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype) or dtype == 'category':
+                if not isinstance(actual, pd.CategoricalDtype):
+                    errors.append(f"{column}: {actual} != category")
+            elif actual != np.dtype(dtype):
+                errors.append(f"{column}: {actual} != {np.dtype(dtype)}")
+        if errors:
+            raise SchemaError(f"{self.name}列类型不符: {'; '.join(errors)}")
+
+
+def industry_dtype() -> pd.CategoricalDtype:
+    """
+    行业分类类型，类别固定为配置项app.industries，不同日期、不同批次的数据可直接合并
+    Returns:
+        pd.CategoricalDtype: 行业分类类型
+    """
+    return pd.CategoricalDtype(Config.get('app.industries', DEFAULT_INDUSTRIES))
+
+
+def universe_schema() -> FrameSchema:
+    """
+    选股股票池的列类型约定
+    股票代码保留前导零的字符串取值，以分类类型存储，内部为整数编码
+    Returns:
+        FrameSchema: 股票池列类型约定
+    """
+    return FrameSchema('股票池', {
+        '股票代码': 'category',
+        '股票名称': 'category',
+        '行业': industry_dtype(),
+        '所属行业': industry_dtype(),
+        '日期': 'datetime64[ns]',
+        '天道得分': np.float32,
+        '地道得分': np.float32,
+        '人道得分': np.float32,
+        '预测涨跌幅': np.float32,
+        '涨跌幅': np.float32,
+        '成交量': np.int64
+    }, required=('股票代码', '天道得分', '地道得分', '人道得分'))
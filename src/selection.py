@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from utils.logger import Logger
+logger = Logger.get_logger("selection")
+
+
+class SelectionKernel:
+    """
+    选股的公共选择内核
+    先按条件过滤，再用np.argpartition在得分数组上做部分选择，只对选中的k个排序，
+    复杂度为O(n + k log k)；得分相同时与DataFrame.nlargest(keep='first')一致，保留靠前的行
+
+    行业配额与补足在同一次调用中完成：先在各配额分组内选出得分最高的若干只，
+    剩余名额再从其余候选中按得分补足
+
+    已有各分组内得分排序时（见UniverseSnapshot.industry_order），select_ordered只对
+    各分组排序的前缀切片，不再对全部股票做过滤和部分选择
+    """
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, candidates: np.ndarray = None) -> np.ndarray:
+        """
+        在候选行中选出得分最高的k行
+        Args:
+            scores: 得分数组
+            k: 选出的数量
+            candidates: 候选行号数组，None表示全部行；得分为NaN的行不参与选择
+        Returns:
+            np.ndarray: 按得分降序排列的行号，得分相同时行号小的在前
+        """
+        scores = np.asarray(scores)
+        if candidates is None:
+            candidates = np.arange(len(scores))
+        candidates = candidates[~np.isnan(scores[candidates])]
+        if k <= 0 or len(candidates) == 0:
+            return np.empty(0, dtype=np.int64)
+        values = scores[candidates]
+        if len(candidates) > k:
+            # 第k大的得分作为门槛，大于门槛的全部入选，等于门槛的按行号顺序补足
+            threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+            above = candidates[values > threshold]
+            ties = np.sort(candidates[values == threshold])[:k - len(above)]
+            candidates = np.concatenate([above, ties])
+            values = scores[candidates]
+        return candidates[np.lexsort((candidates, -values))]
+
+    @staticmethod
+    def select(scores: np.ndarray, k: int, mask: np.ndarray = None, groups: np.ndarray = None,
+               quotas: dict = None) -> np.ndarray:
+        """
+        过滤后按配额选出得分最高的k行，配额分组不足时由其余候选补足
+        Args:
+            scores: 得分数组
+            k: 选出的总数
+            mask: 布尔过滤条件，None表示不过滤
+            groups: 每行所属的分组（如行业），与quotas配合使用
+            quotas: 分组到优先名额的映射，各分组先选出至多该数量的股票
+        Returns:
+            np.ndarray: 按得分降序排列的行号
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        candidates = np.arange(len(scores)) if mask is None else np.flatnonzero(np.asarray(mask, dtype=bool))
+        if not quotas or groups is None:
+            return SelectionKernel.top_k(scores, k, candidates)
+
+        groups = np.asarray(groups)
+        candidate_groups = groups[candidates]
+        picked = []
+        remaining = k
+        for group, quota in quotas.items():
+            if remaining <= 0:
+                break
+            chosen = SelectionKernel.top_k(scores, min(quota, remaining), candidates[candidate_groups == group])
+            picked.append(chosen)
+            remaining -= len(chosen)
+        picked = np.concatenate(picked) if picked else np.empty(0, dtype=np.int64)
+
+        # 配额未用完的名额从尚未入选的候选中补足
+        if remaining > 0:
+            taken = np.zeros(len(scores), dtype=bool)
+            taken[picked] = True
+            rest = candidates[~taken[candidates]]
+            picked = np.concatenate([picked, SelectionKernel.top_k(scores, remaining, rest)])
+        return picked[np.lexsort((picked, -scores[picked]))]
+
+    @staticmethod
+    def _head(scores: np.ndarray, rows: np.ndarray, n: int, mask: np.ndarray = None) -> np.ndarray:
+        """在按得分降序排列的行号中取出前n个满足过滤条件的行，按需倍增检查的前缀长度"""
+        if n <= 0 or len(rows) == 0:
+            return np.empty(0, dtype=np.int64)
+        size = n
+        while True:
+            prefix = rows[:size]
+            eligible = prefix[~np.isnan(scores[prefix])]
+            if mask is not None:
+                eligible = eligible[mask[eligible]]
+            if len(eligible) >= n or size >= len(rows):
+                return eligible[:n]
+            size *= 2
+
+    @staticmethod
+    def select_ordered(scores: np.ndarray, k: int, orders: dict, groups: list = None, mask: np.ndarray = None,
+                       quotas: dict = None) -> np.ndarray:
+        """
+        利用各分组内的得分排序选出得分最高的k行，结果与select相同
+        配额分组直接取排序前缀，补足时每个分组只需提供跳过已入选部分后的前若干行
+        Args:
+            scores: 得分数组
+            k: 选出的总数
+            orders: 分组到按得分降序排列的行号数组的映射，得分相同时行号小的在前
+            groups: 参与选择的分组，None表示全部分组
+            mask: 布尔过滤条件，None表示不过滤
+            quotas: 分组到优先名额的映射，不属于groups的分组被忽略
+        Returns:
+            np.ndarray: 按得分降序排列的行号
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+        groups = list(orders) if groups is None else [group for group in groups if group in orders]
+        eligible = set(groups)
+        picked = []
+        used = {}
+        remaining = k
+        for group, quota in (quotas or {}).items():
+            if remaining <= 0:
+                break
+            if group not in eligible:
+                continue
+            chosen = SelectionKernel._head(scores, orders[group], min(quota, remaining), mask)
+            used[group] = len(chosen)
+            picked.append(chosen)
+            remaining -= len(chosen)
+
+        # 其余名额的候选：每个分组跳过已入选的前缀后再取前remaining行，合并后选出前remaining行
+        if remaining > 0:
+            pool = [SelectionKernel._head(scores, orders[group], used.get(group, 0) + remaining, mask)[used.get(group, 0):]
+                    for group in groups]
+            if pool:
+                picked.append(SelectionKernel.top_k(scores, remaining, np.concatenate(pool)))
+        if not picked:
+            return np.empty(0, dtype=np.int64)
+        picked = np.concatenate(picked)
+        return picked[np.lexsort((picked, -scores[picked]))]
+
+    @staticmethod
+    def select_frame(df: pd.DataFrame, score_column: str, k: int, mask=None, group_column: str = None,
+                     quotas: dict = None) -> pd.DataFrame:
+        """
+        在DataFrame上执行选择
+        Args:
+            df: 股票数据
+            score_column: 得分列
+            k: 选出的总数
+            mask: 布尔过滤条件，可为Series或数组
+            group_column: 分组列，与quotas配合使用
+            quotas: 分组取值到优先名额的映射
+        Returns:
+            pd.DataFrame: 按得分降序排列的选中行
+        """
+        scores = df[score_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+        groups = df[group_column].to_numpy(dtype=object) if group_column is not None and quotas else None
+        return df.iloc[SelectionKernel.select(scores, k, mask, groups, quotas)]
@@ -5,11 +5,16 @@ import time
 import logging
 import plotly.express as px
 import streamlit as st
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.model_trainer import ModelTrainer as JointModelTrainer
+from src.selection import SelectionKernel
+from src.universe import UniverseSnapshot
+from src.strategy_registry import StrategyRegistry
+from src.backtester import Backtester as PortfolioBacktester
+from src.performance import PerformanceSeries
 
 # 配置日志
 logging.basicConfig(
@@ -25,13 +30,17 @@ logger = logging.getLogger("stock_picker")
 # 确保模型目录存在
 os.makedirs('models', exist_ok=True)
 
+# 模拟数据的默认随机种子，保证结果和耗时可复现
+SEED = 42
+
 class DataLoader:
     """数据加载器类，负责获取和处理股票数据"""
     @staticmethod
-    def fetch_stock_data() -> pd.DataFrame:
-        """获取股票数据"""
+    def fetch_stock_data(seed: int = SEED) -> pd.DataFrame:
+        """获取股票数据，相同种子生成相同的数据"""
         try:
             logger.info("开始获取股票数据")
+            rng = np.random.default_rng(seed)
             # 模拟获取A股列表
             stocks = [f'股票{i}' for i in range(1, 101)]
             
@@ -39,12 +48,12 @@ class DataLoader:
             stock_data = pd.DataFrame({
                 '股票代码': [f'STock{i:03d}' for i in range(1, 101)],
                 '股票名称': stocks,
-                '最新价': np.random.uniform(5, 100, 100),
-                '涨跌幅': np.random.uniform(-10, 10, 100),
-                '成交量': np.random.randint(1000, 20000, 100),
-                '所属行业': random.choices(
+                '最新价': rng.uniform(5, 100, 100),
+                '涨跌幅': rng.uniform(-10, 10, 100),
+                '成交量': rng.integers(1000, 20000, 100),
+                '所属行业': rng.choice(
                     ['金融', '白酒', '新能源', '通信', '房地产', '有色金属'],
-                    k=100
+                    size=100
                 )
             })
             
@@ -56,28 +65,21 @@ class DataLoader:
             return pd.DataFrame()
 
     @staticmethod
-    def generate_performance_data() -> pd.DataFrame:
-        """生成历史表现数据"""
+    def generate_performance_data(start_date: str = '2023-01-01', end_date: str = '2023-12-31',
+                                  seed: int = SEED) -> pd.DataFrame:
+        """生成历史表现数据，相同种子生成相同的数据"""
         try:
             logger.info("开始生成历史表现数据")
+            rng = np.random.default_rng(seed)
             # 生成日期序列
-            dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='B')
-            
-            # 生成策略收益和上证指数收益
-            strategy_returns = [0]
-            index_returns = [0]
-            
-            for i in range(1, len(dates)):
-                # 模拟策略收益
-                strategy_returns.append(strategy_returns[-1] + random.uniform(-1, 2))
-                # 模拟上证指数收益
-                index_returns.append(index_returns[-1] + random.uniform(-1.2, 1.5))
-            
-            performance_data = pd.DataFrame({
-                '日期': dates,
-                '策略累计收益': strategy_returns,
-                '上证指数收益': index_returns
-            })
+            dates = pd.date_range(start=start_date, end=end_date, freq='B')
+            
+            # 模拟策略和上证指数的日收益率，再由PerformanceSeries一次性累乘为累计收益曲线
+            daily_returns = {
+                '策略累计收益': rng.uniform(-1, 2, len(dates)) / 100,
+                '上证指数收益': rng.uniform(-1.2, 1.5, len(dates)) / 100
+            }
+            performance_data = PerformanceSeries.build(dates, daily_returns)
             
             logger.info(f"成功生成{len(performance_data)}条历史表现数据")
             return performance_data
@@ -153,63 +155,23 @@ class FeatureEngineer:
 class ModelTrainer:
     """模型训练类，负责训练和加载模型"""
     @staticmethod
-    def train_model(stock_data: pd.DataFrame, retrain: bool = False) -> tuple:
-        """训练模型"""
+    def train_model(stock_data: pd.DataFrame, retrain: bool = False, search_mode: str = None) -> tuple:
+        """训练模型，search_mode默认读取配置项model.search_mode"""
         try:
             logger.info("开始训练模型")
             
-            # 检查是否需要重新训练
-            if not retrain and os.path.exists('models/classification_model.pkl') and os.path.exists('models/regression_model.pkl'):
-                logger.info("加载已存在的模型")
-                classification_model = joblib.load('models/classification_model.pkl')
-                regression_model = joblib.load('models/regression_model.pkl')
-                return classification_model, regression_model
-            
-            # 准备特征和目标变量
-            features = stock_data[['天道得分', '地道得分', '人道得分', 'PE', 'ROE', '净利润增长率']]
-            classification_target = stock_data['上涨标签']
-            regression_target = stock_data['预测涨跌幅']
-            
-            # 划分训练集和测试集
-            X_train, X_test, y_train_class, y_test_class = train_test_split(
-                features, classification_target, test_size=0.2, random_state=42
-            )
-            _, _, y_train_reg, y_test_reg = train_test_split(
-                features, regression_target, test_size=0.2, random_state=42
-            )
-            
-            # 标准化处理
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-            
-            # 训练分类模型
-            class_param_grid = {
-                'n_estimators': [50, 100, 150],
-                'max_depth': [None, 10, 20]
-            }
-            classification_model = GridSearchCV(
-                RandomForestClassifier(random_state=42),
-                class_param_grid,
-                cv=5
-            )
-            classification_model.fit(X_train_scaled, y_train_class)
-            
-            # 训练回归模型
-            reg_param_grid = {
-                'n_estimators': [50, 100, 150],
-                'max_depth': [None, 10, 20]
-            }
-            regression_model = GridSearchCV(
-                RandomForestRegressor(random_state=42),
-                reg_param_grid,
-                cv=5
+            # 一次划分、一次标准化，同时训练分类模型和回归模型，作为一个版本保存到模型版本库；
+            # 未重新训练时从版本库加载，同一进程内只加载一次
+            bundle = JointModelTrainer.train_joint(
+                stock_data, retrain,
+                features=['天道得分', '地道得分', '人道得分', 'PE', 'ROE', '净利润增长率'],
+                name='v2_joint_model',
+                search_mode=search_mode
             )
-            regression_model.fit(X_train_scaled, y_train_reg)
-            
-            # 保存模型
-            joblib.dump(classification_model, 'models/classification_model.pkl')
-            joblib.dump(regression_model, 'model/regression_model.pkl')
+            if not bundle:
+                return None, None
+            classification_model = bundle['classification']
+            regression_model = bundle['regression']
             
             logger.info("成功训练并保存模型")
             return classification_model, regression_model
@@ -219,22 +181,45 @@ class ModelTrainer:
             return None, None
 
 class StockSelectionStrategies:
-    """选股策略类，包含各种选股策略"""
+    """选股策略类，包含各种选股策略，策略只读取股票池快照，不修改快照"""
     @staticmethod
-    def jiuzhou_strategy(market_trend: str, risk_preference: str, industry_preference: str) -> pd.DataFrame:
-        """九州战略罗盘策略"""
+    def prepare_universe(seed: int = SEED) -> UniverseSnapshot:
+        """获取股票数据、计算维度得分和目标变量，构建一次运行中各策略和回测共享的股票池快照"""
         try:
-            logger.info(f"开始执行九州战略罗盘策略，市场趋势: {market_trend}, 风险偏好: {risk_preference}, 行业偏好: {industry_preference}")
+            logger.info("开始构建股票池快照")
             
             # 1. 获取股票数据
-            stock_data = DataLoader.fetch_stock_data()
+            stock_data = DataLoader.fetch_stock_data(seed)
             if stock_data.empty:
-                return pd.DataFrame()
+                return None
             
             # 2. 计算维度得分
             stock_data = FeatureEngineer.calculate_dimensions(stock_data)
             
-            # 3. 调整权重 based on 市场趋势和风险偏好
+            # 3. 创建目标变量
+            stock_data = FeatureEngineer.create_target_variable(stock_data)
+            
+            logger.info(f"成功构建股票池快照，共{len(stock_data)}只股票")
+            return UniverseSnapshot(stock_data)
+        except Exception as e:
+            logger.error(f"构建股票池快照时出错: {str(e)}")
+            st.error(f"构建股票池快照时出错: {str(e)}")
+            return None
+
+    @staticmethod
+    def jiuzhou_strategy(market_trend: str, risk_preference: str, industry_preference: str,
+                         universe: UniverseSnapshot = None) -> pd.DataFrame:
+        """九州战略罗盘策略，未传入股票池快照时现场构建"""
+        try:
+            logger.info(f"开始执行九州战略罗盘策略，市场趋势: {market_trend}, 风险偏好: {risk_preference}, 行业偏好: {industry_preference}")
+            
+            # 1. 股票池快照
+            if universe is None:
+                universe = StockSelectionStrategies.prepare_universe()
+            if universe is None or len(universe) == 0:
+                return pd.DataFrame()
+            
+            # 2. 调整权重 based on 市场趋势和风险偏好
             if market_trend == "上涨趋势":
                 sky_weight = 0.4
                 earth_weight = 0.3
@@ -260,35 +245,19 @@ class StockSelectionStrategies:
             
             # 归一化权重
             total_weight = sky_weight + earth_weight + human_weight
-            sky_weight /= total_weight
-            earth_weight /= total_weight
-            human_weight /= total_weight
-            
-            # 4. 计算战略指数
-            stock_data['战略指数'] = (
-                sky_weight * stock_data['天道得分'] +
-                earth_weight * stock_data['地道得分'] +
-                human_weight * stock_data['人道得分']
-            )
+            weights = np.array([sky_weight, earth_weight, human_weight]) / total_weight
             
-            # 5. 行业偏好筛选
-            if industry_preference != "全行业":
-                industry_stocks = stock_data[stock_data['所属行业'] == industry_preference]
-                if len(industry_stocks) >= 10:
-                    stock_data = industry_stocks
-                else:
-                    # 行业股票不足时，补充其他行业优质股票
-                    logger.warning(f"{industry_preference}行业股票不足，补充其他行业优质股票")
-                    top_industry_stocks = industry_stocks.nlargest(len(industry_stocks), '战略指数')
-                    other_stocks = stock_data[stock_data['所属行业'] != industry_preference]
-                    top_other_stocks = other_stocks.nlargest(10 - len(industry_stocks), '战略指数')
-                    stock_data = pd.concat([top_industry_stocks, top_other_stocks])
-            
-            # 6. 添加预测涨跌幅
-            stock_data = FeatureEngineer.create_target_variable(stock_data)
+            # 3. 计算战略指数
+            strategic_index = universe.scores @ weights
             
-            # 7. 选择前10只股票
-            selected_stocks = stock_data.nlargest(10, '战略指数')
+            # 4. 选择战略指数最高的10只股票，偏好行业优先入选，不足10只时补充其他行业优质股票
+            quotas = None if industry_preference == "全行业" else {industry_preference: 10}
+            # 行业内战略指数排序按(市场趋势, 风险偏好)缓存在快照上，偏好行业和补足都只取排序前缀
+            orders = universe.industry_order(('战略指数', market_trend, risk_preference), strategic_index)
+            rows = SelectionKernel.select_ordered(strategic_index, 10, orders, quotas=quotas)
+            selected_stocks = universe.frame(rows).assign(战略指数=strategic_index[rows])
+            if quotas and (selected_stocks['所属行业'] != industry_preference).any():
+                logger.warning(f"{industry_preference}行业股票不足，补充其他行业优质股票")
             
             logger.info(f"成功执行九州战略罗盘策略，选出{len(selected_stocks)}只股票")
             return selected_stocks
@@ -298,61 +267,50 @@ class StockSelectionStrategies:
             return pd.DataFrame()
 
     @staticmethod
-    def ai_strategy(market_trend: str, risk_preference: str, industry_preference: str, retrain: bool = False) -> pd.DataFrame:
-        """AI选股策略"""
+    def ai_strategy(market_trend: str, risk_preference: str, industry_preference: str, retrain: bool = False,
+                    universe: UniverseSnapshot = None) -> pd.DataFrame:
+        """AI选股策略，未传入股票池快照时现场构建"""
         try:
             logger.info(f"开始执行AI选股策略，市场趋势: {market_trend}, 风险偏好: {risk_preference}, 行业偏好: {industry_preference}")
             
-            # 1. 获取股票数据
-            stock_data = DataLoader.fetch_stock_data()
-            if stock_data.empty:
+            # 1. 股票池快照
+            if universe is None:
+                universe = StockSelectionStrategies.prepare_universe()
+            if universe is None or len(universe) == 0:
                 return pd.DataFrame()
             
-            # 2. 计算维度得分
-            stock_data = FeatureEngineer.calculate_dimensions(stock_data)
-            
-            # 3. 创建目标变量和特征
-            stock_data = FeatureEngineer.create_target_variable(stock_data)
-            
-            # 4. 训练或加载模型
-            classification_model, regression_model = ModelTrainer.train_model(stock_data, retrain)
+            # 2. 训练或加载模型
+            classification_model, regression_model = ModelTrainer.train_model(universe.frame(), retrain)
             if classification_model is None or regression_model is None:
                 return pd.DataFrame()
             
-            # 5. 准备特征
-            features = stock_data[['天道得分', '地道得分', '人道得分', 'PE', 'ROE', '净利润增长率']]
-            
-            # 6. 标准化处理
-            scaler = StandardScaler()
-            features_scaled = scaler.fit_transform(features)
+            # 3. 准备特征
+            features = np.column_stack([
+                universe.column(column) for column in ['天道得分', '地道得分', '人道得分', 'PE', 'ROE', '净利润增长率']
+            ])
             
-            # 7. 预测上涨概率和涨跌幅
-            stock_data['上涨概率'] = classification_model.predict_proba(features_scaled)[:, 1]
-            stock_data['预测涨跌幅'] = regression_model.predict(features_scaled)
+            # 4. 预测上涨概率和涨跌幅，模型为包含训练时标准化器的Pipeline，分块批量打分
+            up_probability = JointModelTrainer.predict_many(classification_model, features, 'predict_proba')[:, 1]
+            predicted_change = JointModelTrainer.predict_many(regression_model, features)
             
-            # 8. 结合市场趋势、风险偏好和行业偏好进行筛选
+            # 5. 结合市场趋势、风险偏好确定上涨概率门槛
             if market_trend == "上涨趋势" and risk_preference == "激进型":
-                filtered_stocks = stock_data[stock_data['上涨概率'] > 0.7]
+                threshold = 0.7
             elif market_trend == "下跌趋势" and risk_preference == "稳健型":
-                filtered_stocks = stock_data[stock_data['上涨概率'] > 0.8]
+                threshold = 0.8
             else:
-                filtered_stocks = stock_data[stock_data['上涨概率'] > 0.65]
-            
-            # 行业偏好筛选
-            if industry_preference != "全行业":
-                industry_stocks = filtered_stocks[filtered_stocks['所属行业'] == industry_preference]
-                if len(industry_stocks) >= 10:
-                    filtered_stocks = industry_stocks
-                else:
-                    # 行业股票不足时，补充其他行业优质股票
-                    logger.warning(f"{industry_preference}行业股票不足，补充其他行业优质股票")
-                    top_industry_stocks = industry_stocks.nlargest(len(industry_stocks), '上涨概率')
-                    other_stocks = filtered_stocks[filtered_stocks['所属行业'] != industry_preference]
-                    top_other_stocks = other_stocks.nlargest(10 - len(industry_stocks), '上涨概率')
-                    filtered_stocks = pd.concat([top_industry_stocks, top_other_stocks])
-            
-            # 9. 选择前10只股票
-            selected_stocks = filtered_stocks.nlargest(10, '上涨概率')
+                threshold = 0.65
+            
+            # 6. 过滤后选择上涨概率最高的10只股票，偏好行业优先入选，不足10只时补充其他行业优质股票
+            quotas = None if industry_preference == "全行业" else {industry_preference: 10}
+            # 上涨概率随模型变化，行业内排序不缓存
+            orders = universe.industry_order(None, up_probability)
+            rows = SelectionKernel.select_ordered(
+                up_probability, 10, orders, mask=up_probability > threshold, quotas=quotas
+            )
+            selected_stocks = universe.frame(rows).assign(上涨概率=up_probability[rows], 预测涨跌幅=predicted_change[rows])
+            if quotas and (selected_stocks['所属行业'] != industry_preference).any():
+                logger.warning(f"{industry_preference}行业股票不足，补充其他行业优质股票")
             
             logger.info(f"成功执行AI选股策略，选出{len(selected_stocks)}只股票")
             return selected_stocks
@@ -361,53 +319,42 @@ class StockSelectionStrategies:
             st.error(f"执行AI选股策略时出错: {str(e)}")
             return pd.DataFrame()
 
+class V2StrategyRegistry(StrategyRegistry):
+    """
+    本模块独立的策略注册表
+    本模块的策略依赖PE、ROE等src股票池没有的列，不注册到进程内共享的StrategyRegistry，
+    与命令行或src.app在同一进程中导入时不会被其run_many运行
+    """
+
+    _strategies = {}
+
+
+V2StrategyRegistry.register(
+    "九州战略罗盘",
+    lambda universe, market_trend, risk_preference, industry_preference, **params:
+        StockSelectionStrategies.jiuzhou_strategy(market_trend, risk_preference, industry_preference, universe=universe)
+)
+V2StrategyRegistry.register(
+    "AI智能选股",
+    lambda universe, market_trend, risk_preference, industry_preference, retrain=False, **params:
+        StockSelectionStrategies.ai_strategy(market_trend, risk_preference, industry_preference, retrain, universe=universe)
+)
+
 class Backtester:
     """回测类，负责回测策略表现"""
     @staticmethod
     def backtest_strategy(strategy_func, *args, **kwargs) -> dict:
-        """回测策略"""
+        """执行一次策略，在选股日期之后的持有期内按调仓周期等权持有选中的股票并计算回测指标"""
         try:
             logger.info("开始回测策略")
-            
-            # 模拟回测
-            total_returns = []
-            win_rates = []
-            max_drawdowns = []
-            sharpe_ratios = []
-            
-            for _ in range(10):  # 模拟10次回测
-                selected_stocks = strategy_func(*args, **kwargs)
-                if not selected_stocks.empty:
-                    # 计算回测指标
-                    total_return = selected_stocks['预测涨跌幅'].mean()
-                    win_rate = len(selected_stocks[selected_stocks['预测涨跌幅'] > 0]) / len(selected_stocks)
-                    max_drawdown = random.uniform(2, 8)
-                    sharpe_ratio = random.uniform(1, 3)
-                    
-                    total_returns.append(total_return)
-                    win_rates.append(win_rate)
-                    max_drawdowns.append(max_drawdown)
-                    sharpe_ratios.append(sharpe_ratio)
-            
-            # 计算平均指标
-            backtest_results = {
-                '平均总收益率': np.mean(total_returns) if total_returns else 0,
-                '平均胜率': np.mean(win_rates) if win_rates else 0,
-                '平均最大回撤': np.mean(max_drawdowns) if max_drawdowns else 0,
-                '平均夏普比率': np.mean(sharpe_ratios) if sharpe_ratios else 0
-            }
-            
+            selected_stocks = strategy_func(*args, **kwargs)
+            backtest_results = PortfolioBacktester.backtest_strategy(selected_stocks)
             logger.info("成功完成回测")
             return backtest_results
         except Exception as e:
             logger.error(f"回测策略时出错: {str(e)}")
             st.error(f"回测策略时出错: {str(e)}")
-            return {
-                '平均总收益率': 0,
-                '平均胜率': 0,
-                '平均最大回撤': 0,
-                '平均夏普比率': 0
-            }
+            return dict(PortfolioBacktester.EMPTY_RESULTS)
 
 class StockPickerApp:
     """主应用类"""
@@ -578,20 +525,20 @@ class StockPickerApp:
                         time.sleep(0.02)
                         progress_bar.progress(i + 1)
                     
+                    # 构建一次股票池快照，选股和回测共用
+                    universe = StockSelectionStrategies.prepare_universe()
+                    
                     # 执行选股策略
-                    if strategy_type == "九州战略罗盘":
-                        selected_stocks = StockSelectionStrategies.jiuzhou_strategy(
-                            market_trend, risk_preference, industry_preference
-                        )
-                    else:  # AI智能选股
-                        selected_stocks = StockSelectionStrategies.ai_strategy(
-                            market_trend, risk_preference, industry_preference, retrain_model
-                        )
+                    selected_stocks = V2StrategyRegistry.run(
+                        strategy_type, universe, market_trend=market_trend,
+                        risk_preference=risk_preference, industry_preference=industry_preference,
+                        retrain=retrain_model
+                    )
                     
                     # 执行回测
                     backtest_results = Backtester.backtest_strategy(
                         StockSelectionStrategies.jiuzhou_strategy,
-                        market_trend, risk_preference, industry_preference
+                        market_trend, risk_preference, industry_preference, universe=universe
                     )
                     
                     # 显示选股结果
@@ -4,54 +4,89 @@ import logging
 
 from utils.logger import Logger
 from utils.config import Config
+from src.selection import SelectionKernel
+from src.universe import UniverseSnapshot
+from src.strategy_registry import StrategyRegistry
 logger = Logger.get_logger("strategies")
 
 class StockSelectionStrategies:
     """选股策略类"""
 
+    # 市场趋势对应的天道、地道、人道得分权重
+    TREND_WEIGHTS = {
+        '牛市': (0.4, 0.3, 0.3),
+        '熊市': (0.3, 0.4, 0.3),
+        '震荡市': (0.3, 0.3, 0.4)
+    }
+    RISK_PREFERENCES = ['中风险', '高风险', '低风险']
+    SCORE_COLUMNS = ['天道得分', '地道得分', '人道得分']
+
+    @staticmethod
+    def _risk_count(risk_preference: str) -> int:
+        """按风险偏好读取选股数量"""
+        if risk_preference == '高风险':
+            return Config.get('strategy.high_risk_count', 5)
+        elif risk_preference == '低风险':
+            return Config.get('strategy.low_risk_count', 5)
+        return Config.get('strategy.medium_risk_count', 5)
+
     @staticmethod
-    def strategic_compass_derivation(stock_data: pd.DataFrame, market_trend: str, risk_preference: str, industry_preference: list) -> pd.DataFrame:
+    def _as_universe(stock_data) -> UniverseSnapshot:
+        """策略既可以输入股票池快照，也可以输入DataFrame"""
+        return stock_data if isinstance(stock_data, UniverseSnapshot) else UniverseSnapshot(stock_data)
+
+    @staticmethod
+    def _select(universe: UniverseSnapshot, scores: np.ndarray, count: int, industry_preference: list,
+                key=None) -> np.ndarray:
+        """
+        在预测涨跌幅为正数且大于3%、属于偏好行业的股票中选出得分最高的count只
+        行业过滤通过快照的行业索引切片完成；传入key时使用快照缓存的行业内得分排序
+        Args:
+            universe: 股票池快照
+            scores: 得分数组
+            count: 选出的数量
+            industry_preference: 行业偏好
+            key: 行业内得分排序的缓存键，None表示得分每次不同、不使用排序
+        Returns:
+            np.ndarray: 按得分降序排列的行号
+        """
+        mask = universe.column('预测涨跌幅') > 3
+        if not industry_preference or '全部' in industry_preference:
+            return SelectionKernel.select(scores, count, mask)
+        if key is None:
+            rows = universe.industry_rows(industry_preference)
+            return SelectionKernel.top_k(scores, count, rows[mask[rows]])
+        orders = universe.industry_order(key, scores)
+        return SelectionKernel.select_ordered(scores, count, orders, groups=industry_preference, mask=mask)
+
+    @staticmethod
+    def _trend_weights(market_trend: str) -> tuple:
+        """市场趋势对应的维度得分权重，未知趋势按震荡市处理"""
+        return StockSelectionStrategies.TREND_WEIGHTS.get(market_trend, StockSelectionStrategies.TREND_WEIGHTS['震荡市'])
+
+    @staticmethod
+    def strategic_compass_derivation(stock_data, market_trend: str, risk_preference: str, industry_preference: list) -> pd.DataFrame:
         """
         战略罗盘推衍选股
         Args:
-            stock_data: 股票数据
+            stock_data: 股票池快照或股票数据
             market_trend: 市场趋势
             risk_preference: 风险偏好
             industry_preference: 行业偏好
         returns:
-            选中的股票DataFrame
+            选中的股票DataFrame，带综合得分列
         """
         try:
             logger.info(f"应用战略罗盘推衍选股，市场趋势: {market_trend}, 风险偏好: {risk_preference}, 行业偏好: {industry_preference}")
-
-            # 模拟行业过滤
-            if industry_preference and '全部' not in industry_preference:
-                stock_data = stock_data[stock_data['所属行业'].isin(industry_preference)]
+            universe = StockSelectionStrategies._as_universe(stock_data)
 
             # 模拟根据市场趋势调整权重
-            if market_trend == '牛市':
-                stock_data['综合得分'] = stock_data['天道得分'] * 0.4 + stock_data['地道得分'] * 0.3 + stock_data['人道得分'] * 0.3
-            elif market_trend == '熊市':
-                stock_data['综合得分'] = stock_data['天道得分'] * 0.3 + stock_data['地道得分'] * 0.4 + stock_data['人道得分'] * 0.3
-            else:
-                stock_data['综合得分'] = stock_data['天道得分'] * 0.3 + stock_data['地道得分'] * 0.3 + stock_data['人道得分'] * 0.4
-
-            # 模拟根据风险偏好调整
-            if risk_preference == '高风险':
-                # 选择综合得分高且波动大的股票
-                high_risk_count = Config.get('strategy.high_risk_count', 5)
-                stock_data = stock_data.sort_values('综合得分', ascending=False).head(high_risk_count)
-            elif risk_preference == '低风险':
-                # 选择综合得分较高且波动小的股票
-                low_risk_count = Config.get('strategy.low_risk_count', 5)
-                stock_data = stock_data.sort_values('综合得分', ascending=False).head(low_risk_count)
-            else:
-                # 适中风险
-                medium_risk_count = Config.get('strategy.medium_risk_count', 5)
-                stock_data = stock_data.sort_values('综合得分', ascending=False).head(medium_risk_count)
-
-            # 筛选预测涨跌幅为正数且大于3%的股票
-            stock_data = stock_data[stock_data['预测涨跌幅'] > 3]
+            combined = universe.scores @ np.array(StockSelectionStrategies._trend_weights(market_trend))
+
+            # 先按行业偏好和预测涨跌幅>3%过滤，再按风险偏好对应的数量部分选出综合得分最高的股票
+            count = StockSelectionStrategies._risk_count(risk_preference)
+            rows = StockSelectionStrategies._select(universe, combined, count, industry_preference, key=('综合得分', market_trend))
+            stock_data = universe.frame(rows).assign(综合得分=combined[rows])
             logger.info(f"战略罗盘推衍选股完成，选中股票数量: {len(stock_data)}")
             return stock_data
         except Exception as e:
@@ -59,43 +94,114 @@ class StockSelectionStrategies:
             return pd.DataFrame()
 
     @staticmethod
-    def ai_strategy(stock_data: pd.DataFrame, market_trend: str, risk_preference: str, industry_preference: list) -> pd.DataFrame:
+    def ai_strategy(stock_data, market_trend: str, risk_preference: str, industry_preference: list) -> pd.DataFrame:
         """
         AI策略选股
         Args:
-            stock_data: 股票数据
+            stock_data: 股票池快照或股票数据
             market_trend: 市场趋势
             risk_preference: 风险偏好
             industry_preference: 行业偏好
         Returns:
-            选中的股票DataFrame
+            选中的股票DataFrame，带ai_score列
         """
         try:
             logger.info(f"应用AI策略选股，市场趋势: {market_trend}, 风险偏好: {risk_preference}, 行业偏好: {industry_preference}")
-
-            # 模拟行业过滤
-            if industry_preference and '全部' not in industry_preference:
-                stock_data = stock_data[stock_data['所属行业'].isin(industry_preference)]
+            universe = StockSelectionStrategies._as_universe(stock_data)
 
             # 模拟AI策略
             # 这里只是简单模拟，实际应用中会使用更复杂的算法
-            stock_data['ai_score'] = np.random.uniform(60, 95, size=len(stock_data))
-
-            # 模拟根据风险偏好调整
-            if risk_preference == '高风险':
-                high_risk_count = Config.get('strategy.high_risk_count', 5)
-                stock_data = stock_data.sort_values('ai_score', ascending=False).head(high_risk_count)
-            elif risk_preference == '低风险':
-                low_risk_count = Config.get('strategy.low_risk_count', 5)
-                stock_data = stock_data.sort_values('ai_score', ascending=False).head(low_risk_count)
-            else:
-                medium_risk_count = Config.get('strategy.medium_risk_count', 5)
-                stock_data = stock_data.sort_values('ai_score', ascending=False).head(medium_risk_count)
-
-            # 筛选预测涨跌幅为正数且大于3%的股票
-            stock_data = stock_data[stock_data['预测涨跌幅'] > 3]
+            ai_score = np.random.uniform(60, 95, size=len(universe))
+
+            # 先按行业偏好和预测涨跌幅>3%过滤，再按风险偏好对应的数量部分选出ai_score最高的股票
+            count = StockSelectionStrategies._risk_count(risk_preference)
+            rows = StockSelectionStrategies._select(universe, ai_score, count, industry_preference)
+            stock_data = universe.frame(rows).assign(ai_score=ai_score[rows])
             logger.info(f"AI策略选股完成，选中股票数量: {len(stock_data)}")
             return stock_data
         except Exception as e:
             logger.error(f"AI策略选股失败: {str(e)}")
-            return pd.DataFrame()
\ No newline at end of file
+            return pd.DataFrame()
+
+    @staticmethod
+    def evaluate_grid(stock_data, market_trends: list = None, risk_preferences: list = None,
+                      industries: list = None) -> pd.DataFrame:
+        """
+        一次计算所有市场趋势×风险偏好×行业组合的战略罗盘推衍选股结果
+        得分矩阵(股票数×3)与权重矩阵(3×组合数)相乘得到所有组合的综合得分，
+        每个(市场趋势, 行业)只做一次部分选择，各风险偏好取其前若干名
+        Args:
+            stock_data: 股票池快照或股票数据
+            market_trends: 市场趋势列表，默认为TREND_WEIGHTS的全部取值
+            risk_preferences: 风险偏好列表，默认为RISK_PREFERENCES
+            industries: 行业列表，默认读取配置项app.industries，另外总是包含"全部"
+        Returns:
+            pd.DataFrame: 选股结果表，每行为一个组合中的一只入选股票，
+                列为市场趋势、风险偏好、行业偏好、排名、行号(股票池中的位置)和综合得分，失败时返回空DataFrame
+        """
+        try:
+            market_trends = market_trends or list(StockSelectionStrategies.TREND_WEIGHTS)
+            risk_preferences = risk_preferences or StockSelectionStrategies.RISK_PREFERENCES
+            industries = industries or Config.get('app.industries', ["科技", "金融", "医疗", "消费", "能源", "制造"])
+            logger.info(f"批量计算选股组合，市场趋势: {len(market_trends)}, 风险偏好: {len(risk_preferences)}, 行业: {len(industries)}")
+
+            universe = StockSelectionStrategies._as_universe(stock_data)
+            weights = np.array([StockSelectionStrategies._trend_weights(trend) for trend in market_trends]).T
+            # (股票数×3) @ (3×市场趋势数)，转置后每行为一种市场趋势下的综合得分
+            combined = np.ascontiguousarray((universe.scores @ weights).T)
+
+            counts = {risk: StockSelectionStrategies._risk_count(risk) for risk in risk_preferences}
+            max_count = max(counts.values())
+            preferences = ['全部'] + list(industries)
+
+            frames = []
+            for j, trend in enumerate(market_trends):
+                for industry in preferences:
+                    # 选择结果按得分降序，较小数量的风险偏好直接取前缀
+                    rows = StockSelectionStrategies._select(universe, combined[j], max_count, [industry], key=('综合得分', trend))
+                    for risk, count in counts.items():
+                        picked = rows[:count]
+                        frames.append(pd.DataFrame({
+                            '市场趋势': trend,
+                            '风险偏好': risk,
+                            '行业偏好': industry,
+                            '排名': np.arange(1, len(picked) + 1),
+                            '行号': picked,
+                            '综合得分': combined[j, picked]
+                        }))
+            grid = pd.concat(frames, ignore_index=True)
+            logger.info(f"批量选股完成，组合数: {len(market_trends) * len(risk_preferences) * len(preferences)}, 结果行数: {len(grid)}")
+            return grid
+        except Exception as e:
+            logger.error(f"批量选股失败: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def select_from_grid(stock_data, grid: pd.DataFrame, market_trend: str, risk_preference: str,
+                         industry_preference: list) -> pd.DataFrame:
+        """
+        从预先计算的选股结果表中取出一个组合的结果，与strategic_compass_derivation的结果一致
+        多个行业的偏好由各行业的结果合并后取前若干名，合并集合一定包含多行业下的前若干名
+        Args:
+            stock_data: 计算结果表时使用的股票池快照或股票数据
+            grid: evaluate_grid返回的选股结果表
+            market_trend: 市场趋势
+            risk_preference: 风险偏好
+            industry_preference: 行业偏好列表
+        Returns:
+            pd.DataFrame: 选中的股票，带综合得分列，按综合得分降序排列
+        """
+        if not industry_preference or '全部' in industry_preference:
+            industry_preference = ['全部']
+        rows = grid[(grid['市场趋势'] == market_trend) & (grid['风险偏好'] == risk_preference)
+                    & grid['行业偏好'].isin(industry_preference)]
+        count = StockSelectionStrategies._risk_count(risk_preference)
+        positions = rows['行号'].to_numpy()
+        combined = rows['综合得分'].to_numpy()
+        order = np.lexsort((positions, -combined))[:count]
+        universe = StockSelectionStrategies._as_universe(stock_data)
+        return universe.frame(positions[order]).assign(综合得分=combined[order])
+
+
+StrategyRegistry.register('战略罗盘推衍', StockSelectionStrategies.strategic_compass_derivation, aliases=('九州策略',))
+StrategyRegistry.register('AI策略', StockSelectionStrategies.ai_strategy)
@@ -0,0 +1,106 @@
+import time
+
+from utils.logger import Logger
+logger = Logger.get_logger("strategy_registry")
+
+
+class StrategyRegistry:
+    """
+    选股策略注册表
+    策略是形如func(universe, **params)的函数，输入股票池快照和策略参数，返回选中股票的DataFrame；
+    多个策略可在同一个快照上依次运行，只需获取和打分一次
+
+    注册表为类属性_strategies；需要独立注册表的模块（如依赖额外列的策略）可定义子类并重新声明_strategies，
+    子类中注册的策略不会出现在StrategyRegistry中
+    """
+
+    _strategies = {}
+
+    @classmethod
+    def register(cls, name: str, func=None, aliases: tuple = ()):
+        """
+        注册策略，可作为装饰器使用
+        Args:
+            name: 策略名
+            func: 策略函数，为None时返回装饰器
+            aliases: 策略的其他名称
+        Returns:
+            策略函数或装饰器
+        """
+        def decorator(f):
+            for key in (name,) + tuple(aliases):
+                cls._strategies[key] = f
+            return f
+        return decorator if func is None else decorator(func)
+
+    @classmethod
+    def get(cls, name: str):
+        """
+        按名称查找策略
+        Args:
+            name: 策略名
+        Returns:
+            策略函数
+        Raises:
+            KeyError: 策略未注册
+        """
+        if name not in cls._strategies:
+            raise KeyError(f"未注册的选股策略: {name}")
+        return cls._strategies[name]
+
+    @classmethod
+    def names(cls) -> list:
+        """
+        列出已注册的策略名
+        Returns:
+            list: 策略名列表，包含别名
+        """
+        return list(cls._strategies)
+
+    @classmethod
+    def unique_names(cls) -> list:
+        """
+        列出已注册的策略，同一函数的别名只取先注册的一个
+        Returns:
+            list: 策略名列表
+        """
+        seen = set()
+        names = []
+        for name, func in cls._strategies.items():
+            if func not in seen:
+                seen.add(func)
+                names.append(name)
+        return names
+
+    @classmethod
+    def run(cls, name: str, universe, **params):
+        """
+        在股票池快照上运行一个策略
+        Args:
+            name: 策略名
+            universe: 股票池快照
+            **params: 策略参数
+        Returns:
+            pd.DataFrame: 选中的股票
+        """
+        return cls.get(name)(universe, **params)
+
+    @classmethod
+    def run_many(cls, universe, names: list = None, **params) -> dict:
+        """
+        在同一个股票池快照上依次运行多个策略
+        Args:
+            universe: 股票池快照
+            names: 策略名列表，默认为全部已注册的策略（同一函数的别名只运行一次）
+            **params: 所有策略共用的参数
+        Returns:
+            dict: 策略名到选中股票DataFrame的映射
+        """
+        if names is None:
+            names = cls.unique_names()
+        results = {}
+        for name in names:
+            start = time.perf_counter()
+            results[name] = cls.run(name, universe, **params)
+            logger.info(f"策略{name}完成，选中{len(results[name])}只，耗时: {time.perf_counter() - start:.3f}秒")
+        return results
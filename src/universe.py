@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+from utils.logger import Logger
+from utils.config import Config
+from src.feature_engineer import FeatureEngineer
+from src.schema import universe_schema, industry_dtype
+logger = Logger.get_logger("universe")
+
+
+class UniverseSnapshot:
+    """
+    选股股票池快照
+    每次运行只获取并打分一次，多个策略和回测共享同一份数据；
+    策略只读取快照中的只读数组，返回选中行的新DataFrame，不修改快照本身
+
+    行号为快照内的位置(0..n-1)，frame(rows)取出的行保留原始索引
+
+    快照同时维护行业到行号的索引，以及按需计算的各行业内得分排序，
+    行业过滤和跨行业补足都变为对这些数组的切片；得分变化时通过with_columns生成新快照，
+    行业索引沿用，依赖旧得分的排序失效
+    """
+
+    SCORE_COLUMNS = ['天道得分', '地道得分', '人道得分']
+
+    def __init__(self, frame: pd.DataFrame, as_of: str = None):
+        """
+        初始化股票池快照
+        Args:
+            frame: 股票池数据，每只股票一行，至少包含三个维度得分列
+            as_of: 快照日期
+        """
+        self._frame = frame
+        self.as_of = as_of
+        self._columns = {}
+        self._industry_index = None
+        self._orders = {}
+        self.scores = self._readonly(frame[self.SCORE_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    @staticmethod
+    def _readonly(values: np.ndarray) -> np.ndarray:
+        values = np.ascontiguousarray(values)
+        values.flags.writeable = False
+        return values
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._frame.columns
+
+    @property
+    def columns(self) -> list:
+        return list(self._frame.columns)
+
+    @property
+    def industry_column(self) -> str:
+        """行业列名，兼容所属行业和行业两种写法"""
+        return '所属行业' if '所属行业' in self._frame.columns else '行业'
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        取出一列的只读数组，数值列为float64，其他列为object数组，首次读取后缓存
+        Args:
+            name: 列名
+        Returns:
+            np.ndarray: 只读数组
+        """
+        values = self._columns.get(name)
+        if values is None:
+            series = self._frame[name]
+            if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values = series.to_numpy(dtype=object)
+            values = self._columns.setdefault(name, self._readonly(values))
+        return values
+
+    @property
+    def industry_index(self) -> dict:
+        """
+        行业到行号的索引，首次访问时一次分组构建
+        Returns:
+            dict: 行业到升序行号数组的映射
+        """
+        if self._industry_index is None:
+            codes, industries = pd.factorize(self._frame[self.industry_column], use_na_sentinel=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(industries)))
+            start = np.count_nonzero(codes < 0)
+            index = {}
+            for industry, end in zip(industries, bounds + start):
+                index[industry] = self._readonly(order[start:end])
+                start = end
+            self._industry_index = index
+        return self._industry_index
+
+    def industry_rows(self, industries: list) -> np.ndarray:
+        """
+        取出若干行业的全部行号
+        Args:
+            industries: 行业列表
+        Returns:
+            np.ndarray: 升序行号数组
+        """
+        index = self.industry_index
+        parts = [index[industry] for industry in industries if industry in index]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def industry_order(self, key, scores: np.ndarray = None) -> dict:
+        """
+        各行业内按得分降序排列的行号，按key缓存
+        Args:
+            key: 缓存键，scores为None时作为列名读取得分；为None时不缓存，用于每次都不同的得分
+            scores: 得分数组，如按市场趋势加权的综合得分
+        Returns:
+            dict: 行业到行号数组的映射，得分相同时行号小的在前，得分为NaN的行排在最后
+        """
+        orders = self._orders.get(key) if key is not None else None
+        if orders is None:
+            scores = self.column(key) if scores is None else np.asarray(scores, dtype=np.float64)
+            orders = {}
+            for industry, rows in self.industry_index.items():
+                values = scores[rows]
+                # NaN排在最后，其余按得分降序、行号升序
+                orders[industry] = self._readonly(rows[np.lexsort((rows, -values, np.isnan(values)))])
+            if key is not None:
+                self._orders[key] = orders
+        return orders
+
+    def with_columns(self, **columns) -> 'UniverseSnapshot':
+        """
+        生成替换或新增若干列后的新快照
+        行业列未变时沿用行业索引，未变化列上的得分排序继续有效，其余排序失效
+        Args:
+            **columns: 列名到新取值的映射
+        Returns:
+            UniverseSnapshot: 新快照
+        """
+        snapshot = UniverseSnapshot(self._frame.assign(**columns), self.as_of)
+        if snapshot.industry_column not in columns:
+            snapshot._industry_index = self._industry_index
+            snapshot._orders = {key: orders for key, orders in self._orders.items()
+                                if isinstance(key, str) and key not in columns}
+        snapshot._columns = {name: values for name, values in self._columns.items() if name not in columns}
+        return snapshot
+
+    def frame(self, rows: np.ndarray = None) -> pd.DataFrame:
+        """
+        取出快照数据
+        Args:
+            rows: 行号数组，None表示全部行
+        Returns:
+            pd.DataFrame: 新的DataFrame，修改它不影响快照
+        """
+        if rows is None:
+            return self._frame.copy()
+        return self._frame.iloc[np.asarray(rows, dtype=np.int64)].copy()
+
+    @staticmethod
+    def build(end_date: str = None, stock_codes: list = None, industry_column: str = '所属行业') -> 'UniverseSnapshot':
+        """
+        获取行情、计算维度得分并生成目标变量，构建一次运行使用的股票池快照
+        Args:
+            end_date: 快照日期，默认读取配置项app.stock_end_date
+            stock_codes: 股票代码列表，默认为前app.max_stock_codes个代码
+            industry_column: 行业列名
+        Returns:
+            UniverseSnapshot: 股票池快照，没有数据时为空快照
+        """
+        end_date = end_date or Config.get('app.stock_end_date', "2023-12-31")
+        if stock_codes is None:
+            max_stock_codes = Config.get('app.max_stock_codes', 100)
+            stock_codes = [f"{i:06d}" for i in range(1, max_stock_codes + 1)]
+        logger.info(f"构建股票池快照: {end_date}, {len(stock_codes)}只")
+
+        # 只获取指标回看窗口内的数据，计算整个股票池截至结束日期的维度得分
+        stock_data = FeatureEngineer.snapshot(end_date, stock_codes)
+        if stock_data.empty:
+            return UniverseSnapshot(pd.DataFrame(columns=UniverseSnapshot.SCORE_COLUMNS), end_date)
+
+        # 创建目标变量
+        stock_data = FeatureEngineer.create_target_variable(stock_data)
+
+        # 模拟股票基本信息
+        stock_data['股票名称'] = "股票" + stock_data['股票代码']
+        stock_data[industry_column] = np.random.choice(industry_dtype().categories, size=len(stock_data))
+        stock_data['涨跌幅'] = np.random.uniform(-5, 10, size=len(stock_data))
+        # 转换为紧凑类型：行业、名称为分类类型，得分为float32
+        stock_data = universe_schema().build(stock_data)
+        return UniverseSnapshot(stock_data, end_date)
@@ -0,0 +1,182 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import mean_squared_error, accuracy_score
+from sklearn.preprocessing import StandardScaler
+
+from utils.logger import Logger
+from utils.config import Config
+from src.model_search import HyperparameterSearch
+from src.model_trainer import ModelTrainer
+logger = Logger.get_logger("walk_forward")
+
+
+# 工作进程中以只读内存映射打开的特征数组，由_init_worker设置
+_worker_arrays = None
+
+ARRAY_NAMES = ('X', 'y_class', 'y_reg')
+
+
+def _init_worker(directory: str) -> None:
+    """工作进程初始化：以只读内存映射打开特征数组，所有进程共享同一份物理内存"""
+    global _worker_arrays
+    _worker_arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+
+
+def _run_fold(fold: dict, n_estimators: int, random_state: int) -> dict:
+    """在一折上训练分类模型和回归模型，返回测试集指标和耗时"""
+    X, y_class, y_reg = _worker_arrays['X'], _worker_arrays['y_class'], _worker_arrays['y_reg']
+    train = slice(fold['train_start'], fold['train_end'])
+    test = slice(fold['test_start'], fold['test_end'])
+
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X[train])
+    X_train = np.ascontiguousarray(scaler.transform(X[train]), dtype=np.float32)
+    X_test = np.ascontiguousarray(scaler.transform(X[test]), dtype=np.float32)
+    regressor = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state).fit(X_train, y_reg[train])
+    classifier = None
+    if len(np.unique(y_class[train])) > 1:
+        classifier = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state).fit(X_train, y_class[train])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mse = mean_squared_error(y_reg[test], regressor.predict(X_test))
+    accuracy = accuracy_score(y_class[test], classifier.predict(X_test)) if classifier is not None else np.nan
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'mse': float(mse),
+        'accuracy': float(accuracy),
+        '训练耗时': fit_seconds,
+        '预测耗时': predict_seconds,
+        '工作进程': os.getpid()
+    }
+
+
+class WalkForward:
+    """
+    滚动时间窗口的训练与评估
+    数据按日期排序后，每一折用测试窗口之前的train_days天训练，在其后test_days天上评估，
+    窗口每次向后移动step_days天，训练集永远不包含测试日期之后的数据
+
+    特征和标签写为.npy文件后由各工作进程以只读内存映射打开，
+    各折只传递行号范围，不复制特征数组
+    """
+
+    @staticmethod
+    def make_folds(dates, train_days: int, test_days: int, step_days: int = None, expanding: bool = False) -> list:
+        """
+        生成滚动窗口的各折行号范围
+        Args:
+            dates: 升序排列的日期数组
+            train_days: 训练窗口天数(日历日)
+            test_days: 测试窗口天数(日历日)
+            step_days: 窗口每次移动的天数，默认等于test_days
+            expanding: 为True时训练窗口从第一天开始逐折扩大，否则固定为train_days天
+        Returns:
+            list: 每折的字典，包含train_start、train_end、test_start、test_end行号(左闭右开)及对应日期
+        """
+        dates = np.asarray(pd.to_datetime(dates), dtype='datetime64[ns]')
+        if len(dates) == 0:
+            return []
+        step_days = step_days or test_days
+        first, last = pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+        folds = []
+        test_from = first + pd.Timedelta(days=train_days)
+        while test_from <= last:
+            test_to = test_from + pd.Timedelta(days=test_days)
+            train_from = first if expanding else test_from - pd.Timedelta(days=train_days)
+            bounds = np.searchsorted(dates, np.array([train_from, test_from, test_to], dtype='datetime64[ns]'), side='left')
+            train_start, test_start, test_end = (int(b) for b in bounds)
+            if test_start > train_start and test_end > test_start:
+                folds.append({
+                    'train_start': train_start,
+                    'train_end': test_start,
+                    'test_start': test_start,
+                    'test_end': test_end,
+                    '训练开始': pd.Timestamp(dates[train_start]).strftime('%Y-%m-%d'),
+                    '训练结束': pd.Timestamp(dates[test_start - 1]).strftime('%Y-%m-%d'),
+                    '测试开始': pd.Timestamp(dates[test_start]).strftime('%Y-%m-%d'),
+                    '测试结束': pd.Timestamp(dates[test_end - 1]).strftime('%Y-%m-%d')
+                })
+            test_from += pd.Timedelta(days=step_days)
+        return folds
+
+    @staticmethod
+    def run(data: pd.DataFrame, features: list = None, train_days: int = None, test_days: int = None,
+            step_days: int = None, expanding: bool = None, n_jobs: int = None, n_estimators: int = None) -> pd.DataFrame:
+        """
+        在面板数据上进行滚动训练与评估
+        Args:
+            data: 包含日期、特征列和预测涨跌幅的数据，可选上涨标签列，缺失时由预测涨跌幅>0生成
+            features: 特征列，默认为ModelTrainer.FEATURES
+            train_days: 训练窗口天数，默认读取配置项walk_forward.train_days
+            test_days: 测试窗口天数，默认读取配置项walk_forward.test_days
+            step_days: 窗口移动天数，默认读取配置项walk_forward.step_days
+            expanding: 是否使用扩大的训练窗口，默认读取配置项walk_forward.expanding
+            n_jobs: 并行进程数，默认读取配置项walk_forward.n_jobs，1表示在当前进程中依次执行
+            n_estimators: 每个随机森林的树数，默认读取配置项model.n_estimators
+        Returns:
+            pd.DataFrame: 每折一行，包含日期范围、样本数、mse、accuracy和耗时，失败时返回空DataFrame
+        """
+        try:
+            features = features or ModelTrainer.FEATURES
+            train_days = train_days or Config.get('walk_forward.train_days', 730)
+            test_days = test_days or Config.get('walk_forward.test_days', 90)
+            step_days = step_days or Config.get('walk_forward.step_days', test_days)
+            expanding = Config.get('walk_forward.expanding', False) if expanding is None else expanding
+            n_jobs = HyperparameterSearch.resolve_n_jobs(Config.get('walk_forward.n_jobs', -1) if n_jobs is None else n_jobs)
+            n_estimators = n_estimators or Config.get('model.n_estimators', 100)
+            random_state = Config.get('model.random_state', 42)
+
+            # 按日期稳定排序，每折的训练集和测试集都是连续的行号范围
+            order = np.argsort(pd.to_datetime(data['日期']).to_numpy(), kind='stable')
+            ordered = data.iloc[order]
+            X, y_class, y_reg = ModelTrainer._joint_arrays(ordered, features)
+            folds = WalkForward.make_folds(ordered['日期'].to_numpy(), train_days, test_days, step_days, expanding)
+            if not folds:
+                logger.warning("数据日期跨度不足一个训练窗口，无法进行滚动评估")
+                return pd.DataFrame()
+            logger.info(f"开始滚动评估，样本数: {len(data)}, 折数: {len(folds)}, 进程数: {n_jobs}")
+
+            start = time.perf_counter()
+            with tempfile.TemporaryDirectory() as directory:
+                for name, values in zip(ARRAY_NAMES, (X, y_class, y_reg)):
+                    np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(values))
+                if n_jobs == 1:
+                    global _worker_arrays
+                    _init_worker(directory)
+                    try:
+                        results = [_run_fold(fold, n_estimators, random_state) for fold in folds]
+                    finally:
+                        # 释放内存映射，临时目录才能删除
+                        _worker_arrays = None
+                else:
+                    with ProcessPoolExecutor(max_workers=min(n_jobs, len(folds)), initializer=_init_worker,
+                                             initargs=(directory,)) as executor:
+                        futures = [executor.submit(_run_fold, fold, n_estimators, random_state) for fold in folds]
+                        results = [future.result() for future in futures]
+
+            rows = []
+            for i, (fold, result) in enumerate(zip(folds, results)):
+                rows.append({
+                    '折': i + 1,
+                    '训练开始': fold['训练开始'],
+                    '训练结束': fold['训练结束'],
+                    '测试开始': fold['测试开始'],
+                    '测试结束': fold['测试结束'],
+                    '训练样本数': fold['train_end'] - fold['train_start'],
+                    '测试样本数': fold['test_end'] - fold['test_start'],
+                    **result
+                })
+            report = pd.DataFrame(rows)
+            logger.info(f"滚动评估完成，总耗时: {time.perf_counter() - start:.2f}秒, "
+                        f"平均mse: {report['mse'].mean():.4f}, 平均accuracy: {report['accuracy'].mean():.4f}")
+            return report
+        except Exception as e:
+            logger.error(f"滚动评估失败: {str(e)}")
+            return pd.DataFrame()
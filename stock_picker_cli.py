@@ -1,20 +1,18 @@
 import os
 import sys
-import pandas as pd
-import numpy as np
 import logging
-import random
 import datetime
 
 # 设置路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入自定义模块
-from src.data_loader import DataLoader
-from src.feature_engineer import FeatureEngineer
 from src.model_trainer import ModelTrainer
+# 导入即在StrategyRegistry中注册内置策略，本模块不直接使用该类
 from src.strategies import StockSelectionStrategies
 from src.backtester import Backtester
+from src.universe import UniverseSnapshot
+from src.strategy_registry import StrategyRegistry
 from utils.logger import Logger
 from utils.config import Config
 
@@ -45,46 +43,20 @@ class StockPickerCLI:
         try:
             logger.info(f"开始运行选股系统，策略: {strategy}")
 
-            # 模拟股票数据
-            max_stock_codes = Config.get('app.max_stock_codes', 100)
-            stock_codes = [f"{i:06d}" for i in range(1, max_stock_codes + 1)]
-            stock_data = []
-
-            for code in stock_codes:
-                # 模拟股票基本信息
-                industry = random.choice(["科技", "金融", "医疗", "消费", "能源", "制造"])
-                name = f"股票{code}"
-
-                # 模拟股票数据
-                start_date = Config.get('app.stock_start_date', "2023-01-01")
-                end_date = Config.get('app.stock_end_date', "2023-12-31")
-                df = DataLoader.fetch_stock_data(code, start_date, end_date)
-                if not df.empty:
-                    # 计算维度得分
-                    df = FeatureEngineer.calculate_dimensions(df)
-                    # 创建目标变量
-                    df = FeatureEngineer.create_target_variable(df)
-
-                    # 获取最新数据
-                    latest_data = df.iloc[-1].to_dict()
-                    latest_data['股票代码'] = code
-                    latest_data['股票名称'] = name
-                    latest_data['行业'] = industry
-
-                    # 检查行业偏好
-                    if "全部" in industry_preference or industry in industry_preference:
-                        stock_data.append(latest_data)
-
-            # 训练模型
-            if stock_data:
-                # 准备训练数据
-                train_data = pd.DataFrame(stock_data)
-                ModelTrainer.train_model(train_data, retrain_model)
+            # 构建股票池快照，获取行情和计算维度得分只做一次
+            universe = self.build_universe()
+            if len(universe) > 0:
+                # 训练模型
+                stock_data = self._training_data(universe, industry_preference)
+                if not stock_data.empty:
+                    ModelTrainer.train_model(stock_data, retrain_model)
 
                 # 选股策略
-                # 系统默认使用战略罗盘推衍策略
-                selected_stocks = StockSelectionStrategies.strategic_compass_derivation(
-                    pd.DataFrame(stock_data), market_trend, risk_preference, industry_preference
+                # 系统默认使用战略罗盘推衍策略，未注册的策略名按默认策略处理
+                name = strategy if strategy in StrategyRegistry.names() else "战略罗盘推衍"
+                selected_stocks = StrategyRegistry.run(
+                    name, universe, market_trend=market_trend,
+                    risk_preference=risk_preference, industry_preference=industry_preference
                 )
 
                 logger.info(f"选股完成，共选出{len(selected_stocks)}支股票")
@@ -98,6 +70,49 @@ class StockPickerCLI:
             return []
 
 
+    @staticmethod
+    def build_universe():
+        """构建一次运行使用的股票池快照"""
+        max_stock_codes = Config.get('app.max_stock_codes', 100)
+        stock_codes = [f"{i:06d}" for i in range(1, max_stock_codes + 1)]
+        end_date = Config.get('app.stock_end_date', "2023-12-31")
+        return UniverseSnapshot.build(end_date, stock_codes, industry_column='行业')
+
+    @staticmethod
+    def _training_data(universe, industry_preference):
+        """按行业偏好取出训练数据"""
+        stock_data = universe.frame()
+        if "全部" not in industry_preference:
+            stock_data = stock_data[stock_data['行业'].isin(industry_preference)].reset_index(drop=True)
+        return stock_data
+
+    def compare(self, strategies=None, market_trend="震荡市", risk_preference="中风险",
+                industry_preference=["全部"]):
+        """在同一个股票池快照上并列运行多个策略
+
+        Args:
+            strategies: 策略名列表，默认为全部已注册的策略
+            market_trend: 市场趋势判断
+            risk_preference: 风险偏好
+            industry_preference: 行业偏好
+
+        Returns:
+            dict: 策略名到选股结果的映射
+        """
+        try:
+            logger.info(f"开始并列运行选股策略: {strategies or '全部'}")
+            universe = self.build_universe()
+            if len(universe) == 0:
+                logger.warning("没有找到符合条件的股票数据")
+                return {}
+            return StrategyRegistry.run_many(
+                universe, strategies, market_trend=market_trend,
+                risk_preference=risk_preference, industry_preference=industry_preference
+            )
+        except Exception as e:
+            logger.error(f"并列运行选股策略失败: {str(e)}")
+            return {}
+
 def calculate_match_score(row, strategy, market_trend, risk_preference):
     """计算策略匹配度评分"""
     # 初始化评分
@@ -0,0 +1,129 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.backtest_sweep import BacktestSweep
+from src.backtester import Backtester
+from src.data_source import SimulatedSource
+from src.feature_store import FeatureStore
+from src.indicators import IndicatorEngine
+from src.price_matrix import PriceMatrix
+from src.strategies import StockSelectionStrategies
+from src.strategy_registry import StrategyRegistry
+from src.universe import UniverseSnapshot
+
+
+class TestBacktestSweep(unittest.TestCase):
+    """测试多参数回测扫描"""
+
+    def setUp(self):
+        """设置测试数据：12只股票两年的行情"""
+        self.tmp_dir = tempfile.mkdtemp()
+        codes = [f"{i:06d}" for i in range(1, 13)]
+        panel = SimulatedSource(seed=3).fetch_panel(codes, "2022-01-01", "2023-12-31")
+        self.prices = PriceMatrix.from_panel(panel)
+        self.params = BacktestSweep.param_grid(['战略罗盘推衍'], risk_preferences=['高风险', '低风险'])
+
+    def tearDown(self):
+        """删除临时目录"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_param_grid(self):
+        """测试默认参数组合为策略×市场趋势×风险偏好"""
+        grid = BacktestSweep.param_grid()
+        strategies = StrategyRegistry.unique_names()
+        self.assertIn('AI策略', strategies)
+        self.assertNotIn('九州策略', strategies)
+        self.assertEqual(len(grid), len(strategies) * 9)
+        self.assertEqual(len({BacktestSweep.task_key(params) for params in grid}), len(grid))
+        self.assertEqual(len(self.params), 6)
+        grid = BacktestSweep.param_grid(['战略罗盘推衍'], ['牛市'], ['中风险'], [['全部'], ['科技', '金融']])
+        self.assertEqual([params['行业偏好'] for params in grid], [['全部'], ['科技', '金融']])
+
+    def test_dimension_scores(self):
+        """测试分块计算的得分与整体计算一致"""
+        rows = np.array([100, 200, 300])
+        scores = BacktestSweep.dimension_scores(self.prices, rows, chunk_size=5)
+        expected = IndicatorEngine.compute(self.prices['收盘价'], self.prices['成交量'], self.prices['成交额'])
+        self.assertEqual(scores.shape, (3, 12, 3))
+        np.testing.assert_allclose(scores[:, :, 0], expected['天道得分'][rows])
+        np.testing.assert_allclose(scores[:, :, 2], expected['人道得分'][rows])
+
+    def test_run(self):
+        """测试每组参数的结果与逐个调仓日运行策略选股后回测一致"""
+        industries = np.array(['科技', '金融'] * 6)
+        rows = self.prices.date_slice("2023-01-01", None)
+        rebalance_rows = Backtester.rebalance_schedule(self.prices.dates[rows]) + rows.start
+        predicted = np.random.default_rng(0).uniform(-5, 10, size=(len(rebalance_rows), 12))
+        params = self.params + BacktestSweep.param_grid(['战略罗盘推衍'], ['牛市'], ['中风险'], [['科技']])
+        report = BacktestSweep.run(self.prices, params, start_date="2023-01-01", n_jobs=1,
+                                   directory=self.tmp_dir, predicted=predicted, industries=industries)
+        self.assertEqual(len(report), len(params))
+        for column in ['策略', '市场趋势', '风险偏好', '行业偏好', '平均持仓数', '平均总收益率', '平均夏普比率', '耗时', '续跑']:
+            self.assertIn(column, report.columns)
+        self.assertFalse(report['续跑'].any())
+
+        # 参照：各调仓日用相同的股票池快照直接调用策略选股，交给Backtester.run回测
+        scores = BacktestSweep.dimension_scores(self.prices, rebalance_rows)
+        for index in (0, len(params) - 1):
+            task = params[index]
+            selections = {}
+            counts = []
+            for i, row in enumerate(rebalance_rows):
+                universe = UniverseSnapshot(pd.DataFrame({
+                    '股票代码': self.prices.codes, '天道得分': scores[i, :, 0], '地道得分': scores[i, :, 1],
+                    '人道得分': scores[i, :, 2], '预测涨跌幅': predicted[i], '所属行业': industries
+                }))
+                selected = StockSelectionStrategies.strategic_compass_derivation(
+                    universe, task['市场趋势'], task['风险偏好'], task['行业偏好'])
+                # 策略的过滤条件生效：只选预测涨跌幅大于3%、属于偏好行业的股票
+                self.assertTrue((selected['预测涨跌幅'] > 3).all())
+                if task['行业偏好'] != ['全部']:
+                    self.assertTrue((selected['所属行业'].isin(task['行业偏好'])).all())
+                selections[self.prices.dates[row]] = selected['股票代码'].tolist()
+                counts.append(len(selected))
+            expected = Backtester.run(self.prices, selections, start_date="2023-01-01")
+            self.assertAlmostEqual(report.loc[index, '平均总收益率'], expected['平均总收益率'])
+            self.assertAlmostEqual(report.loc[index, '平均夏普比率'], expected['平均夏普比率'])
+            self.assertAlmostEqual(report.loc[index, '平均持仓数'], np.mean(counts))
+
+    def test_sweep_key(self):
+        """测试行情内容或指标版本变化时使用新的扫描目录"""
+        rows = self.prices.date_slice("2023-01-01", None)
+        predicted, industries = BacktestSweep.universe_inputs(12, 12)
+        key = BacktestSweep._sweep_key(self.prices, rows, 'M', predicted, industries)
+        self.assertEqual(BacktestSweep._sweep_key(self.prices, rows, 'M', predicted, industries), key)
+
+        fields = {field: np.array(self.prices[field]) for field in ('收盘价', '成交量', '成交额')}
+        fields['收盘价'][rows.start, 0] *= 1.01
+        changed = PriceMatrix(self.prices.dates, self.prices.codes, fields)
+        self.assertNotEqual(BacktestSweep._sweep_key(changed, rows, 'M', predicted, industries), key)
+        self.assertNotEqual(BacktestSweep._sweep_key(self.prices, rows, 'M', predicted + 1, industries), key)
+
+        with mock.patch.object(FeatureStore, 'feature_fingerprint', return_value='other'):
+            self.assertNotEqual(BacktestSweep._sweep_key(self.prices, rows, 'M', predicted, industries), key)
+
+    def test_resume(self):
+        """测试中断后续跑只计算未完成的参数组"""
+        first = BacktestSweep.run(self.prices, self.params[:2], n_jobs=1, directory=self.tmp_dir)
+        # 模拟中断：结果文件最后一行没有写完整
+        path = os.path.join(self.tmp_dir, 'results.jsonl')
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(lines[0] + lines[1][:20])
+
+        report = BacktestSweep.run(self.prices, self.params, n_jobs=1, directory=self.tmp_dir)
+        self.assertEqual(report['续跑'].tolist(), [True] + [False] * (len(self.params) - 1))
+        np.testing.assert_allclose(report['平均总收益率'][:2], first['平均总收益率'])
+
+        fresh = BacktestSweep.run(self.prices, self.params, n_jobs=1, directory=self.tmp_dir, resume=False)
+        self.assertFalse(fresh['续跑'].any())
+        np.testing.assert_allclose(fresh['平均总收益率'], report['平均总收益率'])
+
+
+if __name__ == '__main__':
+    unittest.main()
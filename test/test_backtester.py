@@ -0,0 +1,132 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.backtester import Backtester
+from src.price_matrix import PriceMatrix
+
+
+class TestBacktester(unittest.TestCase):
+    """测试组合回测类"""
+
+    def setUp(self):
+        """设置测试数据：3只股票、6个交易日"""
+        self.dates = pd.bdate_range("2023-01-30", periods=6).to_numpy(dtype='datetime64[ns]')
+        self.close = np.array([
+            [10.0, 20.0, np.nan],
+            [11.0, 20.0, np.nan],
+            [12.1, np.nan, 5.0],
+            [12.1, 22.0, 5.5],
+            [11.0, 22.0, 5.0],
+            [11.0, 24.2, 5.0]
+        ])
+        self.prices = PriceMatrix(self.dates, np.array(["000001", "000002", "000003"]), {'收盘价': self.close})
+
+    def _reference_returns(self, rebalance_rows, holdings, weights):
+        """逐日、逐股计算组合净值作为参照"""
+        filled = pd.DataFrame(self.close).ffill().to_numpy()
+        value = np.ones(len(filled))
+        for t in range(1, len(filled)):
+            period = np.searchsorted(rebalance_rows, t - 1, side='right') - 1
+            if period < 0:
+                value[t] = value[t - 1]
+                continue
+            row = rebalance_rows[period]
+            start_value = value[row]
+            total = 0.0
+            for col, weight in zip(holdings[period], weights[period]):
+                base = filled[row, col]
+                total += weight * (1.0 if np.isnan(base) else filled[t, col] / base)
+            value[t] = start_value * total
+        return np.r_[0.0, value[1:] / value[:-1] - 1]
+
+    def test_rebalance_schedule(self):
+        """测试调仓计划取每个周期的第一个交易日"""
+        rows = Backtester.rebalance_schedule(self.dates, 'M')
+        np.testing.assert_array_equal(rows, [0, 2])
+        rows = Backtester.rebalance_schedule(self.dates, 'W')
+        np.testing.assert_array_equal(rows, [0, 5])
+
+    def test_portfolio_returns(self):
+        """测试组合日收益与逐日计算一致，停牌沿用前收盘价，调仓日无价格的股票视为现金"""
+        rebalance_rows = np.array([0, 2])
+        holdings = np.array([[0, 1, 2], [1, 2, 0]])
+        weights = np.array([[0.5, 0.5, 0.0], [0.5, 0.5, 0.0]])
+        returns = Backtester.portfolio_returns(self.close, rebalance_rows, holdings, weights)
+        np.testing.assert_allclose(returns, self._reference_returns(rebalance_rows, holdings, weights))
+        # 第1日: 0.5*11/10+0.5*1 = 1.05
+        self.assertAlmostEqual(returns[1], 0.05)
+
+        # 第0日持有调仓日尚无价格的股票，该部分视为现金
+        weights = np.array([[0.5, 0.0, 0.5], [0.5, 0.5, 0.0]])
+        returns = Backtester.portfolio_returns(self.close, rebalance_rows, holdings, weights)
+        self.assertAlmostEqual(returns[1], 0.05)
+        np.testing.assert_allclose(returns, self._reference_returns(rebalance_rows, holdings, weights))
+
+    def test_metrics(self):
+        """测试回测指标"""
+        returns = np.array([0.0, 0.1, -0.5, 0.2])
+        results = Backtester.metrics(returns, np.array([0, 2]), risk_free_rate=0.0)
+        equity = np.cumprod(1 + returns)
+        self.assertAlmostEqual(results['平均总收益率'], (equity[-1] - 1) * 100)
+        self.assertAlmostEqual(results['平均最大回撤'], 50.0)
+        # 两个持有期: 0.55/1-1 < 0, 0.66/0.55-1 > 0
+        self.assertAlmostEqual(results['平均胜率'], 0.5)
+        daily = returns[1:]
+        self.assertAlmostEqual(results['平均夏普比率'], daily.mean() / daily.std(ddof=1) * np.sqrt(252))
+        self.assertEqual(results['交易日数'], 3)
+        self.assertEqual(results['调仓次数'], 2)
+
+        self.assertEqual(Backtester.metrics(np.zeros(1)), Backtester.EMPTY_RESULTS)
+
+    def test_run(self):
+        """测试按日期和选股结果回测"""
+        selections = {
+            "2023-01-30": ["000001", "000002", "999999"],
+            "2023-02-01": pd.DataFrame({'股票代码': ["000002", "000003"]})
+        }
+        results = Backtester.run(self.prices, selections)
+        rebalance_rows, holdings, weights = Backtester.build_holdings(self.prices, selections)
+        np.testing.assert_array_equal(rebalance_rows, [0, 2])
+        np.testing.assert_allclose(weights.sum(axis=1), [1.0, 1.0])
+        expected = self._reference_returns(rebalance_rows, holdings, weights)
+        np.testing.assert_allclose(results['日收益率'].to_numpy(), expected)
+        self.assertEqual(list(results['日收益率'].index), list(pd.DatetimeIndex(self.dates)))
+
+        # 回测区间从第二个调仓日开始，行号相对于区间起点
+        results = Backtester.run(self.prices, selections, start_date="2023-02-01")
+        self.assertEqual(len(results['日收益率']), 4)
+        self.assertEqual(results['调仓次数'], 1)
+        self.assertAlmostEqual(results['日收益率'].iloc[1], 0.5 * 22 / 20 + 0.5 * 5.5 / 5 - 1)
+
+    def test_backtest_strategy(self):
+        """测试等权持有选中股票的回测"""
+        selected = pd.DataFrame({'股票代码': ["000001", "000002"]})
+        results = Backtester.backtest_strategy(selected, self.prices, "2023-01-30", "2023-02-06", freq='M',
+                                               as_of="2023-01-27")
+        self.assertEqual(results['调仓次数'], 2)
+        self.assertNotIn('日收益率', results)
+        for key in Backtester.EMPTY_RESULTS:
+            self.assertIn(key, results)
+
+        self.assertEqual(Backtester.backtest_strategy(pd.DataFrame()), Backtester.EMPTY_RESULTS)
+
+    def test_backtest_strategy_after_selection_date(self):
+        """测试回测区间不早于选股日期：开始日期早于选股日期时只回测其后的部分"""
+        selected = pd.DataFrame({
+            '股票代码': ["000001", "000002"],
+            '日期': pd.to_datetime(["2023-01-31", "2023-01-31"])
+        })
+        self.assertEqual(Backtester.selection_date(selected), pd.Timestamp("2023-01-31"))
+        results = Backtester.backtest_strategy(selected, self.prices, "2023-01-30", "2023-02-06", freq='M')
+        expected = Backtester.run(self.prices, {"2023-02-01": ["000001", "000002"]}, "2023-02-01", "2023-02-06")
+        self.assertEqual(results['调仓次数'], 1)
+        self.assertEqual(results['交易日数'], 3)
+        self.assertAlmostEqual(results['平均总收益率'], expected['平均总收益率'])
+
+        # 回测区间整体在选股日期之前时不回测
+        results = Backtester.backtest_strategy(selected, self.prices, "2023-01-30", "2023-01-31")
+        self.assertEqual(results, Backtester.EMPTY_RESULTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
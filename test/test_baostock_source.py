@@ -0,0 +1,188 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+import time
+import pandas as pd
+from src.baostock_source import BaostockSource, BaostockError, TokenBucket
+
+
+class FakeResultSet:
+    """模拟baostock查询结果集"""
+
+    def __init__(self, rows, error_code='0', error_msg='success'):
+        self.fields = ['date', 'open', 'high', 'low', 'close', 'volume', 'amount']
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self._rows = rows
+        self._pos = -1
+
+    def next(self):
+        self._pos += 1
+        return self._pos < len(self._rows)
+
+    def get_row_data(self):
+        return self._rows[self._pos]
+
+
+class FakeLoginResult:
+    error_code = '0'
+    error_msg = 'success'
+
+
+class FakeBaostockClient:
+    """本地baostock桩对象，可指定每只股票前几次查询失败"""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.login_count = 0
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def login(self):
+        self.login_count += 1
+        return FakeLoginResult()
+
+    def logout(self):
+        pass
+
+    def query_history_k_data_plus(self, code, fields, start_date, end_date, frequency, adjustflag):
+        with self._lock:
+            self.queries.append(code)
+            if self.failures.get(code, 0) > 0:
+                self.failures[code] -= 1
+                return FakeResultSet([], error_code='10002007', error_msg='网络接收错误')
+        dates = pd.date_range(start_date, end_date, freq='B')
+        rows = [[d.strftime('%Y-%m-%d'), '10.0', '11.0', '9.5', '10.5', '1000', '10500.0'] for d in dates]
+        return FakeResultSet(rows)
+
+
+# 进程池模式下工作进程导入本模块作为baostock：登录、退出记录到FAKE_BAOSTOCK_LOG指定的文件，
+# 设置FAKE_BAOSTOCK_LOGIN_ERROR时登录返回该错误码
+_module_client = FakeBaostockClient()
+
+
+def _record(event):
+    with open(os.environ['FAKE_BAOSTOCK_LOG'], 'a', encoding='utf-8') as f:
+        f.write(f"{event} {os.getpid()}\n")
+
+
+def login():
+    _record('login')
+    result = FakeLoginResult()
+    if os.environ.get('FAKE_BAOSTOCK_LOGIN_ERROR'):
+        result.error_code = os.environ['FAKE_BAOSTOCK_LOGIN_ERROR']
+        result.error_msg = '用户未登录'
+    return result
+
+
+def logout():
+    _record('logout')
+
+
+def query_history_k_data_plus(*args, **kwargs):
+    return _module_client.query_history_k_data_plus(*args, **kwargs)
+
+
+class TestBaostockSource(unittest.TestCase):
+    """测试baostock数据源"""
+
+    def test_to_baostock_code(self):
+        """测试代码格式转换"""
+        self.assertEqual(BaostockSource.to_baostock_code("600000.SH"), "sh.600000")
+        self.assertEqual(BaostockSource.to_baostock_code("000001"), "sz.000001")
+        self.assertEqual(BaostockSource.to_baostock_code("sh.600000"), "sh.600000")
+        self.assertEqual(BaostockSource.to_baostock_code("430047"), "bj.430047")
+        self.assertEqual(BaostockSource.to_baostock_code("830799"), "bj.830799")
+        self.assertEqual(BaostockSource.to_baostock_code("920002"), "bj.920002")
+        self.assertEqual(BaostockSource.to_baostock_code("900901"), "sh.900901")
+        self.assertEqual(BaostockSource.to_baostock_code("300750"), "sz.300750")
+
+    def test_fetch_panel_reuses_session(self):
+        """测试并发查询只登录一次"""
+        client = FakeBaostockClient()
+        source = BaostockSource(client, max_workers=4, rate=1000, backoff=0)
+        codes = [f"{i:06d}" for i in range(1, 21)]
+        panel = source.fetch_panel(codes, "2023-01-02", "2023-01-06")
+        source.fetch_panel(codes[:2], "2023-01-02", "2023-01-06")
+
+        self.assertEqual(client.login_count, 1)
+        self.assertEqual(len(panel), len(codes) * 5)
+        self.assertEqual(panel['股票代码'].unique().tolist(), codes)
+        self.assertEqual(panel['收盘价'].dtype, float)
+        self.assertEqual(panel['成交量'].dtype, 'int64')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(panel['日期']))
+
+    def test_retry_with_backoff(self):
+        """测试查询失败后重试，超过重试次数的股票被跳过"""
+        client = FakeBaostockClient(failures={'sz.000001': 2, 'sz.000002': 10})
+        source = BaostockSource(client, max_workers=2, rate=1000, max_retries=2, backoff=0)
+        panel = source.fetch_panel(["000001", "000002"], "2023-01-02", "2023-01-03")
+        self.assertEqual(panel['股票代码'].unique().tolist(), ["000001"])
+        self.assertEqual(panel.attrs['失败股票'], ["000002"])
+        self.assertEqual(client.queries.count('sz.000001'), 3)
+
+        with self.assertRaises(BaostockError):
+            source.fetch_stock_data("000002", "2023-01-02", "2023-01-03")
+
+    def _read_log(self):
+        """读取工作进程的登录、退出记录"""
+        with open(os.environ['FAKE_BAOSTOCK_LOG'], 'r', encoding='utf-8') as f:
+            return [line.split() for line in f]
+
+    def test_process_pool(self):
+        """测试进程池在多次查询间复用，每个工作进程登录一次，关闭时各自退出登录"""
+        log_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch.dict(os.environ, {'FAKE_BAOSTOCK_LOG': os.path.join(log_dir, 'log.txt')}):
+                with BaostockSource(max_workers=2, rate=1000, backoff=0, module=__name__) as source:
+                    codes = [f"{i:06d}" for i in range(1, 9)]
+                    panel = source.fetch_panel(codes, "2023-01-02", "2023-01-06")
+                    pool = source._pool
+                    for start_date in ("2023-01-03", "2023-01-04", "2023-01-05"):
+                        source.fetch_panel(codes[:3], start_date, "2023-01-06")
+                    self.assertIs(source._pool, pool)
+                self.assertIsNone(source._pool)
+
+                self.assertEqual(panel['股票代码'].unique().tolist(), codes)
+                self.assertEqual(len(panel), len(codes) * 5)
+                events = self._read_log()
+                logins = [pid for event, pid in events if event == 'login']
+                logouts = [pid for event, pid in events if event == 'logout']
+                self.assertLessEqual(len(logins), 2)
+                self.assertEqual(len(set(logins)), len(logins))
+                self.assertEqual(sorted(logouts), sorted(logins))
+        finally:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    def test_process_pool_login_failure(self):
+        """测试工作进程登录失败时所有股票记为失败，进程池被丢弃，下次查询重新创建"""
+        log_dir = tempfile.mkdtemp()
+        try:
+            env = {'FAKE_BAOSTOCK_LOG': os.path.join(log_dir, 'log.txt'), 'FAKE_BAOSTOCK_LOGIN_ERROR': '10001001'}
+            source = BaostockSource(max_workers=1, rate=1000, backoff=0, module=__name__)
+            try:
+                with mock.patch.dict(os.environ, env):
+                    self.assertTrue(source.fetch_panel(["000001", "000002"], "2023-01-02", "2023-01-06").empty)
+                    self.assertIsNone(source._pool)
+                with mock.patch.dict(os.environ, {'FAKE_BAOSTOCK_LOG': env['FAKE_BAOSTOCK_LOG']}):
+                    panel = source.fetch_panel(["000001"], "2023-01-02", "2023-01-06")
+                    self.assertEqual(len(panel), 5)
+            finally:
+                source.close()
+        finally:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    def test_token_bucket(self):
+        """测试令牌桶限流"""
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import os
 import tempfile
+import toml
 from utils.config import Config
 from utils.logger import Logger
 
@@ -32,6 +33,9 @@ batch_size = 16
         """测试后清理，删除临时配置文件"""
         if os.path.exists(cls.temp_config_path):
             os.remove(cls.temp_config_path)
+        # 恢复为默认配置文件，避免影响其他测试
+        Config._loaded = False
+        Config._config = {}
 
     def test_load_config(self):
         """测试加载配置文件"""
@@ -57,6 +61,20 @@ batch_size = 16
         self.assertEqual(len(api_section), 2)
         self.assertEqual(api_section['api_key'], 'test_key')
 
+    def test_project_config(self):
+        """测试读取项目配置文件中的分节配置项"""
+        Config._loaded = False
+        Config._config = {}
+        Config.load_config('.env.toml')
+        with open('.env.toml', 'r', encoding='utf-8') as f:
+            expected = toml.load(f)
+        self.assertEqual(Config.get('walk_forward.train_days'), expected['walk_forward']['train_days'])
+        self.assertEqual(Config.get('model.search_time_budget'), expected['model']['search_time_budget'])
+        self.assertEqual(Config.get('app.industries'), expected['app']['industries'])
+        self.assertEqual(Config.get('model.missing_key', 7), 7)
+        Config._loaded = False
+        Config._config = {}
+
     def test_config_not_found(self):
         """测试配置文件不存在的情况"""
         # 重置配置
@@ -1,11 +1,30 @@
 import unittest
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
 import pandas as pd
 from src.data_loader import DataLoader
+from src.market_data_store import MarketDataStore
+from src.baostock_source import BaostockSource
+from src.data_source import SimulatedSource
+from utils.config import Config
+from test.test_baostock_source import FakeBaostockClient
 
 
 class TestDataLoader(unittest.TestCase):
     """测试数据加载器类"""
 
+    def setUp(self):
+        """使用临时目录作为本地行情存储"""
+        self.root_dir = tempfile.mkdtemp()
+        DataLoader.set_store(MarketDataStore(self.root_dir))
+
+    def tearDown(self):
+        """恢复默认存储并删除临时目录"""
+        DataLoader.set_store(None)
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
     def test_fetch_stock_data(self):
         """测试获取股票数据"""
         # 测试正常情况
@@ -19,6 +38,114 @@ class TestDataLoader(unittest.TestCase):
         df = DataLoader.fetch_stock_data("", "2023-01-01", "2023-12-31")
         self.assertIsInstance(df, pd.DataFrame)
 
+    def test_fetch_panel(self):
+        """测试批量获取面板数据"""
+        codes = ["000001", "000002", "000003"]
+        panel = DataLoader.fetch_panel(codes, "2023-01-01", "2023-01-31")
+        self.assertIsInstance(panel, pd.DataFrame)
+        n_dates = len(pd.date_range("2023-01-01", "2023-01-31", freq='B'))
+        self.assertEqual(len(panel), len(codes) * n_dates)
+        self.assertIn('股票代码', panel.columns)
+        self.assertIn('收盘价', panel.columns)
+        self.assertEqual(panel['股票代码'].unique().tolist(), codes)
+
+        # 每只股票只保留最新一行
+        latest = DataLoader.latest_rows(panel)
+        self.assertEqual(latest['股票代码'].tolist(), codes)
+        self.assertTrue((latest['日期'] == pd.Timestamp("2023-01-31")).all())
+
+    def test_incremental_append_matches_one_shot(self):
+        """测试先存储上半年、再增量补齐全年后，与一次性获取全年的数据一致"""
+        codes = ["000001", "000002", "000003"]
+        DataLoader.fetch_panel(codes, "2023-01-01", "2023-06-30")
+        stored = DataLoader.fetch_panel(codes, "2023-01-01", "2023-12-31")
+        expected = DataLoader.get_source().fetch_panel(codes, "2023-01-01", "2023-12-31")
+        for field in ['开盘价', '收盘价', '最高价', '最低价', '成交额']:
+            np.testing.assert_allclose(stored[field].to_numpy(dtype=np.float64), expected[field].to_numpy(), rtol=1e-12)
+        # 上下半年衔接处没有跳空
+        july = stored[stored['日期'] == pd.Timestamp("2023-07-03")]['收盘价'].to_numpy()
+        june = stored[stored['日期'] == pd.Timestamp("2023-06-30")]['收盘价'].to_numpy()
+        self.assertLess(np.abs(july / june - 1).max(), 0.15)
+
+    def test_fetch_panel_keeps_stored_when_source_fails(self):
+        """测试未存储的股票获取失败时仍返回已存储的股票"""
+        DataLoader.fetch_panel(["000001"], "2023-01-01", "2023-01-31")
+        with mock.patch.object(DataLoader, '_fetch_from_source', return_value=pd.DataFrame()):
+            panel = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-01-31")
+        self.assertEqual(panel['股票代码'].unique().tolist(), ["000001"])
+        self.assertEqual(len(panel), len(pd.date_range("2023-01-01", "2023-01-31", freq='B')))
+
+        # 获取失败的股票没有记为已请求，下次重新获取
+        self.assertNotIn("000002", DataLoader.get_store().requested(["000002"]).index)
+        panel = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-01-31")
+        self.assertEqual(panel['股票代码'].unique().tolist(), ["000001", "000002"])
+
+    def test_fetch_panel_late_listing_not_refetched(self):
+        """测试窗口开始后才有数据的股票获取一次后即视为已覆盖，不再重新获取"""
+        source = DataLoader.get_source()
+        full = source.fetch_panel(["000001", "000002"], "2023-01-01", "2023-12-29")
+        # 000002在3月才上市
+        listed = full[(full['股票代码'] == "000001") | (full['日期'] >= pd.Timestamp("2023-03-01"))]
+        with mock.patch.object(DataLoader, '_fetch_from_source', return_value=listed) as fetch:
+            first = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-12-29")
+            second = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-12-29")
+        fetch.assert_called_once()
+        pd.testing.assert_frame_equal(second, first)
+        requested = DataLoader.get_store().requested(["000002"])
+        self.assertEqual(requested.loc["000002", '请求开始日期'], pd.Timestamp("2023-01-01"))
+
+    def test_load_price_matrix_rebuilds_after_store_changes(self):
+        """测试本地存储追加数据或更换数据源后重新构建行情矩阵"""
+        codes = ["000001", "000002"]
+        Config.load_config()
+        with mock.patch.dict(Config._config, {'data': {**Config.get_section('data'), 'matrix_dir': self.root_dir}}):
+            first = DataLoader.load_price_matrix(codes, "2023-01-01", "2023-01-31")
+            key = DataLoader._matrix_key(codes, "2023-01-01", "2023-01-31")
+            with mock.patch.object(DataLoader, 'fetch_panel') as fetch_panel:
+                DataLoader.load_price_matrix(codes, "2023-01-01", "2023-01-31")
+                fetch_panel.assert_not_called()
+
+            # 存储被追加后键变化，矩阵按新数据重新构建
+            DataLoader.get_store().append(SimulatedSource(seed=7).fetch_panel(["000003"], "2023-01-01", "2023-01-31"))
+            appended = DataLoader._matrix_key(codes, "2023-01-01", "2023-01-31")
+            self.assertNotEqual(appended, key)
+            with mock.patch.object(DataLoader, 'fetch_panel', wraps=DataLoader.fetch_panel) as fetch_panel:
+                second = DataLoader.load_price_matrix(codes, "2023-01-01", "2023-01-31")
+                fetch_panel.assert_called_once()
+            np.testing.assert_array_equal(second['收盘价'], first['收盘价'])
+
+            # 不同种子的数据源生成不同的行情，不能复用同一个矩阵
+            DataLoader.set_source(SimulatedSource(seed=7))
+            try:
+                self.assertNotEqual(DataLoader._matrix_key(codes, "2023-01-01", "2023-01-31"), appended)
+            finally:
+                DataLoader.set_source(None)
+
+    def test_fetch_through_source(self):
+        """测试经由指定数据源获取数据"""
+        DataLoader.set_source(BaostockSource(FakeBaostockClient(), max_workers=2, rate=1000, backoff=0))
+        try:
+            df = DataLoader.fetch_stock_data("600000.SH", "2023-01-02", "2023-01-06")
+            self.assertEqual(len(df), 5)
+            self.assertTrue((df['收盘价'] == 10.5).all())
+        finally:
+            DataLoader.set_source(None)
+
+    def test_load_price_matrix(self):
+        """测试加载内存映射行情矩阵"""
+        codes = ["000001", "000002"]
+        Config.load_config()
+        with mock.patch.dict(Config._config, {'data': {**Config.get_section('data'), 'matrix_dir': self.root_dir}}):
+            matrix = DataLoader.load_price_matrix(codes, "2023-01-01", "2023-01-31")
+            self.assertIsInstance(matrix['收盘价'], np.memmap)
+            self.assertEqual(matrix.codes.tolist(), codes)
+
+            # 第二次加载直接映射已保存的矩阵，不再重新获取数据
+            with mock.patch.object(DataLoader, 'fetch_panel') as fetch_panel:
+                again = DataLoader.load_price_matrix(codes, "2023-01-01", "2023-01-31")
+                fetch_panel.assert_not_called()
+            np.testing.assert_array_equal(again['收盘价'], matrix['收盘价'])
+
     def test_generate_performance_data(self):
         """测试生成历史表现数据"""
         df = DataLoader.generate_performance_data()
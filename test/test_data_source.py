@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_source import DataSource, SimulatedSource
+from src.market_data_store import MarketDataStore
+from src.baostock_source import BaostockSource
+
+
+class TestSimulatedSource(unittest.TestCase):
+    """测试模拟行情数据源"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.codes = [f"{i:06d}" for i in range(1, 51)]
+        self.source = SimulatedSource(seed=123)
+
+    def test_implements_data_source(self):
+        """测试各后端均实现DataSource接口"""
+        self.assertIsInstance(self.source, DataSource)
+        self.assertIsInstance(MarketDataStore("unused"), DataSource)
+        self.assertIsInstance(BaostockSource(client=object()), DataSource)
+
+    def test_deterministic(self):
+        """测试相同种子结果一致，不同种子结果不同"""
+        first = self.source.fetch_panel(self.codes, "2023-01-01", "2023-06-30")
+        second = SimulatedSource(seed=123).fetch_panel(self.codes, "2023-01-01", "2023-06-30")
+        pd.testing.assert_frame_equal(first, second)
+
+        other = SimulatedSource(seed=124).fetch_panel(self.codes, "2023-01-01", "2023-06-30")
+        self.assertFalse(np.allclose(first['收盘价'], other['收盘价']))
+
+    def test_independent_of_batch(self):
+        """测试单只股票的数据与同批次的其他股票无关"""
+        full = self.source.fetch_panel(self.codes, "2023-01-01", "2023-03-31")
+        single = self.source.fetch_panel(["000007"], "2023-01-01", "2023-03-31")
+        pd.testing.assert_frame_equal(
+            full[full['股票代码'] == "000007"].reset_index(drop=True), single
+        )
+
+    def test_independent_of_range(self):
+        """测试分段获取拼接后与一次性获取一致，价格只取决于日期"""
+        full = self.source.fetch_panel(self.codes, "2023-01-01", "2023-12-31")
+        parts = pd.concat([
+            self.source.fetch_panel(self.codes, "2023-01-01", "2023-06-30"),
+            self.source.fetch_panel(self.codes, "2023-07-01", "2023-12-31")
+        ]).sort_values(['股票代码', '日期'], kind='stable').reset_index(drop=True)
+        pd.testing.assert_frame_equal(parts, full, check_exact=False, rtol=1e-12)
+
+        # 单日请求（每日增量追加）与全年中同一天一致，且只多模拟MEMORY_DAYS天的冲击
+        day = self.source.fetch_panel(self.codes, "2023-12-29", "2023-12-29")
+        pd.testing.assert_frame_equal(day, full[full['日期'] == pd.Timestamp("2023-12-29")].reset_index(drop=True),
+                                      check_exact=False, rtol=1e-12)
+        self.assertLessEqual(SimulatedSource.REVERSION ** SimulatedSource.MEMORY_DAYS, 1e-3)
+        self.assertLess(SimulatedSource.MEMORY_DAYS, 500)
+
+    def test_ohlc_consistency(self):
+        """测试开高低收关系和成交量合理"""
+        panel = self.source.fetch_panel(self.codes, "2020-01-01", "2023-12-31")
+        self.assertTrue((panel['最高价'] >= panel[['开盘价', '收盘价']].max(axis=1)).all())
+        self.assertTrue((panel['最低价'] <= panel[['开盘价', '收盘价']].min(axis=1)).all())
+        self.assertTrue((panel['最低价'] > 0).all())
+        self.assertTrue((panel['成交量'] > 0).all())
+
+        # 日收益率应在合理范围内
+        returns = panel.groupby('股票代码')['收盘价'].pct_change().dropna()
+        self.assertLess(returns.abs().max(), 0.3)
+        self.assertLess(returns.std(), 0.05)
+
+    def test_price_matrix(self):
+        """测试直接生成行情矩阵"""
+        matrix = self.source.price_matrix(self.codes, "2023-01-01", "2023-03-31")
+        panel = self.source.fetch_panel(self.codes, "2023-01-01", "2023-03-31")
+        self.assertEqual(matrix.shape, (len(panel) // len(self.codes), len(self.codes)))
+        np.testing.assert_array_equal(matrix['收盘价'][:, 0], panel['收盘价'].to_numpy()[:matrix.shape[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
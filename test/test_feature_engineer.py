@@ -1,7 +1,13 @@
+import shutil
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
+from src.data_loader import DataLoader
 from src.feature_engineer import FeatureEngineer
+from src.feature_store import FeatureStore
+from src.indicators import IndicatorEngine
+from src.market_data_store import MarketDataStore
 
 
 class TestFeatureEngineer(unittest.TestCase):
@@ -23,6 +29,61 @@ class TestFeatureEngineer(unittest.TestCase):
         self.assertIn('地道得分', df.columns)
         self.assertIn('人道得分', df.columns)
 
+    def test_calculate_dimensions_panel(self):
+        """测试在多只股票的面板数据上计算维度得分"""
+        dates = pd.date_range(start='2023-01-01', periods=80, freq='B')
+        up = 10 * 1.01 ** np.arange(80)
+        down = 10 * 0.99 ** np.arange(80)
+        panel = pd.DataFrame({
+            '股票代码': ['000001'] * 80 + ['000002'] * 80,
+            '日期': np.tile(dates, 2),
+            '收盘价': np.concatenate([up, down]),
+            '成交量': np.full(160, 10000),
+            '成交额': np.full(160, 100000.0)
+        })
+        df = FeatureEngineer.calculate_dimensions(panel)
+        latest = df.groupby('股票代码').tail(1).set_index('股票代码')
+        self.assertGreater(latest.loc['000001', '天道得分'], latest.loc['000002', '天道得分'])
+        self.assertTrue(df[['天道得分', '地道得分', '人道得分']].notna().all().all())
+
+    def test_update_dimensions(self):
+        """测试新K线增量更新的得分与全量计算一致"""
+        dates = pd.date_range(start='2023-01-01', periods=80, freq='B')
+        rng = np.random.default_rng(0)
+        panel = pd.DataFrame({
+            '股票代码': np.repeat(['000001', '000002'], 80),
+            '日期': np.tile(dates, 2),
+            '收盘价': 10 * np.exp(np.cumsum(rng.normal(0, 0.02, 160))),
+            '成交量': rng.uniform(1e4, 1e5, 160),
+            '成交额': rng.uniform(1e5, 1e6, 160)
+        })
+        state = FeatureEngineer.build_state(panel[panel['日期'] < dates[-1]])
+        df = FeatureEngineer.update_dimensions(state, panel[panel['日期'] == dates[-1]])
+        expected = FeatureEngineer.calculate_dimensions(panel).groupby('股票代码').tail(1)
+        for column in ['天道得分', '地道得分', '人道得分']:
+            np.testing.assert_allclose(df[column].values, expected[column].values)
+
+    def test_snapshot(self):
+        """测试截面只计算回看窗口，与同一窗口上的全量计算一致"""
+        root_dir = tempfile.mkdtemp()
+        DataLoader.set_store(MarketDataStore(f"{root_dir}/market"))
+        FeatureEngineer.set_feature_store(FeatureStore(f"{root_dir}/features"))
+        try:
+            codes = ['000001', '000002', '000003']
+            df = FeatureEngineer.snapshot('2023-12-29', codes)
+            self.assertEqual(list(df['股票代码']), codes)
+            self.assertTrue((df['日期'] == pd.Timestamp('2023-12-29')).all())
+
+            panel = DataLoader.fetch_panel(codes, '2023-01-01', '2023-12-29')
+            window = panel.groupby('股票代码').tail(IndicatorEngine.LOOKBACK).reset_index(drop=True)
+            expected = DataLoader.latest_rows(FeatureEngineer.calculate_dimensions(window))
+            for column in ['天道得分', '地道得分', '人道得分']:
+                np.testing.assert_allclose(df[column].values, expected[column].values)
+        finally:
+            DataLoader.set_store(None)
+            FeatureEngineer.set_feature_store(None)
+            shutil.rmtree(root_dir, ignore_errors=True)
+
     def test_create_target_variable(self):
         """测试创建目标变量"""
         df = FeatureEngineer.create_target_variable(self.test_data)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.feature_engineer import FeatureEngineer
+from src.feature_store import FeatureStore
+
+
+class TestFeatureStore(unittest.TestCase):
+    """测试特征缓存"""
+
+    def setUp(self):
+        """设置临时缓存目录和测试数据"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FeatureStore(root_dir=self.tmp.name, max_items=2)
+        dates = pd.date_range(start='2023-01-02', periods=70, freq='B')
+        rng = np.random.default_rng(0)
+        self.panel = pd.DataFrame({
+            '股票代码': np.repeat(['000001', '000002'], 70),
+            '日期': np.tile(dates, 2),
+            '收盘价': 10 * np.exp(np.cumsum(rng.normal(0, 0.02, 140))),
+            '成交量': rng.uniform(1e4, 1e5, 140),
+            '成交额': rng.uniform(1e5, 1e6, 140)
+        })
+        self.compute = mock.Mock(side_effect=FeatureEngineer.calculate_dimensions)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_skips_compute(self):
+        """测试相同数据第二次读取时不再计算"""
+        first = self.store.get_or_compute(self.panel.copy(), self.compute)
+        second = self.store.get_or_compute(self.panel.copy(), self.compute)
+        self.assertEqual(self.compute.call_count, 1)
+        pd.testing.assert_frame_equal(first, second)
+
+        # 新实例只能从磁盘读取
+        reopened = FeatureStore(root_dir=self.tmp.name)
+        third = reopened.get_or_compute(self.panel.copy(), self.compute)
+        self.assertEqual(self.compute.call_count, 1)
+        pd.testing.assert_frame_equal(first, third)
+
+    def test_changed_data_misses(self):
+        """测试行情变化后重新计算"""
+        self.store.get_or_compute(self.panel.copy(), self.compute)
+        changed = self.panel.copy()
+        changed.loc[len(changed) - 1, '收盘价'] *= 1.05
+        self.store.get_or_compute(changed, self.compute)
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_lru_eviction(self):
+        """测试内存缓存超出容量时淘汰最久未使用的条目"""
+        for i in range(3):
+            self.store.put(str(i), pd.DataFrame({'天道得分': [float(i)]}))
+        self.assertEqual(list(self.store._memory), ['1', '2'])
+        self.assertEqual(self.store.get('0')['天道得分'][0], 0.0)
+
+    def test_fingerprint_change_invalidates(self):
+        """测试特征集版本变化后旧缓存失效并被清理"""
+        self.store.get_or_compute(self.panel.copy(), self.compute)
+        old_dir = os.path.join(self.tmp.name, self.store.fingerprint)
+        with mock.patch.object(FeatureStore, 'FEATURE_SET_VERSION', FeatureStore.FEATURE_SET_VERSION + 1):
+            store = FeatureStore(root_dir=self.tmp.name)
+            store.get_or_compute(self.panel.copy(), self.compute)
+        self.assertEqual(self.compute.call_count, 2)
+        self.assertFalse(os.path.exists(old_dir))
+
+    def test_invalidate(self):
+        """测试手动清空缓存"""
+        self.store.get_or_compute(self.panel.copy(), self.compute)
+        self.store.invalidate()
+        self.store.get_or_compute(self.panel.copy(), self.compute)
+        self.assertEqual(self.compute.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
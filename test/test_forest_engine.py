@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from src.forest_engine import FlatForest
+from utils.config import Config
+
+
+class TestFlatForest(unittest.TestCase):
+    """测试扁平数组随机森林推理引擎"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(70, 10, size=(400, 4))
+        self.y = self.X[:, 0] - self.X[:, 1] + rng.normal(0, 5, 400)
+        self.X_test = rng.normal(70, 10, size=(300, 4))
+
+    def test_classifier_matches_sklearn(self):
+        """测试分类概率与sklearn完全一致"""
+        model = RandomForestClassifier(n_estimators=20, random_state=0).fit(self.X, (self.y > 0).astype(int))
+        forest = FlatForest.from_sklearn(model)
+        np.testing.assert_array_equal(forest.predict_proba(self.X_test), model.predict_proba(self.X_test))
+        np.testing.assert_array_equal(forest.predict(self.X_test), model.predict(self.X_test))
+        np.testing.assert_array_equal(forest.apply(self.X_test) - forest.roots, model.apply(self.X_test))
+
+    def test_pipeline_regressor_matches_sklearn(self):
+        """测试带标准化的回归Pipeline与sklearn一致，分块结果不变"""
+        model = Pipeline([
+            ('scaler', StandardScaler()),
+            ('model', RandomForestRegressor(n_estimators=15, max_depth=6, random_state=0))
+        ]).fit(self.X, self.y)
+        forest = FlatForest.from_sklearn(model)
+        expected = model.predict(self.X_test)
+        np.testing.assert_allclose(forest.predict(self.X_test), expected, rtol=1e-12)
+        np.testing.assert_allclose(forest.predict(self.X_test, chunk_size=50), expected, rtol=1e-12)
+
+    def test_save_load(self):
+        """测试保存后加载结果不变"""
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, (self.y > 0).astype(int))
+        forest = FlatForest.from_sklearn(model)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'forest.npz')
+            forest.save(path)
+            loaded = FlatForest.load(path)
+        np.testing.assert_array_equal(loaded.predict_proba(self.X_test), forest.predict_proba(self.X_test))
+
+    def test_large_batch_uses_sklearn(self):
+        """测试超过flat_max_rows的批量交给原模型预测，加载的引擎始终使用扁平数组"""
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(self.X, (self.y > 0).astype(int))
+        forest = FlatForest.from_sklearn(model)
+        self.assertIs(forest.estimator, model)
+        with mock.patch.dict(Config._config, {'model': {**Config.get_section('model'), 'flat_max_rows': 100}}):
+            with mock.patch.object(FlatForest, '_mean_value', wraps=forest._mean_value) as mean_value:
+                np.testing.assert_array_equal(forest.predict_proba(self.X_test), model.predict_proba(self.X_test))
+                np.testing.assert_array_equal(forest.predict(self.X_test), model.predict(self.X_test))
+                mean_value.assert_not_called()
+                forest.predict_proba(self.X_test[:100])
+                mean_value.assert_called_once()
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'forest.npz')
+                forest.save(path)
+                loaded = FlatForest.load(path)
+            self.assertIsNone(loaded.estimator)
+            np.testing.assert_array_equal(loaded.predict_proba(self.X_test), model.predict_proba(self.X_test))
+
+
+if __name__ == '__main__':
+    unittest.main()
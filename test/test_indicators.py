@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.indicators import IndicatorEngine, IndicatorState
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    """测试技术指标引擎"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(0)
+        self.close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(120, 8)), axis=0))
+        self.volume = rng.uniform(1e4, 1e5, size=(120, 8))
+
+    def test_rolling_matches_pandas(self):
+        """测试滑动均值、标准差、最大值与pandas一致"""
+        df = pd.DataFrame(self.close)
+        np.testing.assert_allclose(IndicatorEngine.rolling_mean(self.close, 20)[19:], df.rolling(20).mean().values[19:])
+        np.testing.assert_allclose(IndicatorEngine.rolling_std(self.close, 20)[19:],
+                                   df.rolling(20).std(ddof=0).values[19:], rtol=1e-6)
+        np.testing.assert_allclose(IndicatorEngine.rolling_max(self.close, 60)[59:], df.rolling(60).max().values[59:])
+        self.assertTrue(np.isnan(IndicatorEngine.rolling_mean(self.close, 20)[:19]).all())
+
+    def test_ema_matches_pandas(self):
+        """测试EMA与pandas ewm一致"""
+        expected = pd.DataFrame(self.close).ewm(span=12, adjust=False).mean().values
+        np.testing.assert_allclose(IndicatorEngine.ema(self.close, 12), expected)
+
+    def test_wilder_rsi(self):
+        """测试Wilder RSI与逐只股票递推一致"""
+        rsi = IndicatorEngine.wilder_rsi(self.close, 14)
+        series = self.close[:, 3]
+        diff = np.diff(series)
+        avg_gain = np.clip(diff[:14], 0, None).mean()
+        avg_loss = np.clip(-diff[:14], 0, None).mean()
+        for t in range(14, len(diff)):
+            avg_gain = (avg_gain * 13 + max(diff[t], 0)) / 14
+            avg_loss = (avg_loss * 13 + max(-diff[t], 0)) / 14
+        self.assertAlmostEqual(rsi[-1, 3], 100 * avg_gain / (avg_gain + avg_loss))
+        self.assertTrue(np.isnan(rsi[:14]).all())
+
+    def test_scores_range_and_direction(self):
+        """测试得分范围，以及上涨股票的天道得分高于下跌股票"""
+        days = np.arange(100)[:, None]
+        close = np.hstack([10 * 1.01 ** days, 10 * 0.99 ** days])
+        scores = IndicatorEngine.compute(close, np.full(close.shape, 1e4), np.full(close.shape, 1e5))
+        for matrix in scores.values():
+            self.assertEqual(matrix.shape, close.shape)
+            self.assertTrue(((matrix >= 60) & (matrix <= 95)).all())
+        self.assertGreater(scores['天道得分'][-1, 0], scores['天道得分'][-1, 1])
+        self.assertGreater(scores['地道得分'][-1, 0], scores['地道得分'][-1, 1])
+
+    def test_missing_volume(self):
+        """测试缺少成交量、成交额时人道得分取区间中点"""
+        scores = IndicatorEngine.compute(self.close)
+        self.assertTrue(np.allclose(scores['人道得分'], (60 + 95) / 2))
+
+
+
+class TestIndicatorState(unittest.TestCase):
+    """测试增量指标状态"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(1)
+        self.codes = np.array(['000001', '000002', '000003'])
+        self.dates = pd.date_range('2023-01-02', periods=90, freq='B').values
+        self.close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(90, 3)), axis=0))
+        self.volume = rng.uniform(1e4, 1e5, size=(90, 3))
+        self.amount = self.volume * self.close
+
+    def _replay(self, state, rows):
+        for t in rows:
+            state.update(self.codes, self.close[t], self.volume[t], self.amount[t], np.repeat(self.dates[t], 3))
+
+    def test_matches_batch(self):
+        """测试逐根K线增量更新的得分与批量计算一致，包括预热期"""
+        expected = IndicatorEngine.compute(self.close, self.volume, self.amount)
+        state = IndicatorState(self.codes)
+        for t in range(len(self.dates)):
+            self._replay(state, [t])
+            for name, values in state.scores().items():
+                np.testing.assert_allclose(values, expected[name][t], atol=1e-9)
+
+    def test_missing_volume_and_amount_bars(self):
+        """测试个别K线缺少成交量、成交额时，量能指标在窗口移出缺失值后恢复并与批量计算一致"""
+        self.volume[30, 0] = np.nan
+        self.amount[40, 1] = np.nan
+        expected = IndicatorEngine.compute_indicators(self.close, self.volume, self.amount)
+        state = IndicatorState(self.codes)
+        for t in range(len(self.dates)):
+            self._replay(state, [t])
+            for i, name in enumerate(IndicatorState.INDICATORS):
+                np.testing.assert_allclose(state.indicators[i], expected[name][t], atol=1e-9, err_msg=f"{name} {t}")
+        self.assertFalse(np.isnan(state.indicators[IndicatorState.INDICATORS.index('量比')]).any())
+        self.assertFalse(np.isnan(state.indicators[IndicatorState.INDICATORS.index('成交额变化')]).any())
+
+    def test_save_load(self):
+        """测试状态保存后加载可继续增量更新"""
+        state = IndicatorState(self.codes)
+        self._replay(state, range(70))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state.npz')
+            state.save(path)
+            restored = IndicatorState.load(path)
+        self._replay(state, range(70, 90))
+        self._replay(restored, range(70, 90))
+        for name, values in state.scores().items():
+            np.testing.assert_array_equal(restored.scores()[name], values)
+
+    def test_duplicate_and_new_codes(self):
+        """测试重复日期的K线被忽略，新股票自动加入"""
+        state = IndicatorState(self.codes)
+        self._replay(state, range(30))
+        before = state.scores()['天道得分'].copy()
+        self._replay(state, [29])
+        np.testing.assert_array_equal(state.scores()['天道得分'], before)
+
+        state.update(np.array(['000004']), np.array([10.0]), dates=self.dates[30:31])
+        self.assertEqual(list(state.codes), list(self.codes) + ['000004'])
+        self.assertEqual(state.n_seen[-1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
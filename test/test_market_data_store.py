@@ -0,0 +1,164 @@
+import unittest
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+from src.data_loader import DataLoader
+from src.data_source import SimulatedSource
+from src.market_data_store import MarketDataStore
+
+
+class TestMarketDataStore(unittest.TestCase):
+    """测试本地行情存储类"""
+
+    def setUp(self):
+        """创建临时存储目录"""
+        self.root_dir = tempfile.mkdtemp()
+        self.store = MarketDataStore(self.root_dir)
+        self.panel = SimulatedSource(seed=7).fetch_panel(["000001", "000002", "000003"], "2022-12-01", "2023-01-31")
+
+    def tearDown(self):
+        """删除临时存储目录"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_write_and_read(self):
+        """测试写入后按年份分区读取"""
+        self.assertEqual(self.store.write(self.panel), len(self.panel))
+        self.assertEqual(self.store.partitions(), [2022, 2023])
+
+        df = self.store.read()
+        self.assertEqual(len(df), len(self.panel))
+        self.assertEqual(list(df.columns), MarketDataStore.COLUMNS)
+
+    def test_read_with_filters(self):
+        """测试按股票代码和日期范围过滤读取"""
+        self.store.write(self.panel)
+        df = self.store.read(["000002"], "2023-01-01", "2023-01-15")
+        self.assertFalse(df.empty)
+        self.assertTrue((df['股票代码'] == "000002").all())
+        self.assertGreaterEqual(df['日期'].min(), pd.Timestamp("2023-01-01"))
+        self.assertLessEqual(df['日期'].max(), pd.Timestamp("2023-01-15"))
+
+        # 不存在的股票返回空DataFrame
+        self.assertTrue(self.store.read(["999999"]).empty)
+
+    def test_write_overwrites_duplicates(self):
+        """测试重复写入时新数据覆盖旧数据"""
+        self.store.write(self.panel)
+        update = self.panel.tail(1).copy()
+        update['收盘价'] = -1.0
+        self.store.write(update)
+
+        df = self.store.read()
+        self.assertEqual(len(df), len(self.panel))
+        last = df[(df['股票代码'] == "000003") & (df['日期'] == pd.Timestamp("2023-01-31"))]
+        self.assertEqual(last['收盘价'].iloc[0], -1.0)
+
+    def test_append_and_compact(self):
+        """测试增量追加后读取合并结果，并可合并回主文件"""
+        self.store.write(self.panel)
+        update = SimulatedSource(seed=7).fetch_panel(["000001"], "2023-02-01", "2023-02-03")
+        self.assertEqual(self.store.append(update), 3)
+        self.assertEqual(len(self.store._partition_files(2023)), 2)
+
+        df = self.store.read(["000001"])
+        self.assertEqual(df['日期'].max(), pd.Timestamp("2023-02-03"))
+        self.assertTrue(df['日期'].is_monotonic_increasing)
+
+        self.store.compact()
+        self.assertEqual(len(self.store._partition_files(2023)), 1)
+        self.assertEqual(len(self.store.read()), len(self.panel) + 3)
+
+    def test_update_incremental(self):
+        """测试增量更新只补齐每只股票缺失的交易日"""
+        DataLoader.set_store(self.store)
+        try:
+            self.store.write(self.panel)
+            appended = DataLoader.update_incremental(["000001", "000002"], "2023-02-07")
+            # 2023-02-01至2023-02-07共5个交易日
+            self.assertEqual(appended, 2 * 5)
+            coverage = self.store.coverage()
+            self.assertEqual(coverage.loc["000001", '最后日期'], pd.Timestamp("2023-02-07"))
+            self.assertEqual(coverage.loc["000003", '最后日期'], pd.Timestamp("2023-01-31"))
+
+            # 已是最新时不再追加
+            self.assertEqual(DataLoader.update_incremental(["000001"], "2023-02-07"), 0)
+
+            # fetch_panel对末尾缺失的股票只做增量补齐
+            panel = DataLoader.fetch_panel(["000003"], "2022-12-01", "2023-02-07")
+            self.assertEqual(panel['日期'].max(), pd.Timestamp("2023-02-07"))
+            history = self.panel[self.panel['股票代码'] == "000003"].reset_index(drop=True)
+            pd.testing.assert_series_equal(panel['收盘价'].iloc[:len(history)], history['收盘价'])
+        finally:
+            DataLoader.set_store(None)
+
+    def test_update_incremental_suspended(self):
+        """测试最后一个交易日停牌、没有数据的股票补齐一次后不再重复请求"""
+        DataLoader.set_store(self.store)
+        try:
+            self.store.write(self.panel)
+            source = DataLoader.get_source()
+            update = source.fetch_panel(["000001", "000002"], "2023-02-01", "2023-02-07")
+            # 000001在2023-02-07停牌
+            update = update[(update['股票代码'] == "000002") | (update['日期'] < pd.Timestamp("2023-02-07"))]
+            with mock.patch.object(DataLoader, '_fetch_from_source', return_value=update) as fetch:
+                self.assertEqual(DataLoader.update_incremental(["000001", "000002"], "2023-02-07"), 9)
+                self.assertEqual(DataLoader.update_incremental(["000001", "000002"], "2023-02-07"), 0)
+                panel = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-02-07")
+            fetch.assert_called_once()
+            self.assertEqual(self.store.coverage().loc["000001", '最后日期'], pd.Timestamp("2023-02-06"))
+            self.assertEqual(self.store.requested().loc["000001", '请求结束日期'], pd.Timestamp("2023-02-07"))
+            self.assertEqual(panel.groupby('股票代码').size().tolist(), [26, 27])
+
+            # 数据源报告失败的股票不记为已请求，下次重新获取
+            failed = pd.DataFrame()
+            failed.attrs['失败股票'] = ["000003"]
+            with mock.patch.object(DataLoader, '_fetch_from_source', return_value=failed):
+                DataLoader.update_incremental(["000003"], "2023-02-07")
+            self.assertEqual(self.store.requested().loc["000003", '请求结束日期'], pd.Timestamp("2023-01-31"))
+        finally:
+            DataLoader.set_store(None)
+
+    def test_coverage(self):
+        """测试统计每只股票的存储日期范围"""
+        self.store.write(self.panel)
+        coverage = self.store.coverage(["000001"])
+        self.assertEqual(coverage.index.tolist(), ["000001"])
+        self.assertEqual(coverage.loc["000001", '首个日期'], pd.Timestamp("2022-12-01"))
+        self.assertEqual(coverage.loc["000001", '最后日期'], pd.Timestamp("2023-01-31"))
+
+    def test_requested(self):
+        """测试记录每只股票已请求的日期范围，相连的范围合并"""
+        self.store.write(self.panel)
+        # 没有请求记录时以已存储的日期范围代替
+        requested = self.store.requested(["000001", "999999"])
+        self.assertEqual(requested.index.tolist(), ["000001"])
+        self.assertEqual(requested.loc["000001", '请求开始日期'], pd.Timestamp("2022-12-01"))
+
+        self.store.mark_requested(["000001", "999999"], "2023-02-01", "2023-02-28")
+        self.store.mark_requested(["999999"], "2023-06-01", "2023-06-30")
+        requested = self.store.requested()
+        self.assertEqual(requested.index.tolist(), ["000001", "000002", "000003", "999999"])
+        self.assertEqual(requested.loc["000001", '请求开始日期'], pd.Timestamp("2022-12-01"))
+        self.assertEqual(requested.loc["000001", '请求结束日期'], pd.Timestamp("2023-02-28"))
+        # 不相连的范围以新范围为准
+        self.assertEqual(requested.loc["999999", '请求开始日期'], pd.Timestamp("2023-06-01"))
+
+    def test_data_loader_reads_through_store(self):
+        """测试DataLoader重复获取同一日期范围时直接读取本地存储"""
+        DataLoader.set_store(self.store)
+        try:
+            first = DataLoader.fetch_panel(["000001", "000002"], "2023-01-01", "2023-03-31")
+            second = DataLoader.fetch_panel(["000002", "000001"], "2023-01-01", "2023-03-31")
+            self.assertEqual(second['股票代码'].unique().tolist(), ["000002", "000001"])
+            pd.testing.assert_frame_equal(
+                first.sort_values(['股票代码', '日期']).reset_index(drop=True),
+                second.sort_values(['股票代码', '日期']).reset_index(drop=True),
+                check_dtype=False
+            )
+        finally:
+            DataLoader.set_store(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
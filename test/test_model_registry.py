@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from src.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    """测试模型版本库"""
+
+    def setUp(self):
+        """使用临时目录作为版本库"""
+        self.root_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.root_dir)
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(50, 3))
+        self.model = RandomForestRegressor(n_estimators=5, random_state=0).fit(self.X, rng.normal(size=50))
+
+    def tearDown(self):
+        ModelRegistry.clear_cache()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_save_versions(self):
+        """测试版本号递增和元数据"""
+        self.assertIsNone(self.registry.latest_version('m'))
+        self.assertEqual(self.registry.save('m', self.model, features=['a', 'b', 'c'], metrics={'mse': 1.0}), 1)
+        self.assertEqual(self.registry.save('m', self.model, data_hash='abc'), 2)
+        self.assertEqual(self.registry.versions('m'), [1, 2])
+        metadata = self.registry.metadata('m', 1)
+        self.assertEqual(metadata['features'], ['a', 'b', 'c'])
+        self.assertEqual(metadata['metrics'], {'mse': 1.0})
+        self.assertIn('created_at', metadata)
+        self.assertEqual(self.registry.metadata('m')['data_hash'], 'abc')
+        # 不残留临时目录
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root_dir, 'm'))), ['v0001', 'v0002'])
+
+    def test_load_cached(self):
+        """测试加载结果与原模型一致，且同一版本只加载一次"""
+        self.registry.save('m', {'model': self.model, 'array': np.arange(10.0)})
+        loaded = self.registry.load('m')
+        np.testing.assert_allclose(loaded['model'].predict(self.X), self.model.predict(self.X))
+        self.assertIsInstance(loaded['array'], np.memmap)
+        self.assertIs(ModelRegistry(self.root_dir).load('m', 1), loaded)
+        self.assertIsNone(self.registry.load('missing'))
+
+    def test_hash_frame(self):
+        """测试训练数据哈希"""
+        df = pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']})
+        self.assertEqual(ModelRegistry.hash_frame(df), ModelRegistry.hash_frame(df.copy()))
+        self.assertNotEqual(ModelRegistry.hash_frame(df), ModelRegistry.hash_frame(df.iloc[::-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
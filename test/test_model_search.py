@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from src.model_search import HyperparameterSearch
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+    """测试并行超参数搜索"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(180, 3))
+        self.y_reg = self.X[:, 0] * 2 + rng.normal(0, 0.1, 180)
+        self.y_class = (self.y_reg > 0).astype(int)
+        self.estimators = {
+            'classification': RandomForestClassifier(random_state=0),
+            'regression': RandomForestRegressor(random_state=0)
+        }
+        self.param_grid = {'n_estimators': [5, 10, 20], 'max_depth': [1, 3, None]}
+
+    def test_successive_halving(self):
+        """测试两个模型同时完成搜索并以最优参数重新训练"""
+        results = HyperparameterSearch.successive_halving(
+            self.estimators, self.param_grid, self.X,
+            {'classification': self.y_class, 'regression': self.y_reg},
+            cv=3, factor=3, n_jobs=2, time_budget=60, random_state=0
+        )
+        self.assertEqual(set(results), {'classification', 'regression'})
+        for name, result in results.items():
+            self.assertEqual(result['rounds'], 2)
+            self.assertEqual(result['model'].n_estimators, result['params']['n_estimators'])
+        self.assertIn(results['regression']['params']['max_depth'], [3, None])
+        self.assertGreater(results['regression']['score'], 0.8)
+        self.assertEqual(len(results['classification']['model'].predict(self.X)), len(self.X))
+
+    def test_time_budget(self):
+        """测试超出时间预算时在第一轮后结束"""
+        results = HyperparameterSearch.successive_halving(
+            {'regression': self.estimators['regression']}, self.param_grid, self.X,
+            {'regression': self.y_reg}, cv=3, factor=3, n_jobs=1, time_budget=0, random_state=0
+        )
+        self.assertEqual(results['regression']['rounds'], 1)
+
+    def test_resolve_n_jobs(self):
+        """测试并行工作数解析"""
+        self.assertGreaterEqual(HyperparameterSearch.resolve_n_jobs(-1), 1)
+        self.assertEqual(HyperparameterSearch.resolve_n_jobs(1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
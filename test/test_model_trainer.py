@@ -1,16 +1,17 @@
 import unittest
 import pandas as pd
 import numpy as np
-import os
-import joblib
+import shutil
+import tempfile
 from src.model_trainer import ModelTrainer
+from src.model_registry import ModelRegistry
 
 
 class TestModelTrainer(unittest.TestCase):
     """测试模型训练类"""
 
     def setUp(self):
-        """设置测试数据"""
+        """设置测试数据，使用临时目录作为模型版本库"""
         # 创建测试数据
         self.test_data = pd.DataFrame({
             '天道得分': np.random.uniform(60, 95, 100),
@@ -18,6 +19,15 @@ class TestModelTrainer(unittest.TestCase):
             '人道得分': np.random.uniform(60, 95, 100),
             '预测涨跌幅': np.random.uniform(-5, 10, 100)
         })
+        self.root_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.root_dir)
+        ModelTrainer.set_registry(self.registry)
+
+    def tearDown(self):
+        """恢复默认版本库并删除临时目录"""
+        ModelTrainer.set_registry(None)
+        ModelRegistry.clear_cache()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
 
     def test_train_model(self):
         """测试训练模型"""
@@ -26,17 +36,93 @@ class TestModelTrainer(unittest.TestCase):
         self.assertTrue(result)
 
         # 检查模型是否保存
-        model_path = 'models/stock_model.pkl'
-        self.assertTrue(os.path.exists(model_path))
+        self.assertEqual(self.registry.versions(ModelTrainer.MODEL_NAME), [1])
+        metadata = self.registry.metadata(ModelTrainer.MODEL_NAME)
+        self.assertEqual(metadata['features'], ModelTrainer.FEATURES)
+        self.assertIn('mse', metadata['metrics'])
 
         # 测试不重新训练
         result = ModelTrainer.train_model(self.test_data, retrain=False)
         self.assertTrue(result)
+        self.assertEqual(self.registry.versions(ModelTrainer.MODEL_NAME), [1])
+
+    def test_train_joint(self):
+        """测试联合训练分类模型和回归模型并保存为一个版本"""
+        bundle = ModelTrainer.train_joint(self.test_data, retrain=True, search_mode='none')
+        self.assertEqual(bundle['features'], ModelTrainer.FEATURES)
+        self.assertIn('accuracy', bundle['metrics'])
+        self.assertIn('mse', bundle['metrics'])
+
+        X = self.test_data[ModelTrainer.FEATURES].to_numpy()
+        self.assertEqual(bundle['classification'].predict_proba(X).shape, (100, 2))
+        self.assertEqual(bundle['regression'].predict(X).shape, (100,))
+        self.assertIs(bundle['classification'][0], bundle['scaler'])
+
+        # 已存在且特征一致时直接加载
+        loaded = ModelTrainer.train_joint(self.test_data)
+        self.assertEqual(loaded['metrics'], bundle['metrics'])
+        self.assertEqual(self.registry.versions(ModelTrainer.JOINT_MODEL_NAME), [1])
+
+    def test_predict_many(self):
+        """测试分块预测与整体预测一致，且结果不依赖批次构成"""
+        bundle = ModelTrainer.train_joint(self.test_data, retrain=True, search_mode='none')
+        features = self.test_data[ModelTrainer.FEATURES]
+        expected = bundle['regression'].predict(features.to_numpy())
+        np.testing.assert_allclose(ModelTrainer.predict_many(bundle['regression'], features, chunk_size=7), expected)
+        np.testing.assert_allclose(ModelTrainer.predict_many(bundle['regression'], features.iloc[:10]), expected[:10])
+        proba = ModelTrainer.predict_many(bundle['classification'], features, 'predict_proba', chunk_size=30)
+        self.assertEqual(proba.shape, (100, 2))
+
+        # 导出的扁平数组引擎结果与Pipeline一致
+        flat = ModelTrainer.export_flat(bundle)
+        np.testing.assert_allclose(ModelTrainer.predict_many(flat['regression'], features), expected)
+        np.testing.assert_allclose(ModelTrainer.predict_many(flat['classification'], features, 'predict_proba'), proba)
+
+    def test_update_incremental(self):
+        """测试增量训练追加新树并淘汰过期的树"""
+        dates = pd.date_range('2023-01-01', periods=400, freq='D')
+        data = pd.DataFrame({
+            '日期': dates,
+            '天道得分': np.random.uniform(60, 95, 400),
+            '地道得分': np.random.uniform(60, 95, 400),
+            '人道得分': np.random.uniform(60, 95, 400),
+            '预测涨跌幅': np.random.uniform(-5, 10, 400)
+        })
+        bundle = ModelTrainer.train_joint(data.iloc[:100], retrain=True, search_mode='none')
+        n_trees = len(bundle['regression'][-1].estimators_)
+        self.assertEqual(bundle['tree_windows']['regression'][0], ('2023-01-01', '2023-04-10'))
+
+        # 新数据距首批训练窗口不足淘汰天数，只追加新树
+        updated = ModelTrainer.update_incremental(data.iloc[:200], n_new_trees=5, window_days=30, max_age_days=365)
+        self.assertEqual(len(updated['regression'][-1].estimators_), n_trees + 5)
+        # 最近30天的最后20%留作留出集，新树只在之前的24天上训练
+        self.assertEqual(updated['tree_windows']['regression'][-1], ('2023-06-20', '2023-07-13'))
+        self.assertEqual(len(bundle['regression'][-1].estimators_), n_trees)
+        self.assertEqual(self.registry.versions(ModelTrainer.JOINT_MODEL_NAME), [1, 2])
+        holdout = data.iloc[194:200]
+        expected_mse = np.mean((updated['regression'].predict(holdout[ModelTrainer.FEATURES].to_numpy())
+                                - holdout['预测涨跌幅'].to_numpy()) ** 2)
+        self.assertAlmostEqual(updated['metrics']['mse'], expected_mse)
+        self.assertAlmostEqual(self.registry.metadata(ModelTrainer.JOINT_MODEL_NAME)['metrics']['mse'], expected_mse)
+        self.assertNotEqual(updated['metrics'], bundle['metrics'])
+
+        # 没有新数据时不生成新版本
+        ModelTrainer.update_incremental(data.iloc[:200], n_new_trees=5)
+        self.assertEqual(self.registry.versions(ModelTrainer.JOINT_MODEL_NAME), [1, 2])
 
-        # 清理测试产生的文件
-        if os.path.exists(model_path):
-            os.remove(model_path)
+        # 首批树的窗口结束日期超过淘汰天数，被移除
+        updated = ModelTrainer.update_incremental(data, n_new_trees=5, window_days=30, max_age_days=210)
+        windows = updated['tree_windows']['regression']
+        self.assertEqual(len(updated['regression'][-1].estimators_), 10)
+        self.assertEqual(len(windows), 10)
+        self.assertTrue(all(end >= '2023-07-13' for _, end in windows))
+        # 淘汰旧树后新树不会复用保留下来的树的随机种子
+        seeds = [tree.random_state for tree in updated['regression'][-1].estimators_]
+        self.assertEqual(len(set(seeds)), len(seeds))
+        X = data[ModelTrainer.FEATURES].to_numpy()
+        self.assertEqual(updated['regression'].predict(X).shape, (400,))
+        self.assertEqual(updated['classification'].predict_proba(X).shape, (400, 2))
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.performance import PerformanceSeries
+
+
+class TestPerformanceSeries(unittest.TestCase):
+    """测试累计收益曲线构建类"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.dates = pd.date_range(start='2020-01-01', end='2023-12-31', freq='B')
+        rng = np.random.default_rng(0)
+        self.returns = {
+            '策略A': rng.normal(0.001, 0.01, len(self.dates)),
+            '策略B': rng.normal(0.0005, 0.02, len(self.dates)),
+            '基准': rng.normal(0.0002, 0.01, len(self.dates))
+        }
+
+    def test_build_matches_loop(self):
+        """测试累乘结果与逐日循环一致"""
+        df = PerformanceSeries.build(self.dates, self.returns)
+        self.assertEqual(list(df.columns), ['日期', '策略A', '策略B', '基准'])
+        self.assertEqual(len(df), len(self.dates))
+
+        expected = [0.0]
+        value = 1.0
+        for r in self.returns['策略A'][1:]:
+            value *= 1 + r
+            expected.append((value - 1) * 100)
+        np.testing.assert_allclose(df['策略A'], expected)
+
+    def test_simple_cumulative(self):
+        """测试单利累加"""
+        df = PerformanceSeries.build(self.dates, {'策略': np.full(len(self.dates), 0.01)}, compound=False)
+        self.assertAlmostEqual(df['策略'].iloc[-1], (len(self.dates) - 1) * 1.0)
+
+    def test_date_range_rebased(self):
+        """测试指定日期范围时曲线从区间首日以0为起点"""
+        df = PerformanceSeries.build(self.dates, self.returns, start_date='2022-01-01', end_date='2022-12-31')
+        self.assertEqual(df['日期'].min(), pd.Timestamp('2022-01-03'))
+        self.assertEqual(df['日期'].max(), pd.Timestamp('2022-12-30'))
+        self.assertTrue((df.iloc[0, 1:] == 0).all())
+
+    def test_returns_from_prices(self):
+        """测试由价格计算日收益率"""
+        prices = np.array([[10.0, 20.0], [11.0, 19.0], [12.1, np.nan]])
+        returns = PerformanceSeries.returns_from_prices(prices)
+        np.testing.assert_allclose(returns[:2], [[0, 0], [0.1, -0.05]])
+        self.assertAlmostEqual(returns[2, 0], 0.1)
+        self.assertTrue(np.isnan(returns[2, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.data_source import SimulatedSource
+from src.price_matrix import PriceMatrix
+
+
+class TestPriceMatrix(unittest.TestCase):
+    """测试行情矩阵类"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.codes = ["000001", "000002", "000003"]
+        self.panel = SimulatedSource(seed=7).fetch_panel(self.codes, "2023-01-01", "2023-03-31")
+
+    def tearDown(self):
+        """删除临时目录"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_from_panel(self):
+        """测试由面板数据构建矩阵"""
+        matrix = PriceMatrix.from_panel(self.panel)
+        n_dates = len(pd.date_range("2023-01-01", "2023-03-31", freq='B'))
+        self.assertEqual(matrix.shape, (n_dates, len(self.codes)))
+        self.assertEqual(matrix.codes.tolist(), self.codes)
+
+        col = matrix.code_positions(["000002"])[0]
+        expected = self.panel[self.panel['股票代码'] == "000002"]['收盘价'].to_numpy()
+        np.testing.assert_array_equal(matrix['收盘价'][:, col], expected)
+        self.assertEqual(matrix.code_positions(["999999"])[0], -1)
+
+    def test_missing_values_are_nan(self):
+        """测试缺失的(日期, 股票)位置为NaN"""
+        panel = self.panel.drop(index=0)
+        matrix = PriceMatrix.from_panel(panel)
+        self.assertTrue(np.isnan(matrix['收盘价'][0, 0]))
+
+    def test_save_and_load_memmap(self):
+        """测试保存后以内存映射方式加载"""
+        directory = os.path.join(self.tmp_dir, "matrix")
+        matrix = PriceMatrix.from_panel(self.panel)
+        matrix.save(directory)
+
+        loaded = PriceMatrix.load(directory)
+        self.assertIsInstance(loaded['收盘价'], np.memmap)
+        np.testing.assert_array_equal(loaded['成交量'], matrix['成交量'])
+        np.testing.assert_array_equal(loaded.dates, matrix.dates)
+
+        rows = loaded.date_slice("2023-02-01", "2023-02-28")
+        self.assertEqual(rows.stop - rows.start, len(pd.date_range("2023-02-01", "2023-02-28", freq='B')))
+
+    def test_save_replaces_existing(self):
+        """测试覆盖保存时新矩阵就位后才删除旧文件，已映射的旧矩阵仍可读取"""
+        directory = os.path.join(self.tmp_dir, "matrix")
+        first = PriceMatrix.from_panel(self.panel)
+        first.save(directory)
+        old = PriceMatrix.load(directory)
+
+        changed = self.panel.assign(收盘价=self.panel['收盘价'] * 2)
+        second = PriceMatrix.from_panel(changed)
+        removed = []
+        real_rmtree = shutil.rmtree
+
+        def rmtree(path, *args, **kwargs):
+            # 删除旧目录时新矩阵已经可以加载
+            if '.old.' in os.path.basename(path) and os.path.exists(path):
+                removed.append(path)
+                np.testing.assert_array_equal(PriceMatrix.load(directory)['收盘价'], second['收盘价'])
+            return real_rmtree(path, *args, **kwargs)
+
+        with mock.patch('src.price_matrix.shutil.rmtree', side_effect=rmtree):
+            second.save(directory)
+        self.assertEqual(len(removed), 1)
+        np.testing.assert_array_equal(old['收盘价'], first['收盘价'])
+        self.assertEqual(os.listdir(self.tmp_dir), ["matrix"])
+
+
+if __name__ == '__main__':
+    unittest.main()
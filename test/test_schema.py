@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.schema import FrameSchema, SchemaError, universe_schema
+
+
+class TestSchema(unittest.TestCase):
+    """测试列类型约定"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.data = {
+            '股票代码': ['000001', '000002', '600000'],
+            '股票名称': ['股票000001', '股票000002', '股票600000'],
+            '行业': ['科技', '金融', '科技'],
+            '天道得分': [70.0, 80.0, 90.0],
+            '地道得分': [65.0, 75.0, 85.0],
+            '人道得分': [60.0, 70.0, 80.0],
+            '成交量': [1000, 2000, 3000]
+        }
+
+    def test_build_universe(self):
+        """测试股票池转换为紧凑类型"""
+        df = universe_schema().build(self.data)
+        self.assertIsInstance(df['股票代码'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(df['行业'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['天道得分'].dtype, np.float32)
+        self.assertEqual(df['成交量'].dtype, np.int64)
+        self.assertEqual(df['股票代码'].iloc[0], '000001')
+        self.assertEqual(df['行业'].isin(['科技']).sum(), 2)
+
+    def test_unknown_industry(self):
+        """测试行业不在配置类别内时报错"""
+        self.data['行业'][0] = '未知行业'
+        with self.assertRaises(SchemaError):
+            universe_schema().build(self.data)
+
+    def test_missing_column(self):
+        """测试缺少必需列时报错"""
+        del self.data['天道得分']
+        with self.assertRaises(SchemaError):
+            universe_schema().build(self.data)
+
+    def test_validate(self):
+        """测试类型检查"""
+        schema = FrameSchema('测试', {'得分': np.float32})
+        schema.validate(pd.DataFrame({'得分': np.zeros(2, dtype=np.float32)}))
+        with self.assertRaises(SchemaError):
+            schema.validate(pd.DataFrame({'得分': np.zeros(2)}))
+
+
+if __name__ == '__main__':
+    unittest.main()
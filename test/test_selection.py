@@ -0,0 +1,87 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.selection import SelectionKernel
+
+
+class TestSelectionKernel(unittest.TestCase):
+    """测试选股选择内核"""
+
+    def setUp(self):
+        """设置测试数据，得分取整以制造并列"""
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            '得分': rng.integers(0, 50, 500).astype(float),
+            '行业': rng.choice(['金融', '科技', '医疗'], 500),
+            '预测涨跌幅': rng.uniform(-5, 10, 500)
+        })
+
+    def test_top_k_matches_nlargest(self):
+        """测试与nlargest结果及顺序一致，包括并列得分"""
+        for k in [1, 10, 100, 500, 600]:
+            expected = self.df.nlargest(k, '得分').index.to_numpy()
+            np.testing.assert_array_equal(SelectionKernel.top_k(self.df['得分'].to_numpy(), k), expected)
+
+    def test_top_k_skips_nan(self):
+        """测试得分为NaN的行不入选"""
+        scores = np.array([np.nan, 3.0, 1.0, np.nan, 2.0])
+        np.testing.assert_array_equal(SelectionKernel.top_k(scores, 10), [1, 4, 2])
+        self.assertEqual(len(SelectionKernel.top_k(scores, 0)), 0)
+
+    def test_select_filter_first(self):
+        """测试先过滤再选择"""
+        mask = self.df['预测涨跌幅'] > 3
+        selected = SelectionKernel.select_frame(self.df, '得分', 20, mask=mask)
+        expected = self.df[mask].nlargest(20, '得分')
+        self.assertEqual(len(selected), 20)
+        self.assertTrue((selected['预测涨跌幅'] > 3).all())
+        np.testing.assert_array_equal(selected.index, expected.index)
+
+    def test_select_quota_backfill(self):
+        """测试配额行业不足时由其他行业补足，与逐步nlargest的结果一致"""
+        mask = (self.df['预测涨跌幅'] > 9).to_numpy()
+        candidates = self.df[mask]
+        industry = candidates[candidates['行业'] == '医疗']
+        self.assertLess(len(industry), 10)
+        others = candidates[candidates['行业'] != '医疗'].nlargest(10 - len(industry), '得分')
+        expected = pd.concat([industry, others]).nlargest(10, '得分')
+
+        selected = SelectionKernel.select_frame(self.df, '得分', 10, mask=mask, group_column='行业', quotas={'医疗': 10})
+        np.testing.assert_array_equal(selected.index, expected.index)
+
+        # 配额行业足够时只从该行业中选择
+        selected = SelectionKernel.select_frame(self.df, '得分', 10, group_column='行业', quotas={'医疗': 10})
+        self.assertTrue((selected['行业'] == '医疗').all())
+        expected = self.df[self.df['行业'] == '医疗'].nlargest(10, '得分')
+        np.testing.assert_array_equal(selected.index, expected.index)
+
+        # 多个行业分别设置配额
+        selected = SelectionKernel.select_frame(self.df, '得分', 10, group_column='行业', quotas={'金融': 3, '科技': 2})
+        counts = selected['行业'].value_counts()
+        self.assertGreaterEqual(counts.get('金融', 0), 3)
+        self.assertGreaterEqual(counts.get('科技', 0), 2)
+        self.assertEqual(len(selected), 10)
+
+    def test_select_ordered_matches_select(self):
+        """测试利用分组内排序的选择与按过滤条件的选择结果一致"""
+        scores = self.df['得分'].to_numpy().copy()
+        scores[::17] = np.nan
+        groups = self.df['行业'].to_numpy(dtype=object)
+        rows = np.arange(len(scores))
+        orders = {}
+        for group in ['金融', '科技', '医疗']:
+            members = rows[groups == group]
+            orders[group] = members[np.lexsort((members, -scores[members], np.isnan(scores[members])))]
+        mask = (self.df['预测涨跌幅'] > 3).to_numpy()
+
+        for k in [1, 10, 50, 400]:
+            for quotas in [None, {'医疗': k}, {'金融': 3, '科技': 2}]:
+                for include in [None, ['科技', '医疗']]:
+                    full_mask = mask if include is None else mask & np.isin(groups, include)
+                    expected = SelectionKernel.select(scores, k, full_mask, groups, quotas)
+                    actual = SelectionKernel.select_ordered(scores, k, orders, include, mask, quotas)
+                    np.testing.assert_array_equal(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
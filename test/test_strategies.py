@@ -0,0 +1,60 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.strategies import StockSelectionStrategies
+
+
+class TestStockSelectionStrategies(unittest.TestCase):
+    """测试选股策略类"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(1)
+        self.stock_data = pd.DataFrame({
+            '股票代码': [f"{i:06d}" for i in range(200)],
+            '天道得分': rng.uniform(60, 95, 200),
+            '地道得分': rng.uniform(60, 95, 200),
+            '人道得分': rng.uniform(60, 95, 200),
+            '预测涨跌幅': rng.uniform(-5, 10, 200),
+            '所属行业': rng.choice(['科技', '金融', '医疗'], 200)
+        })
+
+    def test_strategic_compass_derivation(self):
+        """测试先过滤再选择，选满风险偏好对应的数量"""
+        count = StockSelectionStrategies._risk_count('高风险')
+        selected = StockSelectionStrategies.strategic_compass_derivation(self.stock_data, '牛市', '高风险', ['科技'])
+        self.assertEqual(len(selected), count)
+        self.assertTrue((selected['预测涨跌幅'] > 3).all())
+        self.assertTrue((selected['所属行业'] == '科技').all())
+        self.assertTrue(selected['综合得分'].is_monotonic_decreasing)
+
+        expected = self.stock_data[(self.stock_data['预测涨跌幅'] > 3) & (self.stock_data['所属行业'] == '科技')]
+        expected = expected.assign(综合得分=expected['天道得分'] * 0.4 + expected['地道得分'] * 0.3 + expected['人道得分'] * 0.3)
+        np.testing.assert_array_equal(selected.index, expected.nlargest(count, '综合得分').index)
+        # 不修改传入的数据
+        self.assertNotIn('综合得分', self.stock_data.columns)
+
+    def test_ai_strategy(self):
+        """测试AI策略选股"""
+        selected = StockSelectionStrategies.ai_strategy(self.stock_data, '熊市', '低风险', ['全部'])
+        self.assertEqual(len(selected), StockSelectionStrategies._risk_count('低风险'))
+        self.assertTrue((selected['预测涨跌幅'] > 3).all())
+        self.assertTrue(selected['ai_score'].is_monotonic_decreasing)
+
+    def test_evaluate_grid(self):
+        """测试批量选股结果表与逐个组合调用strategic_compass_derivation一致"""
+        industries = ['科技', '金融', '医疗']
+        grid = StockSelectionStrategies.evaluate_grid(self.stock_data, industries=industries)
+        self.assertEqual(grid.groupby(['市场趋势', '风险偏好', '行业偏好']).ngroups, 3 * 3 * 4)
+
+        for trend in StockSelectionStrategies.TREND_WEIGHTS:
+            for risk in StockSelectionStrategies.RISK_PREFERENCES:
+                for preference in [['全部'], ['科技'], ['金融', '医疗']]:
+                    expected = StockSelectionStrategies.strategic_compass_derivation(self.stock_data, trend, risk, preference)
+                    selected = StockSelectionStrategies.select_from_grid(self.stock_data, grid, trend, risk, preference)
+                    np.testing.assert_array_equal(selected.index, expected.index)
+                    np.testing.assert_allclose(selected['综合得分'], expected['综合得分'])
+
+
+if __name__ == '__main__':
+    unittest.main()
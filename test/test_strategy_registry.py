@@ -0,0 +1,63 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.strategy_registry import StrategyRegistry
+from src.strategies import StockSelectionStrategies
+from src.universe import UniverseSnapshot
+
+
+class TestStrategyRegistry(unittest.TestCase):
+    """测试选股策略注册表"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(3)
+        self.universe = UniverseSnapshot(pd.DataFrame({
+            '天道得分': rng.uniform(60, 95, 40),
+            '地道得分': rng.uniform(60, 95, 40),
+            '人道得分': rng.uniform(60, 95, 40),
+            '预测涨跌幅': rng.uniform(-5, 10, 40),
+            '所属行业': rng.choice(['科技', '金融'], 40)
+        }))
+        self.params = {'market_trend': '熊市', 'risk_preference': '高风险', 'industry_preference': ['全部']}
+
+    def test_builtin_strategies(self):
+        """测试内置策略已注册，别名指向同一策略"""
+        self.assertIs(StrategyRegistry.get('战略罗盘推衍'), StockSelectionStrategies.strategic_compass_derivation)
+        self.assertIs(StrategyRegistry.get('九州策略'), StockSelectionStrategies.strategic_compass_derivation)
+        self.assertIs(StrategyRegistry.get('AI策略'), StockSelectionStrategies.ai_strategy)
+        with self.assertRaises(KeyError):
+            StrategyRegistry.get('不存在的策略')
+
+    def test_run_many(self):
+        """测试在同一快照上运行多个策略"""
+        results = StrategyRegistry.run_many(self.universe, ['战略罗盘推衍', 'AI策略'], **self.params)
+        self.assertEqual(set(results), {'战略罗盘推衍', 'AI策略'})
+        expected = StockSelectionStrategies.strategic_compass_derivation(self.universe, **self.params)
+        pd.testing.assert_frame_equal(results['战略罗盘推衍'], expected)
+
+    def test_register_decorator(self):
+        """测试以装饰器注册策略"""
+        @StrategyRegistry.register('测试策略')
+        def first_rows(universe, **params):
+            return universe.frame(np.arange(3))
+        try:
+            self.assertEqual(len(StrategyRegistry.run('测试策略', self.universe, **self.params)), 3)
+            self.assertIn('测试策略', StrategyRegistry.run_many(self.universe, **self.params))
+        finally:
+            StrategyRegistry._strategies.pop('测试策略', None)
+
+    def test_separate_registry(self):
+        """测试子类注册表中的策略不会出现在共享注册表中"""
+        class LocalRegistry(StrategyRegistry):
+            _strategies = {}
+
+        LocalRegistry.register('本地策略', lambda universe, **params: universe.frame(np.arange(2)))
+        self.assertEqual(LocalRegistry.names(), ['本地策略'])
+        self.assertNotIn('本地策略', StrategyRegistry.names())
+        self.assertEqual(len(LocalRegistry.run('本地策略', self.universe, **self.params)), 2)
+        self.assertEqual(set(LocalRegistry.run_many(self.universe, **self.params)), {'本地策略'})
+
+
+if __name__ == '__main__':
+    unittest.main()
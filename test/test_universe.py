@@ -0,0 +1,86 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.universe import UniverseSnapshot
+from src.strategies import StockSelectionStrategies
+
+
+class TestUniverseSnapshot(unittest.TestCase):
+    """测试股票池快照"""
+
+    def setUp(self):
+        """设置测试数据"""
+        rng = np.random.default_rng(2)
+        self.stock_data = pd.DataFrame({
+            '股票代码': [f"{i:06d}" for i in range(50)],
+            '天道得分': rng.uniform(60, 95, 50).astype(np.float32),
+            '地道得分': rng.uniform(60, 95, 50).astype(np.float32),
+            '人道得分': rng.uniform(60, 95, 50).astype(np.float32),
+            '预测涨跌幅': rng.uniform(-5, 10, 50),
+            '行业': pd.Categorical(rng.choice(['科技', '金融'], 50))
+        })
+        self.universe = UniverseSnapshot(self.stock_data, '2023-12-31')
+
+    def test_arrays_are_readonly(self):
+        """测试快照数组只读且与原数据一致"""
+        self.assertEqual(len(self.universe), 50)
+        self.assertEqual(self.universe.scores.shape, (50, 3))
+        self.assertEqual(self.universe.scores.dtype, np.float64)
+        with self.assertRaises(ValueError):
+            self.universe.scores[0, 0] = 0
+        with self.assertRaises(ValueError):
+            self.universe.column('预测涨跌幅')[0] = 0
+        self.assertIs(self.universe.column('预测涨跌幅'), self.universe.column('预测涨跌幅'))
+        self.assertEqual(self.universe.industry_column, '行业')
+        self.assertEqual(list(self.universe.column('行业')), list(self.stock_data['行业']))
+
+    def test_frame_is_copy(self):
+        """测试取出的DataFrame与快照相互独立"""
+        rows = self.universe.frame([3, 1])
+        self.assertEqual(list(rows.index), [3, 1])
+        rows['预测涨跌幅'] = 0
+        self.assertNotEqual(self.universe.frame()['预测涨跌幅'].iloc[3], 0)
+
+    def test_strategies_share_snapshot(self):
+        """测试多个策略在同一快照上运行，不修改快照"""
+        before = self.universe.frame()
+        compass = StockSelectionStrategies.strategic_compass_derivation(self.universe, '牛市', '中风险', ['科技'])
+        ai = StockSelectionStrategies.ai_strategy(self.universe, '牛市', '中风险', ['全部'])
+        count = StockSelectionStrategies._risk_count('中风险')
+        eligible = self.stock_data['预测涨跌幅'] > 3
+        self.assertEqual(len(compass), min(count, int((eligible & (self.stock_data['行业'] == '科技')).sum())))
+        self.assertEqual(len(ai), min(count, int(eligible.sum())))
+        self.assertTrue((compass['行业'] == '科技').all())
+        pd.testing.assert_frame_equal(self.universe.frame(), before)
+        self.assertEqual(list(self.universe.columns), list(before.columns))
+
+    def test_industry_index(self):
+        """测试行业索引与按行业过滤一致"""
+        index = self.universe.industry_index
+        self.assertEqual(set(index), {'科技', '金融'})
+        for industry, rows in index.items():
+            np.testing.assert_array_equal(rows, np.flatnonzero(self.stock_data['行业'] == industry))
+        np.testing.assert_array_equal(self.universe.industry_rows(['金融', '科技']), np.arange(50))
+        self.assertEqual(len(self.universe.industry_rows(['医疗'])), 0)
+
+    def test_industry_order(self):
+        """测试行业内得分排序按键缓存，替换得分后失效"""
+        orders = self.universe.industry_order('天道得分')
+        self.assertIs(self.universe.industry_order('天道得分'), orders)
+        for industry, rows in orders.items():
+            expected = self.stock_data[self.stock_data['行业'] == industry].nlargest(len(rows), '天道得分')
+            np.testing.assert_array_equal(self.stock_data.index[rows], expected.index)
+
+        # 替换得分后行业索引沿用，依赖该列的排序重新计算
+        updated = self.universe.with_columns(天道得分=-self.stock_data['天道得分'])
+        self.assertIs(updated.industry_index, self.universe.industry_index)
+        new_orders = updated.industry_order('天道得分')
+        self.assertIsNot(new_orders, orders)
+        for industry in orders:
+            np.testing.assert_array_equal(new_orders[industry], orders[industry][::-1])
+        np.testing.assert_allclose(updated.scores[:, 0], -self.universe.scores[:, 0])
+        self.assertIs(updated.industry_order('地道得分'), updated.industry_order('地道得分'))
+
+
+if __name__ == '__main__':
+    unittest.main()
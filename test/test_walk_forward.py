@@ -0,0 +1,56 @@
+import unittest
+import pandas as pd
+import numpy as np
+from src.walk_forward import WalkForward
+
+
+class TestWalkForward(unittest.TestCase):
+    """测试滚动训练与评估"""
+
+    def setUp(self):
+        """设置测试数据：两年的日度数据，每天3只股票"""
+        dates = pd.date_range('2022-01-01', '2023-12-31', freq='D')
+        n = len(dates) * 3
+        self.data = pd.DataFrame({
+            '日期': np.repeat(dates, 3),
+            '天道得分': np.random.uniform(60, 95, n),
+            '地道得分': np.random.uniform(60, 95, n),
+            '人道得分': np.random.uniform(60, 95, n),
+            '预测涨跌幅': np.random.uniform(-5, 10, n)
+        }).sample(frac=1, random_state=0)
+
+    def test_make_folds(self):
+        """测试训练窗口始终在测试窗口之前"""
+        dates = np.sort(self.data['日期'].to_numpy())
+        folds = WalkForward.make_folds(dates, train_days=365, test_days=90)
+        self.assertEqual(len(folds), 5)
+        for fold in folds:
+            self.assertEqual(fold['train_end'], fold['test_start'])
+            self.assertLess(fold['训练结束'], fold['测试开始'])
+            self.assertLess(dates[fold['train_end'] - 1], dates[fold['test_start']])
+        self.assertEqual(folds[0]['测试开始'], '2023-01-01')
+        self.assertEqual(folds[1]['训练开始'], '2022-04-01')
+
+        # 扩大窗口时训练集始终从第一天开始
+        expanding = WalkForward.make_folds(dates, train_days=365, test_days=90, expanding=True)
+        self.assertTrue(all(fold['train_start'] == 0 for fold in expanding))
+
+        # 日期跨度不足时没有折
+        self.assertEqual(WalkForward.make_folds(dates[:30], train_days=365, test_days=90), [])
+
+    def test_run(self):
+        """测试逐折报告指标，进程池与单进程结果一致"""
+        report = WalkForward.run(self.data, train_days=365, test_days=180, step_days=180, n_jobs=1, n_estimators=5)
+        self.assertEqual(len(report), 3)
+        for column in ['mse', 'accuracy', '训练耗时', '预测耗时', '训练样本数', '测试样本数']:
+            self.assertIn(column, report.columns)
+        self.assertTrue((report['mse'] > 0).all())
+        self.assertTrue(report['accuracy'].between(0, 1).all())
+
+        parallel = WalkForward.run(self.data, train_days=365, test_days=180, step_days=180, n_jobs=2, n_estimators=5)
+        np.testing.assert_allclose(parallel['mse'], report['mse'])
+        np.testing.assert_allclose(parallel['accuracy'], report['accuracy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,22 +5,25 @@ from typing import Dict, Any
 class Config:
     _config: Dict[str, Any] = {}
     _loaded: bool = False
+    _path: str = None
 
     @staticmethod
     def load_config(config_file: str = '.env.toml') -> None:
         """
-        加载配置文件
+        加载配置文件，同一文件只加载一次；文件不存在时配置为空，各配置项取默认值
         Args:
             config_file: 配置文件路径
         """
-        if Config._loaded:
+        if Config._loaded and Config._path == config_file:
             return
 
+        Config._config = {}
+        Config._loaded = True
+        Config._path = config_file
         try:
             if os.path.exists(config_file):
                 with open(config_file, 'r', encoding='utf-8') as f:
                     Config._config = toml.load(f)
-                Config._loaded = True
                 from utils.logger import Logger
                 logger = Logger.get_logger("config")
                 logger.info(f"成功加载配置文件: {config_file}")
@@ -38,14 +41,21 @@ class Config:
         """
         获取配置项
         Args:
-            key: 配置项键名
+            key: 配置项键名，"节.键"形式的键按层级在对应配置节中查找
             default: 默认值
         Returns:
             配置项值或默认值
         """
         if not Config._loaded:
             Config.load_config()
-        return Config._config.get(key, default)
+        if key in Config._config:
+            return Config._config[key]
+        value = Config._config
+        for part in key.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
 
     @staticmethod
     def get_section(section: str) -> Dict[str, Any]: